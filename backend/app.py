@@ -1,17 +1,82 @@
-from flask import Flask, request, jsonify
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, request, jsonify, g, has_app_context, has_request_context, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+import click
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor, execute_values
 import hashlib
-import time
+import hmac
 import re
+import io
+import csv
+import gzip
+import calendar
+import math
+import tempfile
+import json
+import uuid
+import html
+import zipfile
+from string import Template
+import threading
+import queue
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, deque
 from functools import wraps
 import jwt
 from datetime import datetime, timedelta
-import requests
+import random
+from prometheus_client import Counter, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST, REGISTRY
+from prometheus_client import multiprocess
+
+class StartupTimer:
+    """How long this process took to become ready, phase by phase, so cold starts can be tracked."""
+
+    def __init__(self, started):
+        self.started_at = time.time()
+        self._last = started
+        self._chain = []
+        self.phases = {}
+        self.first_request_ms = None
+
+    def mark(self, phase):
+        # Time since the previous mark (or since the first line of this module)
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 3)
+        self._chain.append(phase)
+        self._last = now
+
+    def record(self, phase, seconds):
+        self.phases[phase] = round(seconds * 1000, 3)
+
+    def note_request(self, seconds):
+        if self.first_request_ms is None:
+            self.first_request_ms = round(seconds * 1000, 3)
+
+    def stats(self):
+        return {
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'import_ms': round(sum(self.phases[p] for p in self._chain), 3),
+            'phases': dict(self.phases),
+            'first_request_ms': self.first_request_ms
+        }
+
+    def report(self):
+        stats = self.stats()
+        phases = ', '.join(f"{name} {ms:.1f} ms" for name, ms in stats['phases'].items())
+        return f"Startup (pid {stats['pid']}): import {stats['import_ms']:.1f} ms ({phases})"
+
+startup = StartupTimer(_import_started)
+startup.mark('imports')
 
 app = Flask(__name__)
-CORS(app, origins=["https://agrirent-pro.onrender.com"])
+CORS(app, origins=["https://agrirent-pro.onrender.com"], expose_headers=["X-Last-Write"])
 
 # Configuration
 import os
@@ -20,6 +85,85 @@ load_dotenv()
 
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
 app.config['DATABASE_URL'] = os.getenv("DATABASE_URL")
+app.config['DB_SSLMODE'] = os.getenv("DB_SSLMODE", "require")
+
+# Connection pool (one per gunicorn worker)
+app.config['DB_POOL_MIN'] = int(os.getenv("DB_POOL_MIN", "1"))
+app.config['DB_POOL_MAX'] = int(os.getenv("DB_POOL_MAX", "10"))
+app.config['DB_POOL_TIMEOUT'] = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+app.config['DB_POOL_HEALTHCHECK_AFTER'] = float(os.getenv("DB_POOL_HEALTHCHECK_AFTER", "30"))
+app.config['DB_POOL_MAX_LIFETIME'] = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+
+# Optional read replicas (comma-separated DSNs) for read-only routes.
+# Keep READ_YOUR_WRITES_WINDOW >= REPLICA_MAX_LAG so a user never reads behind their own write.
+app.config['DATABASE_REPLICA_URLS'] = [dsn.strip() for dsn in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if dsn.strip()]
+app.config['REPLICA_CHECK_INTERVAL'] = float(os.getenv("REPLICA_CHECK_INTERVAL", "5"))
+app.config['REPLICA_MAX_LAG'] = float(os.getenv("REPLICA_MAX_LAG", "10"))
+app.config['READ_YOUR_WRITES_WINDOW'] = float(os.getenv("READ_YOUR_WRITES_WINDOW", "10"))
+
+# Background audit log writer
+app.config['AUDIT_QUEUE_SIZE'] = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+app.config['AUDIT_BATCH_SIZE'] = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+app.config['AUDIT_FLUSH_INTERVAL'] = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+app.config['AUDIT_QUEUE_FULL_POLICY'] = os.getenv("AUDIT_QUEUE_FULL_POLICY", "block")  # block | drop
+app.config['AUDIT_BLOCK_TIMEOUT'] = float(os.getenv("AUDIT_BLOCK_TIMEOUT", "2"))
+# A failed batch is retried this many times, waiting AUDIT_RETRY_BACKOFF * 2^n seconds in between
+app.config['AUDIT_WRITE_RETRIES'] = int(os.getenv("AUDIT_WRITE_RETRIES", "3"))
+app.config['AUDIT_RETRY_BACKOFF'] = float(os.getenv("AUDIT_RETRY_BACKOFF", "0.5"))
+# Monthly audit_logs partitions are kept this many months ahead of the current one
+app.config['AUDIT_PARTITIONS_AHEAD'] = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "1"))
+app.config['AUDIT_SEARCH_PAGE_SIZE'] = int(os.getenv("AUDIT_SEARCH_PAGE_SIZE", "100"))
+app.config['AUDIT_SEARCH_MAX_PAGE_SIZE'] = int(os.getenv("AUDIT_SEARCH_MAX_PAGE_SIZE", "500"))
+
+# Audit archival (flask audit-archive): rows older than the retention period move to gzip NDJSON files.
+# Archived rows are deleted from Postgres, so AUDIT_ARCHIVE_DIR must be durable storage that every
+# instance mounts (a persistent disk or network volume), never the deploy's own filesystem.
+# There is no default: archiving and archive search are refused until it is set.
+app.config['AUDIT_ARCHIVE_DIR'] = os.getenv("AUDIT_ARCHIVE_DIR") or None
+app.config['AUDIT_RETENTION_DAYS'] = float(os.getenv("AUDIT_RETENTION_DAYS", "180"))
+app.config['AUDIT_ARCHIVE_CHUNK_ROWS'] = int(os.getenv("AUDIT_ARCHIVE_CHUNK_ROWS", "50000"))
+app.config['AUDIT_ARCHIVE_DELETE_BATCH'] = int(os.getenv("AUDIT_ARCHIVE_DELETE_BATCH", "5000"))
+app.config['AUDIT_ARCHIVE_BATCH_PAUSE'] = float(os.getenv("AUDIT_ARCHIVE_BATCH_PAUSE", "0.05"))
+
+# Login throttle: failed attempts allowed per sliding window, per username from one client IP and
+# per client IP. Behind a reverse proxy set TRUSTED_PROXY_COUNT so the client IP comes from
+# X-Forwarded-For; until it is set, forwarded requests skip both windows (the address is the proxy's).
+app.config['LOGIN_THROTTLE_WINDOW'] = float(os.getenv("LOGIN_THROTTLE_WINDOW", "300"))
+app.config['LOGIN_MAX_FAILURES_PER_USER'] = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "10"))
+app.config['LOGIN_MAX_FAILURES_PER_IP'] = int(os.getenv("LOGIN_MAX_FAILURES_PER_IP", "50"))
+app.config['LOGIN_THROTTLE_MAX_KEYS'] = int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+app.config['TRUSTED_PROXY_COUNT'] = int(os.getenv("TRUSTED_PROXY_COUNT", "0"))
+
+# Verified JWT cache
+app.config['TOKEN_CACHE_SIZE'] = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+app.config['TOKEN_REVOCATION_SYNC_INTERVAL'] = float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "5"))
+# Each sync re-reads revocations this recent, so rows that commit late are not skipped
+app.config['TOKEN_REVOCATION_SYNC_OVERLAP'] = float(os.getenv("TOKEN_REVOCATION_SYNC_OVERLAP", "60"))
+TOKEN_LIFETIME = timedelta(hours=24)
+
+# Equipment catalog cache
+app.config['CATALOG_CHECK_INTERVAL'] = float(os.getenv("CATALOG_CHECK_INTERVAL", "2"))
+
+# Bulk equipment import
+app.config['EQUIPMENT_IMPORT_MAX_ROWS'] = int(os.getenv("EQUIPMENT_IMPORT_MAX_ROWS", "10000"))
+app.config['EQUIPMENT_IMPORT_MAX_ERRORS'] = int(os.getenv("EQUIPMENT_IMPORT_MAX_ERRORS", "500"))
+
+# Rental listings
+app.config['RENTALS_PAGE_SIZE'] = int(os.getenv("RENTALS_PAGE_SIZE", "50"))
+app.config['RENTALS_MAX_PAGE_SIZE'] = int(os.getenv("RENTALS_MAX_PAGE_SIZE", "200"))
+app.config['RENTAL_CART_MAX_ITEMS'] = int(os.getenv("RENTAL_CART_MAX_ITEMS", "25"))
+
+# Streaming exports
+app.config['EXPORT_CHUNK_SIZE'] = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# Dashboard stats cache
+app.config['DASHBOARD_CACHE_TTL'] = float(os.getenv("DASHBOARD_CACHE_TTL", "10"))
+app.config['DASHBOARD_CACHE_SIZE'] = int(os.getenv("DASHBOARD_CACHE_SIZE", "5000"))
+
+# AI recommendation cache
+app.config['AI_CACHE_SIZE'] = int(os.getenv("AI_CACHE_SIZE", "2000"))
+app.config['AI_CACHE_TTL'] = float(os.getenv("AI_CACHE_TTL", str(6 * 3600)))
+app.config['AI_CACHE_PERSIST'] = os.getenv("AI_CACHE_PERSIST", "false").lower() in ("1", "true", "yes")
 
 # Hugging Face API Configuration (100% FREE!)
 # Get your FREE API key from: https://huggingface.co/settings/tokens
@@ -27,19 +171,564 @@ HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 
 # Using Hugging Face Router API - required for free tier
 HUGGINGFACE_MODEL = "deepseek-ai/DeepSeek-R1:sambanova"
+HUGGINGFACE_API_URL = os.getenv("HUGGINGFACE_API_URL", "https://router.huggingface.co/v1/chat/completions")
+
+# Hugging Face client: timeouts, retries and circuit breaker
+app.config['HF_CONNECT_TIMEOUT'] = float(os.getenv("HF_CONNECT_TIMEOUT", "3.05"))
+app.config['HF_READ_TIMEOUT'] = float(os.getenv("HF_READ_TIMEOUT", "30"))
+app.config['HF_MAX_RETRIES'] = int(os.getenv("HF_MAX_RETRIES", "2"))
+app.config['HF_RETRY_BACKOFF'] = float(os.getenv("HF_RETRY_BACKOFF", "0.5"))
+app.config['HF_TOTAL_TIMEOUT'] = float(os.getenv("HF_TOTAL_TIMEOUT", "45"))
+app.config['HF_POOL_SIZE'] = int(os.getenv("HF_POOL_SIZE", "10"))
+app.config['HF_BREAKER_THRESHOLD'] = int(os.getenv("HF_BREAKER_THRESHOLD", "5"))
+app.config['HF_BREAKER_COOLDOWN'] = float(os.getenv("HF_BREAKER_COOLDOWN", "30"))
+
+# Coalescing of identical in-flight AI prompts
+app.config['AI_SINGLEFLIGHT_WAIT'] = float(os.getenv("AI_SINGLEFLIGHT_WAIT", "90"))
+app.config['AI_SINGLEFLIGHT_SHARED'] = os.getenv("AI_SINGLEFLIGHT_SHARED", "false").lower() in ("1", "true", "yes")
+app.config['AI_SINGLEFLIGHT_SHARED_TTL'] = float(os.getenv("AI_SINGLEFLIGHT_SHARED_TTL", "30"))
+
+# Asynchronous AI jobs
+app.config['AI_JOB_WORKERS'] = int(os.getenv("AI_JOB_WORKERS", "4"))
+app.config['AI_JOB_QUEUE_DEPTH'] = int(os.getenv("AI_JOB_QUEUE_DEPTH", "32"))
+app.config['AI_JOB_TTL'] = float(os.getenv("AI_JOB_TTL", "600"))
+app.config['AI_JOB_MAX_WAIT'] = float(os.getenv("AI_JOB_MAX_WAIT", "20"))
+
+# Rental contracts
+app.config['CONTRACT_CACHE_SIZE'] = int(os.getenv("CONTRACT_CACHE_SIZE", "1000"))
+app.config['CONTRACT_CACHE_TTL'] = float(os.getenv("CONTRACT_CACHE_TTL", "3600"))
+app.config['CONTRACT_BATCH_MAX'] = int(os.getenv("CONTRACT_BATCH_MAX", "1000"))
+
+if app.config['TRUSTED_PROXY_COUNT']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
+
+startup.mark('config')
+
+# ==================== METRICS ==========================
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) every worker writes
+# its samples there and /metrics aggregates them across workers.
+# /metrics answers only to `Authorization: Bearer $METRICS_TOKEN`; without a token it stays off.
+app.config['METRICS_TOKEN'] = os.getenv("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests by route and status', ['method', 'route', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time until the response body has been sent', ['method', 'route'], buckets=LATENCY_BUCKETS
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'db_queries_per_request', 'Database statements executed per request', ['route'],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50)
+)
+DB_TIME_PER_REQUEST = Histogram(
+    'db_time_per_request_seconds', 'Time spent in database statements per request', ['route'], buckets=LATENCY_BUCKETS
+)
+DB_QUERIES = Counter('db_queries_total', 'Database statements executed, including background work')
+DB_QUERY_TIME = Counter('db_query_seconds_total', 'Time spent in database statements, including background work')
+HF_REQUESTS = Counter('huggingface_requests_total', 'Hugging Face router calls by outcome', ['outcome'])
+HF_LATENCY = Histogram(
+    'huggingface_request_duration_seconds', 'Hugging Face router call latency including retries', ['outcome'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+HF_TTFT = Histogram(
+    'huggingface_time_to_first_token_seconds', 'Time to first streamed token', buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15)
+)
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that counts statements and time, per request when in one."""
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_QUERIES.inc()
+            DB_QUERY_TIME.inc(elapsed)
+            if has_app_context():
+                g.db_queries = g.get('db_queries', 0) + 1
+                g.db_time = g.get('db_time', 0.0) + elapsed
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    method = request.method
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.labels(method, route, str(response.status_code)).inc()
+    
+    # Streamed bodies (exports, SSE chat) are still being produced when the headers go out,
+    # so duration and DB work are taken when the server closes the response
+    request_g = g._get_current_object()
+    def observe():
+        elapsed = time.perf_counter() - start
+        HTTP_LATENCY.labels(method, route).observe(elapsed)
+        DB_QUERIES_PER_REQUEST.labels(route).observe(request_g.get('db_queries', 0))
+        DB_TIME_PER_REQUEST.labels(route).observe(request_g.get('db_time', 0.0))
+        startup.note_request(elapsed)
+    response.call_on_close(observe)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    token = app.config['METRICS_TOKEN']
+    if not token:
+        return jsonify({'message': 'Metrics are not enabled'}), 404
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'message': 'Unauthorized'}), 401
+    
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
 
 # ==================== DATABASE ==========================
 
-def get_connection():
+def connect_db(dsn=None):
     return psycopg2.connect(
-        app.config['DATABASE_URL'],
-        sslmode="require",
-        cursor_factory=RealDictCursor
+        dsn or app.config['DATABASE_URL'],
+        sslmode=app.config['DB_SSLMODE'],
+        cursor_factory=InstrumentedCursor
     )
 
+class PoolTimeout(Exception):
+    pass
+
+class PooledConnection:
+    """Proxy handed out by the pool; close() returns the connection instead of closing it."""
+
+    def __init__(self, pool, conn, created_at):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def close(self):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.putconn(conn, self._created_at)
+
+class ConnectionPool:
+    def __init__(self, dsn, minconn, maxconn, timeout, healthcheck_after, max_lifetime):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_after = healthcheck_after
+        self.max_lifetime = max_lifetime
+
+        self._cond = threading.Condition()
+        self._idle = []  # (conn, created_at, last_used)
+        self._size = 0
+        self._waiting = 0
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._health_failures = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+        for _ in range(minconn):
+            try:
+                conn = connect_db(self.dsn)
+            except psycopg2.Error as e:
+                print(f"DB pool warm-up failed: {str(e)}")
+                break
+            now = time.monotonic()
+            self._idle.append((conn, now, now))
+            self._size += 1
+
+    def getconn(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        try:
+            if entry is None:
+                conn, created_at = connect_db(self.dsn), time.monotonic()
+            else:
+                conn, created_at = self._checked(entry)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+
+        return PooledConnection(self, conn, created_at)
+
+    def _checked(self, entry):
+        # Replace connections that are broken, too old, or fail a ping after sitting idle
+        conn, created_at, last_used = entry
+        now = time.monotonic()
+
+        healthy = not conn.closed and now - created_at < self.max_lifetime
+        if healthy and now - last_used >= self.healthcheck_after:
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT 1")
+                cur.close()
+                conn.rollback()
+            except psycopg2.Error:
+                healthy = False
+
+        if healthy:
+            return conn, created_at
+
+        with self._cond:
+            self._health_failures += 1
+        self._discard(conn)
+        return connect_db(self.dsn), time.monotonic()
+
+    def putconn(self, conn, created_at):
+        if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                self._discard(conn)
+
+        with self._cond:
+            if conn.closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def stats(self):
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'size': self._size,
+                'in_use': self._size - idle,
+                'idle': idle,
+                'waiting': self._waiting,
+                'min': self.minconn,
+                'max': self.maxconn,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'health_failures': self._health_failures,
+                'avg_checkout_ms': round(self._checkout_time_total / self._checkouts * 1000, 3) if self._checkouts else 0,
+                'max_checkout_ms': round(self._checkout_time_max * 1000, 3)
+            }
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    # Pools are created lazily so that each forked gunicorn worker gets its own sockets
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(
+                    app.config['DATABASE_URL'],
+                    app.config['DB_POOL_MIN'],
+                    app.config['DB_POOL_MAX'],
+                    app.config['DB_POOL_TIMEOUT'],
+                    app.config['DB_POOL_HEALTHCHECK_AFTER'],
+                    app.config['DB_POOL_MAX_LIFETIME']
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+def get_connection():
+    conn = get_pool().getconn()
+    if has_app_context():
+        g.setdefault('_db_conns', []).append(conn)
+    return conn
+
+class ReplicaSet:
+    """Pools for the read replicas plus a background check that takes down or lagging ones out of rotation.
+
+    Read-your-writes: a successful write stamps the response with a signed X-Last-Write
+    marker that the client sends back, so whichever worker serves the next request knows
+    to read from the primary. The per-worker _writes map covers clients that do not echo it.
+    """
+
+    def __init__(self, dsns, check_interval, max_lag, ryw_window):
+        self.dsns = dsns
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.ryw_window = ryw_window
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._pools = {}
+        self._health = {}  # dsn -> {'healthy', 'lag', 'error', 'checked_at'}
+        self._rotation = []
+        self._next = 0
+        self._stop = threading.Event()
+        self._writes = {}  # username -> monotonic time of last write
+
+        self._replica_reads = 0
+        self._primary_reads = 0
+        self._ryw_reads = 0
+        self._fallbacks = 0
+
+    def _ensure_started(self):
+        # Pools and the checker thread are per worker, like the primary pool
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pools = {
+                    dsn: ConnectionPool(
+                        dsn,
+                        0,
+                        app.config['DB_POOL_MAX'],
+                        app.config['DB_POOL_TIMEOUT'],
+                        app.config['DB_POOL_HEALTHCHECK_AFTER'],
+                        app.config['DB_POOL_MAX_LIFETIME']
+                    )
+                    for dsn in self.dsns
+                }
+                self._health = {}
+                self._rotation = []
+                self._writes = {}
+                self._stop = threading.Event()
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, name="replica-health", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self.check()
+            if self._stop.wait(self.check_interval):
+                return
+
+    def _probe(self, dsn):
+        # Returns the lag in seconds, or None when the standby is not streaming and has nothing to measure by
+        conn = self._pools[dsn].getconn()
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT pg_is_in_recovery() AS standby,
+                       EXISTS (SELECT 1 FROM pg_stat_wal_receiver) AS streaming,
+                       COALESCE(pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn(), FALSE) AS replayed,
+                       EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) AS replay_age
+            """)
+            row = cur.fetchone()
+            conn.rollback()
+            cur.close()
+        finally:
+            conn.close()
+
+        if not row['standby']:
+            return 0.0
+        # An idle primary stops producing replay timestamps, so a standby that is still connected
+        # and has replayed all it received counts as current. A disconnected one has received
+        # nothing new either, so it is judged by the age of its last replayed transaction.
+        if row['streaming'] and row['replayed']:
+            return 0.0
+        return float(row['replay_age']) if row['replay_age'] is not None else None
+
+    def check(self):
+        health = {}
+        for dsn in self.dsns:
+            try:
+                lag = self._probe(dsn)
+                if lag is None:
+                    health[dsn] = {'healthy': False, 'lag': None, 'error': 'not streaming from the primary'}
+                else:
+                    health[dsn] = {'healthy': lag <= self.max_lag, 'lag': round(lag, 3), 'error': None}
+            except Exception as e:
+                health[dsn] = {'healthy': False, 'lag': None, 'error': str(e)}
+            health[dsn]['checked_at'] = time.time()
+        with self._lock:
+            self._health = health
+            self._rotation = [dsn for dsn in self.dsns if health[dsn]['healthy']]
+
+    def note_write(self, username):
+        with self._lock:
+            now = time.monotonic()
+            self._writes[username] = now
+            if len(self._writes) > 10000:
+                self._writes = {u: t for u, t in self._writes.items() if now - t < self.ryw_window}
+
+    def write_marker(self, username):
+        written = f"{time.time():.3f}"
+        return f"{written}.{self._sign(username, written)}"
+
+    def _sign(self, username, written):
+        message = f"{username}:{written}".encode()
+        return hmac.new(app.config['SECRET_KEY'].encode(), message, hashlib.sha256).hexdigest()[:32]
+
+    def wrote_recently(self, username, marker=None):
+        written = self._writes.get(username)
+        if written is not None and time.monotonic() - written < self.ryw_window:
+            return True
+        if not marker:
+            return False
+        # Marker from a write served by another worker; the signature ties it to this user
+        written, _, signature = marker.rpartition('.')
+        try:
+            age = time.time() - float(written)
+        except ValueError:
+            return False
+        return -1 < age < self.ryw_window and hmac.compare_digest(signature, self._sign(username, written))
+
+    def getconn(self, username=None, marker=None):
+        # Returns None when the read should go to the primary instead
+        self._ensure_started()
+        if username is not None and self.wrote_recently(username, marker):
+            with self._lock:
+                self._ryw_reads += 1
+            return None
+
+        with self._lock:
+            if not self._rotation:
+                self._primary_reads += 1
+                return None
+            dsn = self._rotation[self._next % len(self._rotation)]
+            self._next += 1
+
+        try:
+            conn = self._pools[dsn].getconn()
+        except (PoolTimeout, psycopg2.OperationalError) as e:
+            with self._lock:
+                self._fallbacks += 1
+                if isinstance(e, psycopg2.OperationalError) and dsn in self._rotation:
+                    self._rotation.remove(dsn)
+                    self._health[dsn] = dict(self._health.get(dsn, {}), healthy=False, error=str(e))
+            return None
+
+        with self._lock:
+            self._replica_reads += 1
+        return conn
+
+    def stats(self):
+        self._ensure_started()
+        with self._lock:
+            return {
+                'replicas': [
+                    dict(self._health.get(dsn, {'healthy': False, 'lag': None, 'error': 'not checked yet'}),
+                         index=index, pool=self._pools[dsn].stats())
+                    for index, dsn in enumerate(self.dsns)
+                ],
+                'in_rotation': len(self._rotation),
+                'replica_reads': self._replica_reads,
+                'primary_reads': self._primary_reads,
+                'read_your_writes_reads': self._ryw_reads,
+                'fallbacks': self._fallbacks,
+                'recent_writers': len(self._writes)
+            }
+
+replicas = ReplicaSet(
+    app.config['DATABASE_REPLICA_URLS'],
+    app.config['REPLICA_CHECK_INTERVAL'],
+    app.config['REPLICA_MAX_LAG'],
+    app.config['READ_YOUR_WRITES_WINDOW']
+) if app.config['DATABASE_REPLICA_URLS'] else None
+
+def get_read_connection():
+    # Read-only work goes to a healthy replica unless none is usable or the caller wrote recently
+    conn = None
+    if replicas is not None:
+        username = g.get('current_user') if has_app_context() else None
+        marker = request.headers.get('X-Last-Write') if has_request_context() else None
+        conn = replicas.getconn(username, marker)
+    if conn is None:
+        return get_connection()
+    if has_app_context():
+        g.setdefault('_db_conns', []).append(conn)
+    return conn
+
+@app.after_request
+def remember_writes(response):
+    if replicas is not None and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        username = g.get('current_user')
+        if username:
+            replicas.note_write(username)
+            response.headers['X-Last-Write'] = replicas.write_marker(username)
+    return response
+
+@app.teardown_appcontext
+def release_connections(exc):
+    # Return anything a handler forgot to close (e.g. on an exception path)
+    for conn in g.pop('_db_conns', []):
+        conn.close()
+
+@app.errorhandler(PoolTimeout)
+def handle_pool_timeout(e):
+    return jsonify({'message': 'Server busy, please try again'}), 503
+
 def setup_db():
-    conn = get_connection()
+    # Once the stored schema version is current this is a single read plus the
+    # audit partition check, so it is cheap to run on every deploy
+    started = time.perf_counter()
+    conn = connect_db()
     cur = conn.cursor()
+    cur.execute("SELECT to_regclass('schema_migrations') IS NOT NULL AS present")
+    if cur.fetchone()['present'] and get_schema_version(cur) >= MIGRATIONS[-1]['version']:
+        ensure_audit_log_partitions(cur)
+        conn.commit()
+        cur.close()
+        conn.close()
+        startup.record('schema_setup', time.perf_counter() - started)
+        return False
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS users(
@@ -86,6 +775,472 @@ def setup_db():
     cur.close()
     conn.close()
 
+    run_migrations()
+
+    conn = connect_db()
+    cur = conn.cursor()
+    ensure_audit_log_partitions(cur)
+    conn.commit()
+    cur.close()
+    conn.close()
+    startup.record('schema_setup', time.perf_counter() - started)
+    return True
+
+@app.cli.command('setup-db')
+def setup_db_command():
+    """Create tables, apply pending migrations and prepare audit partitions."""
+    applied = setup_db()
+    click.echo(f"Schema {'updated' if applied else 'already current'} in {startup.phases['schema_setup']:.1f} ms")
+
+# ==================== MIGRATIONS ==========================
+
+# Applied in order and recorded in schema_migrations. Migrations marked
+# concurrent run statement by statement in autocommit mode so that
+# CREATE INDEX CONCURRENTLY can build against a live database; the others
+# run inside a single transaction.
+MIGRATIONS = [
+    {
+        'version': 1,
+        'description': 'hot-path indexes on rentals and audit_logs',
+        'concurrent': True,
+        'statements': [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rentals_username_id ON rentals (username, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rentals_status_equipment ON rentals (status, equipment_id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs (timestamp)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_audit_logs_username_timestamp ON audit_logs (username, timestamp)"
+        ]
+    },
+    {
+        'version': 2,
+        'description': 'token revocation list shared by all workers',
+        'concurrent': False,
+        'statements': [
+            """
+            CREATE TABLE IF NOT EXISTS token_revocations(
+                id SERIAL PRIMARY KEY,
+                token_hash TEXT,
+                username TEXT,
+                revoked_at DOUBLE PRECISION,
+                expires_at DOUBLE PRECISION
+            )
+            """
+        ]
+    },
+    {
+        'version': 3,
+        'description': 'equipment catalog version',
+        'concurrent': False,
+        'statements': [
+            """
+            CREATE TABLE IF NOT EXISTS catalog_meta(
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL
+            )
+            """,
+            "INSERT INTO catalog_meta(id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING"
+        ]
+    },
+    {
+        'version': 4,
+        'description': 'keyset pagination indexes on rentals',
+        'concurrent': True,
+        'statements': [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rentals_status_id ON rentals (status, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_rentals_equipment_id_id ON rentals (equipment_id, id)"
+        ]
+    },
+    {
+        'version': 5,
+        'description': 'rental creation time',
+        'concurrent': False,
+        'statements': [
+            # Added without a default first so existing rows stay NULL instead of getting today's date
+            "ALTER TABLE rentals ADD COLUMN IF NOT EXISTS created_at DOUBLE PRECISION",
+            "ALTER TABLE rentals ALTER COLUMN created_at SET DEFAULT EXTRACT(EPOCH FROM now())"
+        ]
+    },
+    {
+        'version': 6,
+        'description': 'per-equipment revenue aggregates',
+        'concurrent': False,
+        'statements': [
+            """
+            CREATE TABLE IF NOT EXISTS equipment_revenue(
+                equipment_id INTEGER PRIMARY KEY,
+                revenue DOUBLE PRECISION NOT NULL DEFAULT 0,
+                rental_count INTEGER NOT NULL DEFAULT 0
+            )
+            """,
+            """
+            INSERT INTO equipment_revenue(equipment_id, revenue, rental_count)
+            SELECT equipment_id, SUM(total), COUNT(*)
+            FROM rentals
+            WHERE status = 'returned'
+            GROUP BY equipment_id
+            ON CONFLICT (equipment_id) DO UPDATE
+            SET revenue = EXCLUDED.revenue, rental_count = EXCLUDED.rental_count
+            """
+        ]
+    },
+    {
+        'version': 7,
+        'description': 'shared AI recommendation cache',
+        'concurrent': False,
+        'statements': [
+            """
+            CREATE TABLE IF NOT EXISTS ai_recommend_cache(
+                cache_key TEXT PRIMARY KEY,
+                result JSONB NOT NULL,
+                created_at DOUBLE PRECISION NOT NULL,
+                expires_at DOUBLE PRECISION NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_ai_recommend_cache_expires_at ON ai_recommend_cache (expires_at)"
+        ]
+    },
+    {
+        'version': 8,
+        'description': 'AI responses shared between coalesced workers',
+        'concurrent': False,
+        'statements': [
+            """
+            CREATE TABLE IF NOT EXISTS ai_inflight_results(
+                prompt_hash TEXT PRIMARY KEY,
+                response TEXT,
+                created_at DOUBLE PRECISION NOT NULL
+            )
+            """
+        ]
+    },
+    {
+        'version': 9,
+        'description': 'asynchronous AI jobs',
+        'concurrent': False,
+        'statements': [
+            """
+            CREATE TABLE IF NOT EXISTS ai_jobs(
+                id TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result JSONB,
+                result_status INTEGER,
+                created_at DOUBLE PRECISION NOT NULL,
+                started_at DOUBLE PRECISION,
+                finished_at DOUBLE PRECISION,
+                expires_at DOUBLE PRECISION NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_ai_jobs_expires_at ON ai_jobs (expires_at)"
+        ]
+    },
+    {
+        'version': 10,
+        'description': 'store users.lock_time at full precision',
+        'concurrent': False,
+        'statements': [
+            # REAL has a 128 second resolution at current epoch values, which shortened lockouts
+            "ALTER TABLE users ALTER COLUMN lock_time TYPE DOUBLE PRECISION"
+        ]
+    },
+    {
+        'version': 11,
+        'description': 'partition audit_logs by month',
+        'concurrent': False,
+        'statements': [
+            "LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE",
+            "ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned",
+            """
+            CREATE TABLE audit_logs(
+                id BIGINT NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+                username TEXT,
+                action TEXT,
+                timestamp DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (timestamp, id)
+            ) PARTITION BY RANGE (timestamp)
+            """,
+            "ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id",
+            "CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT",
+            "CREATE INDEX idx_audit_logs_username_ts ON audit_logs (username, timestamp, id)",
+            "CREATE INDEX idx_audit_logs_action_ts ON audit_logs (action text_pattern_ops, timestamp)",
+            # Creates the UTC month partition starting at month_start, first moving any rows
+            # for that month out of the default partition so the attach cannot fail
+            """
+            CREATE OR REPLACE FUNCTION ensure_audit_log_partition(month_start DATE) RETURNS TEXT AS $$
+            DECLARE
+                part TEXT := format('audit_logs_%s', to_char(month_start, 'YYYY_MM'));
+                lo DOUBLE PRECISION := EXTRACT(EPOCH FROM month_start::timestamp AT TIME ZONE 'UTC');
+                hi DOUBLE PRECISION := EXTRACT(EPOCH FROM (month_start + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC');
+            BEGIN
+                IF to_regclass(part) IS NOT NULL THEN
+                    RETURN part;
+                END IF;
+                PERFORM pg_advisory_xact_lock(7410002);
+                IF to_regclass(part) IS NOT NULL THEN
+                    RETURN part;
+                END IF;
+                EXECUTE format('CREATE TABLE %I (LIKE audit_logs INCLUDING DEFAULTS)', part);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM audit_logs_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved', lo, hi, part
+                );
+                EXECUTE format('ALTER TABLE audit_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)', part, lo, hi);
+                RETURN part;
+            END;
+            $$ LANGUAGE plpgsql
+            """,
+            # Existing history gets monthly partitions back to two years; anything older lands in the default
+            """
+            SELECT ensure_audit_log_partition(month::date)
+            FROM generate_series(
+                date_trunc('month', GREATEST(
+                    LEAST((SELECT to_timestamp(MIN(timestamp)) FROM audit_logs_unpartitioned), now()),
+                    now() - INTERVAL '24 months'
+                ) AT TIME ZONE 'UTC'),
+                date_trunc('month', now() AT TIME ZONE 'UTC') + INTERVAL '1 month',
+                INTERVAL '1 month'
+            ) AS month
+            """,
+            """
+            INSERT INTO audit_logs (id, username, action, timestamp)
+            SELECT id, username, action, COALESCE(timestamp, 0)
+            FROM audit_logs_unpartitioned
+            """,
+            "DROP TABLE audit_logs_unpartitioned"
+        ]
+    }
+]
+
+MIGRATION_LOCK_ID = 7410001
+
+def _drop_invalid_index(cur, statement):
+    # An interrupted concurrent build leaves an INVALID index that IF NOT EXISTS would skip
+    match = re.search(r"INDEX CONCURRENTLY IF NOT EXISTS (\w+)", statement)
+    if not match:
+        return
+    cur.execute("""
+        SELECT 1 FROM pg_class c
+        JOIN pg_index i ON i.indexrelid = c.oid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    """, (match.group(1),))
+    if cur.fetchone():
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+
+def get_schema_version(cur):
+    cur.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_migrations")
+    return cur.fetchone()['version']
+
+def run_migrations(target=None):
+    conn = connect_db()
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    # Poll instead of blocking so a waiting worker never holds a snapshot
+    # that a concurrent index build would have to wait for
+    while True:
+        cur.execute("SELECT pg_try_advisory_lock(%s) AS locked", (MIGRATION_LOCK_ID,))
+        if cur.fetchone()['locked']:
+            break
+        time.sleep(0.5)
+
+    try:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations(
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at DOUBLE PRECISION
+            )
+        """)
+        current = get_schema_version(cur)
+
+        for migration in MIGRATIONS:
+            version = migration['version']
+            if version <= current or (target is not None and version > target):
+                continue
+
+            print(f"Applying migration {version}: {migration['description']}")
+            if migration['concurrent']:
+                for statement in migration['statements']:
+                    _drop_invalid_index(cur, statement)
+                    cur.execute(statement)
+                cur.execute(
+                    "INSERT INTO schema_migrations(version, description, applied_at) VALUES (%s, %s, %s)",
+                    (version, migration['description'], time.time())
+                )
+            else:
+                cur.execute("BEGIN")
+                try:
+                    for statement in migration['statements']:
+                        cur.execute(statement)
+                    cur.execute(
+                        "INSERT INTO schema_migrations(version, description, applied_at) VALUES (%s, %s, %s)",
+                        (version, migration['description'], time.time())
+                    )
+                    cur.execute("COMMIT")
+                except Exception:
+                    cur.execute("ROLLBACK")
+                    raise
+            current = version
+
+        return current
+    finally:
+        cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        cur.close()
+        conn.close()
+
+@app.cli.command('migrate')
+@click.option('--target', type=int, default=None, help='Stop after this schema version')
+def migrate_command(target):
+    """Apply pending schema migrations."""
+    version = run_migrations(target)
+    click.echo(f"Schema at version {version}")
+
+# ==================== CACHING ==========================
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0,
+                'evictions': self._evictions
+            }
+
+dashboard_cache = TTLCache(app.config['DASHBOARD_CACHE_SIZE'], app.config['DASHBOARD_CACHE_TTL'])
+
+def invalidate_dashboard_stats(username=None):
+    dashboard_cache.delete(('admin',))
+    if username:
+        dashboard_cache.delete(('customer', username))
+
+# ==================== EQUIPMENT CATALOG ==========================
+
+class EquipmentCatalog:
+    """Per-worker copy of the equipment table, reloaded only when catalog_meta.version moves."""
+
+    def __init__(self, check_interval):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._items = []
+        self._active = []
+        self._next_check = 0.0
+        self._primary_next = False
+        self._loaded_at = 0.0
+        self._reloads = 0
+        self._checks = 0
+
+    def _refresh(self):
+        # After a local change read the primary; routine version checks may use a replica
+        conn = get_connection() if self._primary_next else get_read_connection()
+        self._primary_next = False
+        cur = conn.cursor()
+        # One snapshot for the version and the rows so they can never disagree
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cur.execute("SELECT version FROM catalog_meta WHERE id = 1")
+        version = cur.fetchone()['version']
+        self._checks += 1
+
+        # Versions only grow, so an older one can only come from a lagging replica
+        if self._version is None or version > self._version:
+            cur.execute("SELECT id, name, price, is_active FROM equipment ORDER BY id")
+            items = [dict(row) for row in cur.fetchall()]
+            self._items = items
+            self._active = [eq for eq in items if eq['is_active']]
+            self._version = version
+            self._loaded_at = time.time()
+            self._reloads += 1
+
+        conn.rollback()
+        cur.close()
+        conn.close()
+        self._next_check = time.monotonic() + self.check_interval
+
+    def _fresh(self):
+        if self._version is None or time.monotonic() >= self._next_check:
+            with self._lock:
+                if self._version is None or time.monotonic() >= self._next_check:
+                    self._refresh()
+
+    def version(self):
+        self._fresh()
+        return self._version
+
+    def all(self):
+        self._fresh()
+        return self._version, self._items
+
+    def active(self):
+        self._fresh()
+        return self._version, self._active
+
+    def invalidate(self):
+        self._primary_next = True
+        self._next_check = 0.0
+
+    def stats(self):
+        return {
+            'version': self._version,
+            'items': len(self._items),
+            'active': len(self._active),
+            'loaded_at': self._loaded_at,
+            'version_checks': self._checks,
+            'reloads': self._reloads
+        }
+
+catalog = EquipmentCatalog(app.config['CATALOG_CHECK_INTERVAL'])
+
+def bump_catalog_version(cur):
+    # Call inside the transaction that changes equipment so other workers see both together
+    cur.execute("UPDATE catalog_meta SET version = version + 1 WHERE id = 1 RETURNING version")
+    return cur.fetchone()['version']
+
 # ====================== SECURITY =========================
 
 def validate_password(password):
@@ -109,17 +1264,470 @@ def sanitize_input(text):
         return ""
     return str(text).replace("<", "").replace(">", "").replace("/", "")
 
+def ensure_audit_log_partitions(cur, ts=None, months_ahead=None):
+    # Creates the partition for the month holding ts and the following ones; returns the
+    # epoch at which the next month starts, i.e. when this needs to run again
+    ts = time.time() if ts is None else ts
+    months_ahead = app.config['AUDIT_PARTITIONS_AHEAD'] if months_ahead is None else months_ahead
+    cur.execute("""
+        SELECT ensure_audit_log_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', to_timestamp(%s) AT TIME ZONE 'UTC'),
+            date_trunc('month', to_timestamp(%s) AT TIME ZONE 'UTC') + %s * INTERVAL '1 month',
+            INTERVAL '1 month'
+        ) AS month
+    """, (ts, ts, months_ahead))
+    current = datetime.utcfromtimestamp(ts)
+    next_month = datetime(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return calendar.timegm(next_month.timetuple())
+
+class AuditLogWriter:
+    """Buffers audit events in memory and writes them in multi-row INSERT batches."""
+
+    def __init__(self, maxsize, batch_size, flush_interval, full_policy, block_timeout,
+                 write_retries, retry_backoff):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.write_retries = write_retries
+        self.retry_backoff = retry_backoff
+
+        self._queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self._enqueued = 0
+        self._dropped = 0
+        self._written = 0
+        self._failed = 0
+        self._retries = 0
+        self._batches = 0
+        self._last_flush_ms = 0.0
+        self._partitions_until = 0.0
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so every gunicorn worker starts its own writer
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(self._queue.maxsize)
+                self._stop = threading.Event()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, username, action):
+        self._ensure_started()
+        item = (username, action, time.time())
+        try:
+            if self.full_policy == 'drop':
+                self._queue.put_nowait(item)
+            else:
+                self._queue.put(item, timeout=self.block_timeout)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._enqueued += 1
+        return True
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if self._stop.is_set():
+                remaining = 0
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+                for _ in batch:
+                    self._queue.task_done()
+            elif self._stop.is_set():
+                return
+
+    def _write(self, batch):
+        # A batch is only given up on (and counted as failed) once every retry has failed. A commit
+        # whose outcome was lost can be written twice; a duplicate audit row beats a missing one.
+        for attempt in range(self.write_retries + 1):
+            try:
+                self._insert(batch)
+                return
+            except Exception as e:
+                if attempt == self.write_retries:
+                    app.logger.error("Audit log write failed, dropping %d events: %s", len(batch), e)
+                    with self._lock:
+                        self._failed += len(batch)
+                    return
+                delay = self.retry_backoff * (2 ** attempt)
+                app.logger.warning("Audit log write failed (%d events), retrying in %.1fs: %s", len(batch), delay, e)
+                with self._lock:
+                    self._retries += 1
+                time.sleep(delay)
+
+    def _insert(self, batch):
+        start = time.monotonic()
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            if batch[-1][2] >= self._partitions_until:
+                self._ensure_partitions(conn, cur, batch[-1][2])
+            execute_values(
+                cur,
+                "INSERT INTO audit_logs(username, action, timestamp) VALUES %s",
+                batch,
+                page_size=self.batch_size
+            )
+            conn.commit()
+            cur.close()
+            with self._lock:
+                self._written += len(batch)
+                self._batches += 1
+                self._last_flush_ms = round((time.monotonic() - start) * 1000, 3)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _ensure_partitions(self, conn, cur, ts):
+        # Runs about once a month per worker; events still land in the default partition if it fails
+        try:
+            self._partitions_until = ensure_audit_log_partitions(cur, ts)
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            self._partitions_until = ts + 60
+            app.logger.warning("Audit log partition maintenance failed: %s", e)
+
+    def flush(self):
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self, timeout=10):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'full_policy': self.full_policy,
+                'enqueued': self._enqueued,
+                'written': self._written,
+                'dropped': self._dropped,
+                'failed': self._failed,
+                'retries': self._retries,
+                'batches': self._batches,
+                'last_flush_ms': self._last_flush_ms
+            }
+
+audit_writer = AuditLogWriter(
+    app.config['AUDIT_QUEUE_SIZE'],
+    app.config['AUDIT_BATCH_SIZE'],
+    app.config['AUDIT_FLUSH_INTERVAL'],
+    app.config['AUDIT_QUEUE_FULL_POLICY'],
+    app.config['AUDIT_BLOCK_TIMEOUT'],
+    app.config['AUDIT_WRITE_RETRIES'],
+    app.config['AUDIT_RETRY_BACKOFF']
+)
+atexit.register(audit_writer.close)
+
 def log_action(username, action):
+    audit_writer.submit(username, action)
+
+def token_hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class TokenCache:
+    """LRU of verified JWTs (hash -> username, role, exp, issued_at) plus the revocation list."""
+
+    def __init__(self, maxsize, sync_interval, sync_overlap):
+        self.maxsize = maxsize
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+
+        self._entries = OrderedDict()
+        self._revoked_tokens = {}  # token hash -> expires_at
+        self._revoked_users = {}   # username -> tokens issued before this are invalid
+        self._lock = threading.Lock()
+        self._synced_at = 0.0
+        self._seen = {}  # token_revocations.id -> revoked_at, for rows inside the overlap window
+        self._next_sync = 0.0
+        self._pid = None
+
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry[2] <= now:
+                del self._entries[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key, username, role, exp, iat):
+        with self._lock:
+            self._entries[key] = (username, role, exp, iat)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def is_revoked(self, key, username, issued_at):
+        # issued_at is epoch seconds with millisecond precision (see token_issued_at)
+        with self._lock:
+            if key in self._revoked_tokens:
+                return True
+            revoked_at = self._revoked_users.get(username)
+            return revoked_at is not None and issued_at < revoked_at
+
+    def apply_revocation(self, key=None, username=None, revoked_at=None, expires_at=None):
+        now = time.time()
+        with self._lock:
+            if key:
+                self._revoked_tokens[key] = expires_at or now + TOKEN_LIFETIME.total_seconds()
+                self._entries.pop(key, None)
+            if username:
+                self._revoked_users[username] = max(self._revoked_users.get(username, 0), revoked_at or now)
+                for cached_key in [k for k, v in self._entries.items() if v[0] == username]:
+                    del self._entries[cached_key]
+
+            self._revoked_tokens = {k: exp for k, exp in self._revoked_tokens.items() if exp > now}
+            horizon = now - TOKEN_LIFETIME.total_seconds()
+            self._revoked_users = {u: at for u, at in self._revoked_users.items() if at > horizon}
+
+    def sync(self):
+        # Pull revocations issued by other workers at most once per interval
+        now = time.monotonic()
+        if self._pid == os.getpid() and now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._synced_at = 0.0
+            self._seen = {}
+
+        # Ids are assigned before commit, so a strict id watermark could step over a row
+        # that commits late; re-scan a recent window instead and skip rows already applied
+        started = time.time()
+        since = self._synced_at - self.sync_overlap if self._synced_at else 0.0
+        conn = None
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT id, token_hash, username, revoked_at, expires_at
+                FROM token_revocations
+                WHERE revoked_at > %s AND expires_at > %s
+                ORDER BY id
+            """, (since, started))
+            rows = cur.fetchall()
+            cur.close()
+        except Exception as e:
+            print(f"Token revocation sync failed: {str(e)}")
+            return
+        finally:
+            if conn is not None:
+                conn.close()
+
+        for row in rows:
+            if row['id'] not in self._seen:
+                self.apply_revocation(row['token_hash'], row['username'], row['revoked_at'], row['expires_at'])
+                self._seen[row['id']] = row['revoked_at']
+        self._synced_at = started
+        horizon = started - self.sync_overlap
+        self._seen = {rid: at for rid, at in self._seen.items() if at > horizon}
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.maxsize,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else 0,
+                'expired': self._expired,
+                'evictions': self._evictions,
+                'revoked_tokens': len(self._revoked_tokens),
+                'revoked_users': len(self._revoked_users)
+            }
+
+token_cache = TokenCache(
+    app.config['TOKEN_CACHE_SIZE'],
+    app.config['TOKEN_REVOCATION_SYNC_INTERVAL'],
+    app.config['TOKEN_REVOCATION_SYNC_OVERLAP']
+)
+
+def token_issued_at(data):
+    # JWT iat is whole seconds, too coarse to order against revoked_at; iat_ms carries the rest
+    if 'iat_ms' in data:
+        return data['iat_ms'] / 1000
+    return data.get('iat', 0)
+
+def _record_revocation(key, username, expires_at):
+    now = time.time()
+    token_cache.apply_revocation(key, username, now, expires_at)
+
     conn = get_connection()
     cur = conn.cursor()
+    cur.execute("DELETE FROM token_revocations WHERE expires_at <= %s", (now,))
     cur.execute(
-        "INSERT INTO audit_logs(username, action, timestamp) VALUES (%s,%s,%s)",
-        (username, action, time.time())
+        "INSERT INTO token_revocations(token_hash, username, revoked_at, expires_at) VALUES (%s, %s, %s, %s)",
+        (key, username, now, expires_at)
     )
     conn.commit()
     cur.close()
     conn.close()
 
+def revoke_token(token):
+    data = jwt.decode(token, options={"verify_signature": False})
+    _record_revocation(token_hash(token), None, data.get('exp', time.time() + TOKEN_LIFETIME.total_seconds()))
+
+def revoke_user_tokens(username):
+    # Every token issued up to now for this user stops working
+    _record_revocation(None, username, time.time() + TOKEN_LIFETIME.total_seconds())
+
+class LoginThrottle:
+    """Per-worker sliding windows of failed logins plus a mirror of users.lock_time.
+
+    Both only ever reject early; the users table stays the authority on lockouts. The username
+    window is keyed by client IP too, so failures from one address cannot shut the owner out.
+    """
+
+    def __init__(self, window, max_per_user, max_per_ip, max_keys):
+        self.window = window
+        self.max_per_user = max_per_user
+        self.max_per_ip = max_per_ip
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._failures = {}  # ('user' | 'ip', value) -> deque of monotonic times
+        self._locked = {}  # username -> lock_time (epoch seconds), as stored in users
+        self._locked_rejects = 0
+        self._throttled = 0
+        self._unknown_ip = 0
+
+    def _recent(self, key, now):
+        times = self._failures.get(key)
+        if not times:
+            return 0, None
+        while times and now - times[0] >= self.window:
+            times.popleft()
+        if not times:
+            del self._failures[key]
+            return 0, None
+        return len(times), times[0]
+
+    def check(self, username, ip):
+        # Returns (status, message, retry_after) for attempts that must not reach the database
+        with self._lock:
+            lock_time = self._locked.get(username)
+            if lock_time is not None:
+                remaining = lock_time - time.time()
+                if remaining > 0:
+                    self._locked_rejects += 1
+                    return 423, f'Account locked. Try again in {int(remaining)} seconds', int(remaining) + 1
+                del self._locked[username]
+
+            if ip is None:
+                self._unknown_ip += 1
+                return None
+            
+            now = time.monotonic()
+            for key, limit in ((('user', username, ip), self.max_per_user), (('ip', ip), self.max_per_ip)):
+                count, oldest = self._recent(key, now)
+                if count >= limit:
+                    self._throttled += 1
+                    retry_after = int(self.window - (now - oldest)) + 1
+                    return 429, f'Too many failed login attempts. Try again in {retry_after} seconds', retry_after
+        return None
+
+    def failed(self, username, ip):
+        if ip is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if len(self._failures) >= self.max_keys:
+                self._prune(now)
+            for key in (('user', username, ip), ('ip', ip)):
+                self._failures.setdefault(key, deque()).append(now)
+
+    def locked(self, username, lock_time):
+        with self._lock:
+            self._locked[username] = lock_time
+
+    def succeeded(self, username, ip):
+        with self._lock:
+            self._locked.pop(username, None)
+            self._failures.pop(('user', username, ip), None)
+
+    def _prune(self, now):
+        for key in list(self._failures):
+            self._recent(key, now)
+        wall = time.time()
+        self._locked = {u: t for u, t in self._locked.items() if t > wall}
+        # Still full of live keys: forget the oldest half rather than grow without bound
+        if len(self._failures) >= self.max_keys:
+            keep = sorted(self._failures.items(), key=lambda item: item[1][-1])[len(self._failures) // 2:]
+            self._failures = dict(keep)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tracked_keys': len(self._failures),
+                'locked_accounts': len(self._locked),
+                'locked_rejects': self._locked_rejects,
+                'throttled': self._throttled,
+                'unknown_ip': self._unknown_ip,
+                'window': self.window,
+                'max_per_user': self.max_per_user,
+                'max_per_ip': self.max_per_ip
+            }
+
+login_throttle = LoginThrottle(
+    app.config['LOGIN_THROTTLE_WINDOW'],
+    app.config['LOGIN_MAX_FAILURES_PER_USER'],
+    app.config['LOGIN_MAX_FAILURES_PER_IP'],
+    app.config['LOGIN_THROTTLE_MAX_KEYS']
+)
+
+def client_ip():
+    # None when the address is only a proxy's: forwarded, but TRUSTED_PROXY_COUNT is not set,
+    # so every client would share one throttle bucket
+    if not app.config['TRUSTED_PROXY_COUNT'] and 'X-Forwarded-For' in request.headers:
+        return None
+    return request.remote_addr or None
+
 # JWT Authentication Decorator
 def token_required(f):
     @wraps(f)
@@ -129,15 +1737,29 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
         
-        try:
-            if token.startswith('Bearer '):
-                token = token.split(' ')[1]
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = data['username']
-            current_role = data['role']
-        except:
-            return jsonify({'message': 'Token is invalid'}), 401
+        if token.startswith('Bearer '):
+            token = token.split(' ')[1]
+        
+        token_cache.sync()
+        key = token_hash(token)
+        cached = token_cache.get(key)
+        
+        if cached:
+            current_user, current_role = cached[0], cached[1]
+        else:
+            try:
+                data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+                current_user = data['username']
+                current_role = data['role']
+                issued_at = token_issued_at(data)
+                if token_cache.is_revoked(key, current_user, issued_at):
+                    return jsonify({'message': 'Token has been revoked'}), 401
+                token_cache.put(key, current_user, current_role, data['exp'], issued_at)
+            except:
+                return jsonify({'message': 'Token is invalid'}), 401
         
+        g.auth_token = token
+        g.current_user = current_user
         return f(current_user, current_role, *args, **kwargs)
     
     return decorated
@@ -164,55 +1786,516 @@ def get_current_season():
 
 # ==================== AI HELPER FUNCTIONS ==========================
 
-def call_huggingface_api(prompt, max_length=300):
-    try:
-        headers = {
-            "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
-            "Content-Type": "application/json"
-        }
+class CircuitOpen(Exception):
+    pass
 
-        payload = {
-            "model": HUGGINGFACE_MODEL,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": max_length,
-            "temperature": 0.7
-        }
+class HuggingFaceClient:
+    """Keep-alive session to the router with timeouts, jittered retries and a circuit breaker."""
 
-        response = requests.post(
-            "https://router.huggingface.co/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-        print("Status:", response.status_code)
-        print("Response:", response.text)
+    def __init__(self, url, connect_timeout, read_timeout, max_retries, backoff,
+                 pool_size, breaker_threshold, breaker_cooldown, total_timeout):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # Budget for the whole call, retries and sleeps included
+        self.total_timeout = total_timeout
+        self.pool_size = pool_size
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
 
-        if response.status_code == 200:
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-        else:
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        # Circuit breaker: closed -> open after N consecutive failures -> one half-open probe
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+        self._outcomes = {}
+        self._retries = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._last_error = None
+        self._ttft_count = 0
+        self._ttft_total = 0.0
+        self._ttft_max = 0.0
+
+    def _get_session(self):
+        if self._session is None or self._pid != os.getpid():
+            # Only the AI routes talk to the router; keep requests out of worker start-up
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Authorization": f"Bearer {HUGGINGFACE_API_KEY}",
+                "Content-Type": "application/json"
+            })
+            self._session = session
+            self._pid = os.getpid()
+        return self._session
+
+    def _before_call(self):
+        with self._lock:
+            if self._open_until == 0.0:
+                return
+            if time.monotonic() < self._open_until or self._probe_in_flight:
+                raise CircuitOpen()
+            self._probe_in_flight = True
+
+    def _after_call(self, ok):
+        with self._lock:
+            self._probe_in_flight = False
+            if ok:
+                self._consecutive_failures = 0
+                self._open_until = 0.0
+                return
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.breaker_threshold:
+                self._open_until = time.monotonic() + self.breaker_cooldown
+
+    def _record(self, outcome, elapsed=None, error=None):
+        HF_REQUESTS.labels(outcome).inc()
+        if elapsed is not None:
+            HF_LATENCY.labels(outcome).observe(elapsed)
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            if elapsed is not None:
+                self._latency_total += elapsed
+                self._latency_max = max(self._latency_max, elapsed)
+            if error:
+                self._last_error = error
+
+    def _sleep_before_retry(self, attempt, deadline, response=None):
+        """Sleeps before the next attempt; returns False instead when the wait would overrun the deadline."""
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            delay = max(delay, float(response.headers['Retry-After']))
+        # Leave at least the connect timeout for the attempt itself
+        if time.monotonic() + delay + self.timeout[0] >= deadline:
+            return False
+        with self._lock:
+            self._retries += 1
+        time.sleep(delay)
+        return True
+
+    def post(self, payload, stream=False):
+        """POST to the router. Returns the 200 response or None; raises CircuitOpen while tripped."""
+        try:
+            self._before_call()
+        except CircuitOpen:
+            self._record('short_circuited')
+            raise
+
+        import requests
+        start = time.monotonic()
+        deadline = start + self.total_timeout
+        outcome, error, response = 'error', None, None
+        try:
+            for attempt in range(self.max_retries + 1):
+                # No attempt may wait for the server beyond the deadline
+                timeout = (self.timeout[0], min(self.timeout[1], deadline - time.monotonic()))
+                try:
+                    response = self._get_session().post(self.url, json=payload, timeout=timeout, stream=stream)
+                    if response.status_code == 200:
+                        outcome = 'success'
+                        break
+                    outcome, error = f'http_{response.status_code}', response.text[:200]
+                except requests.exceptions.Timeout as e:
+                    # A read timeout already cost the full budget; do not multiply it
+                    outcome, error, response = 'timeout', str(e), None
+                    break
+                except requests.exceptions.ConnectionError as e:
+                    outcome, error, response = 'connection_error', str(e), None
+                    if attempt < self.max_retries and self._sleep_before_retry(attempt, deadline):
+                        continue
+                    break
+                except requests.exceptions.RequestException as e:
+                    if response is not None:
+                        response.close()
+                    outcome, error, response = 'request_error', str(e), None
+                    break
+
+                if (response.status_code in self.RETRY_STATUSES and attempt < self.max_retries
+                        and self._sleep_before_retry(attempt, deadline, response)):
+                    response.close()
+                    continue
+                response.close()
+                response = None
+                break
+        finally:
+            # Always settle the breaker, or a half-open probe that raised would leave it stuck
+            elapsed = time.monotonic() - start
+            self._after_call(outcome == 'success')
+            self._record(outcome, elapsed, error)
+
+        if outcome != 'success':
+            app.logger.warning("Hugging Face call failed: %s after %.2fs: %s", outcome, elapsed, error)
             return None
+        return response
 
-    except Exception as e:
-        print("HF Exception:", str(e))
+    def complete(self, prompt, max_length=300):
+        payload = {
+            "model": HUGGINGFACE_MODEL,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_length,
+            "temperature": 0.7
+        }
+        response = self.post(payload)
+        if response is None:
+            return None
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError) as e:
+            self._record('bad_response', error=str(e))
+            return None
+
+    def stream(self, prompt, max_length=300):
+        # Yields content deltas from the router's SSE stream (stream: true)
+        payload = {
+            "model": HUGGINGFACE_MODEL,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_length,
+            "temperature": 0.7,
+            "stream": True
+        }
+        response = self.post(payload, stream=True)
+        if response is None:
+            return
+        
+        import requests
+        response.encoding = 'utf-8'
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                choices = json.loads(data).get('choices') or []
+                text = choices[0].get('delta', {}).get('content') if choices else None
+                if text:
+                    yield text
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._record('stream_error', error=str(e))
+            raise
+        finally:
+            response.close()
+
+    def record_ttft(self, seconds):
+        HF_TTFT.observe(seconds)
+        with self._lock:
+            self._ttft_count += 1
+            self._ttft_total += seconds
+            self._ttft_max = max(self._ttft_max, seconds)
+
+    def stats(self):
+        with self._lock:
+            calls = sum(count for outcome, count in self._outcomes.items() if outcome != 'short_circuited')
+            if self._open_until == 0.0:
+                state = 'closed'
+            elif time.monotonic() < self._open_until:
+                state = 'open'
+            else:
+                state = 'half_open'
+            return {
+                'circuit': state,
+                'consecutive_failures': self._consecutive_failures,
+                'outcomes': dict(self._outcomes),
+                'retries': self._retries,
+                'avg_latency_ms': round(self._latency_total / calls * 1000, 1) if calls else 0,
+                'max_latency_ms': round(self._latency_max * 1000, 1),
+                'streams': self._ttft_count,
+                'avg_ttft_ms': round(self._ttft_total / self._ttft_count * 1000, 1) if self._ttft_count else 0,
+                'max_ttft_ms': round(self._ttft_max * 1000, 1),
+                'last_error': self._last_error
+            }
+
+hf_client = HuggingFaceClient(
+    HUGGINGFACE_API_URL,
+    app.config['HF_CONNECT_TIMEOUT'],
+    app.config['HF_READ_TIMEOUT'],
+    app.config['HF_MAX_RETRIES'],
+    app.config['HF_RETRY_BACKOFF'],
+    app.config['HF_POOL_SIZE'],
+    app.config['HF_BREAKER_THRESHOLD'],
+    app.config['HF_BREAKER_COOLDOWN'],
+    app.config['HF_TOTAL_TIMEOUT']
+)
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+class SingleFlight:
+    """Concurrent callers with the same key share one execution of fn.
+
+    Within a worker, followers wait on the leader's event. With shared=True the
+    leader also claims the key in ai_inflight_results (a row with a NULL
+    response) and publishes its result there, so leaders in other workers poll
+    for that answer instead of making their own upstream call. No transaction
+    is held while fn runs, and failed (None) results are never published.
+    """
+
+    poll_interval = 0.1
+
+    def __init__(self, wait_timeout, shared, shared_ttl):
+        self.wait_timeout = wait_timeout
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counts = {'leader': 0, 'coalesced': 0, 'shared_hit': 0, 'wait_timeout': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                self._count('coalesced')
+                return call.result
+            self._count('wait_timeout')
+            return fn()
+
+        try:
+            call.result = self._shared_do(key, fn) if self.shared else fn()
+            self._count('leader')
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _shared_do(self, key, fn):
+        try:
+            state, response = self._claim(key)
+            if state == 'wait':
+                response = self._wait_for_result(key)
+        except (PoolTimeout, psycopg2.Error) as e:
+            print(f"Shared single-flight unavailable: {str(e)}")
+            return fn()
+
+        if state != 'lead':
+            if response is not None:
+                self._count('shared_hit')
+                return response
+            # The other worker failed or ran past our wait; make our own call
+            self._count('wait_timeout')
+            return fn()
+
+        result = None
+        try:
+            result = fn()
+            return result
+        finally:
+            self._publish(key, result)
+
+    def _claim(self, key):
+        # Short transaction: the advisory lock only serialises the check-and-claim
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute("SET LOCAL lock_timeout = %s", (f"{int(self.wait_timeout * 1000)}ms",))
+            cur.execute("SELECT pg_advisory_xact_lock(('x' || substr(%s, 1, 16))::bit(64)::bigint)", (key,))
+            cur.execute("SELECT response, created_at FROM ai_inflight_results WHERE prompt_hash = %s", (key,))
+            row = cur.fetchone()
+            now = time.time()
+            if row and row['response'] is not None and row['created_at'] > now - self.shared_ttl:
+                state = 'hit'
+            elif row and row['response'] is None and row['created_at'] > now - self.wait_timeout:
+                state = 'wait'
+            else:
+                state = 'lead'
+                cur.execute("""
+                    INSERT INTO ai_inflight_results(prompt_hash, response, created_at)
+                    VALUES (%s, NULL, %s)
+                    ON CONFLICT (prompt_hash) DO UPDATE
+                    SET response = NULL, created_at = EXCLUDED.created_at
+                """, (key, now))
+            conn.commit()
+            cur.close()
+            return state, row['response'] if state == 'hit' else None
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _wait_for_result(self, key):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            conn = get_connection()
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT response FROM ai_inflight_results WHERE prompt_hash = %s", (key,))
+                row = cur.fetchone()
+                conn.rollback()
+                cur.close()
+            finally:
+                conn.close()
+            if row is None or row['response'] is not None:
+                # Published, or the claim was withdrawn after a failure
+                return row['response'] if row else None
         return None
 
-def parse_ai_recommendations(ai_text, equipment_list):
+    def _publish(self, key, result):
+        try:
+            conn = get_connection()
+        except PoolTimeout as e:
+            print(f"Shared single-flight publish skipped: {str(e)}")
+            return
+
+        try:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM ai_inflight_results WHERE created_at <= %s", (time.time() - self.shared_ttl,))
+            if result is None:
+                # Withdraw the claim so waiting workers retry rather than reuse a failure
+                cur.execute("DELETE FROM ai_inflight_results WHERE prompt_hash = %s AND response IS NULL", (key,))
+            else:
+                cur.execute("""
+                    INSERT INTO ai_inflight_results(prompt_hash, response, created_at)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (prompt_hash) DO UPDATE
+                    SET response = EXCLUDED.response, created_at = EXCLUDED.created_at
+                """, (key, result, time.time()))
+            conn.commit()
+            cur.close()
+        except psycopg2.Error as e:
+            print(f"Shared single-flight publish failed: {str(e)}")
+            conn.rollback()
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts, in_flight=len(self._calls), shared=self.shared)
+
+ai_singleflight = SingleFlight(
+    app.config['AI_SINGLEFLIGHT_WAIT'],
+    app.config['AI_SINGLEFLIGHT_SHARED'],
+    app.config['AI_SINGLEFLIGHT_SHARED_TTL']
+)
+
+def call_huggingface_api(prompt, max_length=300):
+    # None sends the AI routes down their 503 / fallback paths, including while the circuit is open
+    def call():
+        try:
+            return hf_client.complete(prompt, max_length)
+        except CircuitOpen:
+            return None
+
+    key = hashlib.sha256(f"{max_length}:{prompt}".encode()).hexdigest()
+    return ai_singleflight.do(key, call)
+
+class EquipmentNameMatcher:
+    """Aho-Corasick automaton over lowercased equipment names.
+
+    One pass over the text reports where each name first occurs, whatever
+    the size of the catalog.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for index, name in enumerate(names):
+            node = 0
+            for ch in name:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(index)
+
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, nxt in self._goto[node].items():
+                pending.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def first_positions(self, text):
+        found = {}
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for index in self._out[node]:
+                if index not in found:
+                    found[index] = pos - len(self.names[index]) + 1
+        return found
+
+_matcher_lock = threading.Lock()
+_matcher_cache = {'version': None, 'matcher': None, 'equipment': None}
+
+def get_equipment_matcher(equipment_list, catalog_version=None):
+    # Returns (matcher, equipment per pattern); rebuilt only when the catalog version changes
+    with _matcher_lock:
+        if catalog_version is not None and _matcher_cache['version'] == catalog_version:
+            return _matcher_cache['matcher'], _matcher_cache['equipment']
+
+    by_name = {}
+    for eq in equipment_list:
+        name = eq['name'].lower()
+        if name and name not in by_name:
+            by_name[name] = eq
+    matcher = EquipmentNameMatcher(list(by_name))
+    equipment = list(by_name.values())
+
+    if catalog_version is not None:
+        with _matcher_lock:
+            _matcher_cache.update(version=catalog_version, matcher=matcher, equipment=equipment)
+    return matcher, equipment
+
+def parse_ai_recommendations(ai_text, equipment_list, catalog_version=None):
     try:
         recommendations = []
         
-        priority = 1
-        for eq in equipment_list[:3]:
-            if eq['name'].lower() in ai_text.lower():
-                recommendations.append({
-                    "equipment": eq['name'],
-                    "reason": f"Recommended for your farm based on requirements. Price: ₹{eq['price']}/day",
-                    "priority": priority,
-                    "estimatedDays": 3 if priority == 1 else 2
-                })
-                priority += 1
+        matcher, equipment = get_equipment_matcher(equipment_list, catalog_version)
+        positions = matcher.first_positions(ai_text.lower())
+        
+        # Top 3 by where the model first mentions them
+        ranked = sorted(positions, key=positions.get)[:3]
+        for priority, index in enumerate(ranked, start=1):
+            eq = equipment[index]
+            recommendations.append({
+                "equipment": eq['name'],
+                "reason": f"Recommended for your farm based on requirements. Price: ₹{eq['price']}/day",
+                "priority": priority,
+                "estimatedDays": 3 if priority == 1 else 2
+            })
         
         if len(recommendations) == 0:
             for i, eq in enumerate(equipment_list[:3]):
@@ -223,10 +2306,8 @@ def parse_ai_recommendations(ai_text, equipment_list):
                     "estimatedDays": 3 - i
                 })
         
-        total_cost = sum([eq['price'] * rec['estimatedDays'] 
-                         for eq in equipment_list 
-                         for rec in recommendations 
-                         if eq['name'] == rec['equipment']])
+        price_by_name = {eq['name']: eq['price'] for eq in reversed(equipment_list)}
+        total_cost = sum(price_by_name[rec['equipment']] * rec['estimatedDays'] for rec in recommendations)
         
         return {
             "recommendations": recommendations,
@@ -239,6 +2320,120 @@ def parse_ai_recommendations(ai_text, equipment_list):
         print(f"Parse error: {str(e)}")
         return None
 
+# Farm size (acres) and budget (per day) are bucketed so near-identical forms share an answer
+FARM_SIZE_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+BUDGET_BUCKETS = [500, 1000, 2000, 5000, 10000, 20000, 50000]
+
+def _bucket(value, bounds):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+def _normalize_text(value):
+    return " ".join(str(value or "").lower().split())
+
+def recommendation_cache_key(data, catalog_version):
+    parts = [
+        catalog_version,
+        _bucket(data.get('farmSize'), FARM_SIZE_BUCKETS),
+        _normalize_text(data.get('cropType')),
+        _normalize_text(data.get('season')),
+        _bucket(data.get('budget'), BUDGET_BUCKETS),
+        _normalize_text(data.get('soilType'))
+    ]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+class RecommendationCache:
+    """In-memory LRU/TTL cache of parsed recommendations, optionally backed by Postgres."""
+
+    def __init__(self, maxsize, ttl, persist):
+        self.persist = persist
+        self._memory = TTLCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._db_hits = 0
+        self._db_misses = 0
+        self._db_errors = 0
+
+    def get(self, key):
+        result = self._memory.get(key)
+        if result is not None or not self.persist:
+            return result
+        
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT result, expires_at FROM ai_recommend_cache WHERE cache_key = %s AND expires_at > %s",
+                (key, time.time())
+            )
+            row = cur.fetchone()
+            cur.close()
+            conn.close()
+        except Exception as e:
+            print(f"Recommendation cache read failed: {str(e)}")
+            with self._lock:
+                self._db_errors += 1
+            return None
+        
+        with self._lock:
+            if row:
+                self._db_hits += 1
+            else:
+                self._db_misses += 1
+        if not row:
+            return None
+        
+        self._memory.set(key, row['result'], ttl=row['expires_at'] - time.time())
+        return row['result']
+
+    def set(self, key, result):
+        self._memory.set(key, result)
+        if not self.persist:
+            return
+        
+        now = time.time()
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("DELETE FROM ai_recommend_cache WHERE expires_at <= %s", (now,))
+            cur.execute("""
+                INSERT INTO ai_recommend_cache(cache_key, result, created_at, expires_at)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (cache_key) DO UPDATE
+                SET result = EXCLUDED.result, created_at = EXCLUDED.created_at, expires_at = EXCLUDED.expires_at
+            """, (key, json.dumps(result), now, now + self._memory.ttl))
+            conn.commit()
+            cur.close()
+            conn.close()
+        except Exception as e:
+            print(f"Recommendation cache write failed: {str(e)}")
+            with self._lock:
+                self._db_errors += 1
+
+    def stats(self):
+        stats = self._memory.stats()
+        with self._lock:
+            stats.update({
+                'persist': self.persist,
+                'db_hits': self._db_hits,
+                'db_misses': self._db_misses,
+                'db_errors': self._db_errors
+            })
+        lookups = stats['hits'] + stats['misses']
+        stats['overall_hit_ratio'] = round((stats['hits'] + stats['db_hits']) / lookups, 4) if lookups else 0
+        return stats
+
+recommendation_cache = RecommendationCache(
+    app.config['AI_CACHE_SIZE'],
+    app.config['AI_CACHE_TTL'],
+    app.config['AI_CACHE_PERSIST']
+)
+
 # ==================== AUTH ROUTES ==========================
 
 @app.route('/api/register', methods=['POST'])
@@ -275,6 +2470,7 @@ def register():
         cur.close()
         conn.close()
         
+        invalidate_dashboard_stats()
         log_action(username, 'USER_REGISTERED')
         return jsonify({'message': 'Registration successful'}), 201
     except Exception as e:
@@ -290,6 +2486,15 @@ def login():
     if not all([username, password]):
         return jsonify({'message': 'Username and password required'}), 400
     
+    # Locked accounts and throttled callers are turned away without a database round trip
+    ip = client_ip()
+    rejected = login_throttle.check(username, ip)
+    if rejected:
+        status, message, retry_after = rejected
+        response = jsonify({'message': message})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, status
+    
     conn = get_connection()
     cur = conn.cursor()
     
@@ -302,6 +2507,7 @@ def login():
     
     if not row:
         conn.close()
+        login_throttle.failed(username, ip)
         return jsonify({'message': 'Invalid credentials'}), 401
     
     role = row['role']
@@ -312,8 +2518,11 @@ def login():
     
     if lock_time and time.time() < lock_time:
         conn.close()
+        login_throttle.locked(username, lock_time)
         remaining = int(lock_time - time.time())
-        return jsonify({'message': f'Account locked. Try again in {remaining} seconds'}), 423
+        response = jsonify({'message': f'Account locked. Try again in {remaining} seconds'})
+        response.headers['Retry-After'] = str(remaining + 1)
+        return response, 423
     
     if db_pass == hash_password(password):
         cur.execute(
@@ -322,11 +2531,15 @@ def login():
         )
         conn.commit()
         conn.close()
+        login_throttle.succeeded(username, ip)
         
+        issued_at = datetime.utcnow()
         token = jwt.encode({
             'username': username,
             'role': role,
-            'exp': datetime.utcnow() + timedelta(hours=24)
+            'iat': issued_at,
+            'iat_ms': int(time.time() * 1000),
+            'exp': issued_at + TOKEN_LIFETIME
         }, app.config['SECRET_KEY'], algorithm="HS256")
         
         log_action(username, 'LOGIN_SUCCESS')
@@ -339,6 +2552,7 @@ def login():
             'name': name
         }), 200
     else:
+        login_throttle.failed(username, ip)
         attempts += 1
         if attempts >= 3:
             lock_until = time.time() + 30
@@ -348,8 +2562,11 @@ def login():
             )
             conn.commit()
             conn.close()
+            login_throttle.locked(username, lock_until)
             log_action(username, 'LOGIN_FAIL_LOCKED')
-            return jsonify({'message': 'Account locked for 30 seconds due to multiple failed attempts'}), 423
+            response = jsonify({'message': 'Account locked for 30 seconds due to multiple failed attempts'})
+            response.headers['Retry-After'] = '30'
+            return response, 423
         else:
             cur.execute(
                 "UPDATE users SET failed_attempts=%s WHERE username=%s",
@@ -360,21 +2577,37 @@ def login():
             log_action(username, 'LOGIN_FAIL')
             return jsonify({'message': 'Invalid credentials'}), 401
 
+@app.route('/api/logout', methods=['POST'])
+@token_required
+def logout(current_user, current_role):
+    revoke_token(g.auth_token)
+    log_action(current_user, 'LOGOUT')
+    return jsonify({'message': 'Logged out'}), 200
+
+@app.route('/api/users/<username>/revoke-tokens', methods=['POST'])
+@token_required
+@admin_required
+def revoke_tokens(current_user, current_role, username):
+    revoke_user_tokens(username)
+    log_action(current_user, f'TOKENS_REVOKED: {username}')
+    return jsonify({'message': f'All sessions for {username} revoked'}), 200
+
 # ==================== EQUIPMENT ROUTES ==========================
 
 @app.route('/api/equipment', methods=['GET'])
 @token_required
 def get_equipment(current_user, current_role):
-    conn = get_connection()
-    cur = conn.cursor()
+    version, equipment = catalog.active()
+    etag = f"catalog-{version}"
     
-    cur.execute("SELECT id, name, price, is_active FROM equipment WHERE is_active = TRUE")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(equipment)
     
-    equipment = [dict(row) for row in rows]
-    return jsonify(equipment), 200
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/api/equipment', methods=['POST'])
 @token_required
@@ -402,11 +2635,14 @@ def add_equipment(current_user, current_role):
         "INSERT INTO equipment (name, price) VALUES (%s, %s) RETURNING id",
         (name, price)
     )
+    equipment_id = cur.fetchone()['id']
+    bump_catalog_version(cur)
     
     conn.commit()
-    equipment_id = cur.fetchone()['id']
     cur.close()
     conn.close()
+    catalog.invalidate()
+    invalidate_dashboard_stats()
     
     log_action(current_user, f'EQUIPMENT_ADDED: {name}')
     
@@ -415,6 +2651,166 @@ def add_equipment(current_user, current_role):
         'id': equipment_id
     }), 201
 
+TRUE_VALUES = ('true', '1', 'yes', 'y', 'active')
+FALSE_VALUES = ('false', '0', 'no', 'n', 'inactive')
+
+def read_import_records(fmt, stream):
+    # Yields (line, record or None, error) without reading the whole body into memory
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        fields = [field.strip().lower() for field in reader.fieldnames or []]
+        if 'name' not in fields or 'price' not in fields:
+            raise ValueError('CSV header must include name and price columns')
+        reader.fieldnames = fields
+        for record in reader:
+            yield reader.line_num, record, None
+    else:
+        for line, raw in enumerate(text, start=1):
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                yield line, None, 'Invalid JSON'
+                continue
+            if not isinstance(record, dict):
+                yield line, None, 'Each line must be a JSON object'
+                continue
+            yield line, record, None
+
+def validate_import_record(record):
+    # Returns ((name, price, is_active), None) or (None, error)
+    name = sanitize_input(record.get('name')).strip()
+    if not name:
+        return None, 'Name is required'
+    if '\x00' in name:
+        return None, 'Name contains invalid characters'
+    
+    try:
+        price = float(record.get('price'))
+    except (TypeError, ValueError):
+        return None, 'Invalid price format'
+    if not math.isfinite(price) or price < 0:
+        return None, 'Price must be positive'
+    
+    is_active = record.get('is_active')
+    if is_active is None or is_active == '':
+        is_active = True
+    elif not isinstance(is_active, bool):
+        value = str(is_active).strip().lower()
+        if value not in TRUE_VALUES + FALSE_VALUES:
+            return None, 'is_active must be true or false'
+        is_active = value in TRUE_VALUES
+    
+    return (name, price, is_active), None
+
+@app.route('/api/equipment/import', methods=['POST'])
+@token_required
+@admin_required
+def import_equipment(current_user, current_role):
+    # Body is CSV (name,price[,is_active]) or NDJSON; rows are matched to existing equipment by name
+    fmt = request.args.get('format')
+    if not fmt:
+        fmt = 'ndjson' if 'json' in (request.mimetype or '') else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'message': 'Format must be csv or ndjson'}), 400
+    
+    max_rows = app.config['EQUIPMENT_IMPORT_MAX_ROWS']
+    max_errors = app.config['EQUIPMENT_IMPORT_MAX_ERRORS']
+    errors = []
+    rejected = 0
+    seen = {}
+    
+    # Valid rows are written straight into a COPY buffer that only spills to disk when large
+    buffer = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode='w+', newline='')
+    writer = csv.writer(buffer)
+    try:
+        for line, record, error in read_import_records(fmt, request.stream):
+            if error is None:
+                row, error = validate_import_record(record)
+            if error is None and row[0] in seen:
+                error = f'Duplicate name (first seen on line {seen[row[0]]})'
+            if error is not None:
+                rejected += 1
+                if len(errors) < max_errors:
+                    errors.append({'line': line, 'error': error})
+                continue
+            if len(seen) >= max_rows:
+                buffer.close()
+                return jsonify({'message': f'An import can hold at most {max_rows} rows'}), 413
+            seen[row[0]] = line
+            writer.writerow((line,) + row)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        buffer.close()
+        return jsonify({'message': f'Could not read import: {str(e)}'}), 400
+    
+    if not seen:
+        buffer.close()
+        return jsonify({
+            'message': 'No valid rows to import',
+            'inserted': 0,
+            'updated': 0,
+            'rejected': rejected,
+            'errors': errors
+        }), 400
+    
+    buffer.seek(0)
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            CREATE TEMP TABLE equipment_import(
+                line INTEGER,
+                name TEXT,
+                price REAL,
+                is_active BOOLEAN
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert("COPY equipment_import (line, name, price, is_active) FROM STDIN WITH (FORMAT csv)", buffer)
+        
+        # Serialize with other equipment writers so two imports cannot both insert a new name
+        cur.execute("LOCK TABLE equipment IN SHARE ROW EXCLUSIVE MODE")
+        cur.execute("""
+            UPDATE equipment e
+            SET price = s.price, is_active = s.is_active
+            FROM equipment_import s
+            WHERE e.name = s.name
+              AND (e.price, e.is_active) IS DISTINCT FROM (s.price, s.is_active)
+        """)
+        updated = cur.rowcount
+        cur.execute("""
+            INSERT INTO equipment (name, price, is_active)
+            SELECT s.name, s.price, s.is_active
+            FROM equipment_import s
+            WHERE NOT EXISTS (SELECT 1 FROM equipment e WHERE e.name = s.name)
+            ORDER BY s.line
+        """)
+        inserted = cur.rowcount
+        version = bump_catalog_version(cur) if inserted or updated else None
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        return jsonify({'message': f'Import failed: {str(e)}'}), 500
+    finally:
+        buffer.close()
+        cur.close()
+        conn.close()
+    
+    if version is not None:
+        catalog.invalidate()
+        invalidate_dashboard_stats()
+    log_action(current_user, f'EQUIPMENT_IMPORTED: {inserted} added, {updated} updated, {rejected} rejected')
+    
+    return jsonify({
+        'message': 'Import complete',
+        'inserted': inserted,
+        'updated': updated,
+        'rejected': rejected,
+        'errors': errors,
+        'catalog_version': version if version is not None else catalog.version()
+    }), 200
+
 @app.route('/api/equipment/<int:equipment_id>/deactivate', methods=['PUT'])
 @token_required
 @admin_required
@@ -427,15 +2823,18 @@ def deactivate_equipment(current_user, current_role, equipment_id):
         (equipment_id,)
     )
     
-    conn.commit()
-    
     if cur.rowcount == 0:
+        conn.rollback()
         cur.close()
         conn.close()
         return jsonify({'message': 'Equipment not found or already inactive'}), 404
     
+    bump_catalog_version(cur)
+    conn.commit()
     cur.close()
     conn.close()
+    catalog.invalidate()
+    invalidate_dashboard_stats()
     log_action(current_user, f'EQUIPMENT_DEACTIVATED: ID {equipment_id}')
     
     return jsonify({'message': 'Equipment deactivated successfully'}), 200
@@ -452,15 +2851,18 @@ def activate_equipment(current_user, current_role, equipment_id):
         (equipment_id,)
     )
     
-    conn.commit()
-    
     if cur.rowcount == 0:
+        conn.rollback()
         cur.close()
         conn.close()
         return jsonify({'message': 'Equipment not found or already active'}), 404
     
+    bump_catalog_version(cur)
+    conn.commit()
     cur.close()
     conn.close()
+    catalog.invalidate()
+    invalidate_dashboard_stats()
     log_action(current_user, f'EQUIPMENT_ACTIVATED: ID {equipment_id}')
     
     return jsonify({'message': 'Equipment activated successfully'}), 200
@@ -469,15 +2871,7 @@ def activate_equipment(current_user, current_role, equipment_id):
 @token_required
 @admin_required
 def get_all_equipment(current_user, current_role):
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    cur.execute("SELECT id, name, price, is_active FROM equipment")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    
-    equipment = [dict(row) for row in rows]
+    version, equipment = catalog.all()
     return jsonify(equipment), 200
 
 # ==================== RENTAL ROUTES ==========================
@@ -504,74 +2898,149 @@ def create_rental(current_user, current_role):
     conn = get_connection()
     cur = conn.cursor()
     
-    cur.execute("SELECT price, is_active FROM equipment WHERE id = %s", (equipment_id,))
+    # Price lookup, availability check and insert in one statement; FOR SHARE makes a
+    # concurrent deactivation either wait for this rental or be seen by it
+    cur.execute("""
+        INSERT INTO rentals(username, equipment_id, days, total, status)
+        SELECT %s, id, %s, price * %s, 'rented'
+        FROM equipment
+        WHERE id = %s AND is_active
+        FOR SHARE
+        RETURNING id, total
+    """, (current_user, days, days, equipment_id))
     row = cur.fetchone()
     
     if not row:
+        conn.rollback()
+        cur.execute("SELECT 1 FROM equipment WHERE id = %s", (equipment_id,))
+        exists = cur.fetchone()
         cur.close()
         conn.close()
-        return jsonify({'message': 'Equipment not found'}), 404
-    
-    if not row['is_active']:
-        cur.close()
-        conn.close()
+        if not exists:
+            return jsonify({'message': 'Equipment not found'}), 404
         return jsonify({'message': 'Equipment is not available'}), 400
     
-    price = row['price']
-    total = price * days
-    
-    cur.execute(
-        "INSERT INTO rentals(username, equipment_id, days, total, status) VALUES (%s, %s, %s, %s, %s) RETURNING id",
-        (current_user, equipment_id, days, total, 'rented')
-    )
-    
     conn.commit()
-    rental_id = cur.fetchone()['id']
     cur.close()
     conn.close()
     
+    invalidate_dashboard_stats(current_user)
     log_action(current_user, f'RENT_EQUIPMENT: ID {equipment_id}')
     
     return jsonify({
         'message': 'Equipment rented successfully',
-        'rental_id': rental_id,
-        'total': total
+        'rental_id': row['id'],
+        'total': row['total']
     }), 201
 
-@app.route('/api/rentals/my', methods=['GET'])
+@app.route('/api/rentals/cart', methods=['POST'])
 @token_required
-def get_my_rentals(current_user, current_role):
+def create_rental_cart(current_user, current_role):
+    # Rents every item or none: {"items": [{"equipment_id": 1, "days": 3}, ...]}
+    data = request.get_json() or {}
+    items = data.get('items')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'At least one item is required'}), 400
+    if len(items) > app.config['RENTAL_CART_MAX_ITEMS']:
+        return jsonify({'message': f"A cart can hold at most {app.config['RENTAL_CART_MAX_ITEMS']} items"}), 400
+    
+    values = []
+    try:
+        for position, item in enumerate(items):
+            equipment_id = int(item.get('equipment_id'))
+            days = int(item.get('days'))
+            if days <= 0:
+                return jsonify({'message': 'Days must be positive'}), 400
+            values.append((position, current_user, equipment_id, days))
+    except (AttributeError, TypeError, ValueError):
+        return jsonify({'message': 'Invalid input format'}), 400
+    
     conn = get_connection()
     cur = conn.cursor()
     
-    cur.execute("""
-        SELECT 
-            r.id,
-            e.name as equipment_name,
-            r.days,
-            r.total,
-            r.status
-        FROM rentals r
-        JOIN equipment e ON r.equipment_id = e.id
-        WHERE r.username = %s
-        ORDER BY r.id DESC
-    """, (current_user,))
+    rows = execute_values(cur, """
+        INSERT INTO rentals(username, equipment_id, days, total, status)
+        SELECT i.username, e.id, i.days, e.price * i.days, 'rented'
+        FROM (VALUES %s) AS i(position, username, equipment_id, days)
+        JOIN equipment e ON e.id = i.equipment_id AND e.is_active
+        ORDER BY i.position
+        FOR SHARE OF e
+        RETURNING id, equipment_id, days, total
+    """, values, template="(%s, %s, %s, %s)", page_size=len(values), fetch=True)
     
-    rows = cur.fetchall()
+    if len(rows) != len(values):
+        conn.rollback()
+        rented = {row['equipment_id'] for row in rows}
+        unavailable = sorted({item[2] for item in values if item[2] not in rented})
+        cur.close()
+        conn.close()
+        return jsonify({
+            'message': 'Some equipment is not available',
+            'unavailable': unavailable
+        }), 400
+    
+    conn.commit()
     cur.close()
     conn.close()
     
-    rentals = [dict(row) for row in rows]
-    return jsonify(rentals), 200
+    # Serial ids follow insertion order, which follows the cart order
+    rentals = [
+        {'rental_id': row['id'], 'equipment_id': row['equipment_id'], 'days': row['days'], 'total': row['total']}
+        for row in sorted(rows, key=lambda row: row['id'])
+    ]
+    
+    invalidate_dashboard_stats(current_user)
+    for rental in rentals:
+        log_action(current_user, f"RENT_EQUIPMENT: ID {rental['equipment_id']}")
+    
+    return jsonify({
+        'message': f'{len(rentals)} items rented successfully',
+        'rentals': rentals,
+        'grand_total': sum(rental['total'] for rental in rentals)
+    }), 201
 
-@app.route('/api/rentals', methods=['GET'])
-@token_required
-@admin_required
-def get_all_rentals(current_user, current_role):
-    conn = get_connection()
+def fetch_rentals_page(username=None):
+    # Keyset pagination on r.id DESC; ?limit=&after=<id>&status=&equipment_id=
+    try:
+        limit = int(request.args.get('limit', app.config['RENTALS_PAGE_SIZE']))
+        after = request.args.get('after')
+        after = int(after) if after else None
+        equipment_id = request.args.get('equipment_id')
+        equipment_id = int(equipment_id) if equipment_id else None
+    except ValueError:
+        return jsonify({'message': 'Invalid pagination parameters'}), 400
+    
+    if limit <= 0:
+        return jsonify({'message': 'Limit must be positive'}), 400
+    limit = min(limit, app.config['RENTALS_MAX_PAGE_SIZE'])
+    
+    status = request.args.get('status')
+    if status and status not in ('rented', 'returned'):
+        return jsonify({'message': 'Invalid status filter'}), 400
+    
+    conditions = []
+    params = []
+    if username is not None:
+        conditions.append("r.username = %s")
+        params.append(username)
+    if status:
+        conditions.append("r.status = %s")
+        params.append(status)
+    if equipment_id is not None:
+        conditions.append("r.equipment_id = %s")
+        params.append(equipment_id)
+    if after is not None:
+        conditions.append("r.id < %s")
+        params.append(after)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit + 1)
+    
+    conn = get_read_connection()
     cur = conn.cursor()
     
-    cur.execute("""
+    cur.execute(f"""
         SELECT 
             r.id,
             r.username,
@@ -581,15 +3050,32 @@ def get_all_rentals(current_user, current_role):
             r.status
         FROM rentals r
         JOIN equipment e ON r.equipment_id = e.id
+        {where}
         ORDER BY r.id DESC
-    """)
+        LIMIT %s
+    """, params)
     
     rows = cur.fetchall()
     cur.close()
     conn.close()
     
-    rentals = [dict(row) for row in rows]
-    return jsonify(rentals), 200
+    rentals = [dict(row) for row in rows[:limit]]
+    next_cursor = rentals[-1]['id'] if len(rows) > limit else None
+    return jsonify({
+        'rentals': rentals,
+        'next_cursor': next_cursor
+    }), 200
+
+@app.route('/api/rentals/my', methods=['GET'])
+@token_required
+def get_my_rentals(current_user, current_role):
+    return fetch_rentals_page(username=current_user)
+
+@app.route('/api/rentals', methods=['GET'])
+@token_required
+@admin_required
+def get_all_rentals(current_user, current_role):
+    return fetch_rentals_page()
 
 @app.route('/api/rentals/<int:rental_id>/return', methods=['PUT'])
 @token_required
@@ -598,19 +3084,30 @@ def return_rental(current_user, current_role, rental_id):
     cur = conn.cursor()
     
     cur.execute(
-        "UPDATE rentals SET status = 'returned' WHERE id = %s AND username = %s AND status = 'rented'",
+        "UPDATE rentals SET status = 'returned' WHERE id = %s AND username = %s AND status = 'rented' RETURNING equipment_id, total",
         (rental_id, current_user)
     )
+    row = cur.fetchone()
     
-    conn.commit()
-    
-    if cur.rowcount == 0:
+    if not row:
+        conn.rollback()
         cur.close()
         conn.close()
         return jsonify({'message': 'Rental not found or already returned'}), 404
     
+    # Revenue aggregates move in the same transaction as the status change
+    cur.execute("""
+        INSERT INTO equipment_revenue(equipment_id, revenue, rental_count)
+        VALUES (%s, %s, 1)
+        ON CONFLICT (equipment_id) DO UPDATE
+        SET revenue = equipment_revenue.revenue + EXCLUDED.revenue,
+            rental_count = equipment_revenue.rental_count + 1
+    """, (row['equipment_id'], row['total']))
+    
+    conn.commit()
     cur.close()
     conn.close()
+    invalidate_dashboard_stats(current_user)
     log_action(current_user, f'RETURN_EQUIPMENT: Rental ID {rental_id}')
     
     return jsonify({'message': 'Equipment returned successfully'}), 200
@@ -621,17 +3118,17 @@ def return_rental(current_user, current_role, rental_id):
 @token_required
 @admin_required
 def get_revenue_report(current_user, current_role):
-    conn = get_connection()
+    conn = get_read_connection()
     cur = conn.cursor()
     
     cur.execute("""
         SELECT 
             e.name,
-            SUM(r.total) as revenue,
-            COUNT(r.id) as rental_count
-        FROM rentals r
-        JOIN equipment e ON r.equipment_id = e.id
-        WHERE r.status = 'returned'
+            SUM(v.revenue) as revenue,
+            SUM(v.rental_count) as rental_count
+        FROM equipment_revenue v
+        JOIN equipment e ON v.equipment_id = e.id
+        WHERE v.rental_count > 0
         GROUP BY e.name
         ORDER BY revenue DESC
     """)
@@ -641,9 +3138,8 @@ def get_revenue_report(current_user, current_role):
     report = [dict(row) for row in rows]
     
     cur.execute("""
-        SELECT SUM(total) as grand_total
-        FROM rentals
-        WHERE status = 'returned'
+        SELECT SUM(revenue) as grand_total
+        FROM equipment_revenue
     """)
     
     total_row = cur.fetchone()
@@ -657,98 +3153,650 @@ def get_revenue_report(current_user, current_role):
         'grand_total': grand_total
     }), 200
 
-@app.route('/api/audit-logs', methods=['GET'])
-@token_required
-@admin_required
-def get_audit_logs(current_user, current_role):
-    conn = get_connection()
-    cur = conn.cursor()
-    
+def compare_revenue_aggregates(cur):
     cur.execute("""
-        SELECT id, username, action, timestamp
-        FROM audit_logs
-        ORDER BY timestamp DESC
-        LIMIT 100
+        SELECT
+            COALESCE(v.equipment_id, f.equipment_id) as equipment_id,
+            COALESCE(v.revenue, 0) as stored_revenue,
+            COALESCE(v.rental_count, 0) as stored_count,
+            COALESCE(f.revenue, 0) as actual_revenue,
+            COALESCE(f.rental_count, 0) as actual_count
+        FROM equipment_revenue v
+        FULL OUTER JOIN (
+            SELECT equipment_id, SUM(total) as revenue, COUNT(*) as rental_count
+            FROM rentals
+            WHERE status = 'returned'
+            GROUP BY equipment_id
+        ) f ON f.equipment_id = v.equipment_id
     """)
     
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    mismatches = []
+    for row in cur.fetchall():
+        if row['stored_count'] != row['actual_count'] or abs(row['stored_revenue'] - row['actual_revenue']) > 0.01:
+            mismatches.append(dict(row))
+    return mismatches
+
+def rebuild_revenue_aggregates(cur):
+    # Blocks concurrent returns for the duration so nothing lands between delete and insert
+    cur.execute("LOCK TABLE equipment_revenue IN EXCLUSIVE MODE")
+    cur.execute("DELETE FROM equipment_revenue")
+    cur.execute("""
+        INSERT INTO equipment_revenue(equipment_id, revenue, rental_count)
+        SELECT equipment_id, SUM(total), COUNT(*)
+        FROM rentals
+        WHERE status = 'returned'
+        GROUP BY equipment_id
+    """)
+
+@app.cli.command('revenue-verify')
+@click.option('--rebuild', is_flag=True, help='Recompute the aggregates from rentals if they drifted')
+def revenue_verify_command(rebuild):
+    """Check equipment_revenue against a full recompute over rentals."""
+    conn = connect_db()
+    cur = conn.cursor()
     
-    logs = []
-    for row in rows:
-        log_dict = dict(row)
-        log_dict['readable_time'] = time.strftime(
-            "%Y-%m-%d %H:%M:%S",
-            time.localtime(log_dict['timestamp'])
+    mismatches = compare_revenue_aggregates(cur)
+    for row in mismatches:
+        click.echo(
+            f"equipment {row['equipment_id']}: stored {row['stored_revenue']} / {row['stored_count']} rentals, "
+            f"actual {row['actual_revenue']} / {row['actual_count']} rentals"
         )
-        logs.append(log_dict)
     
-    return jsonify(logs), 200
+    if mismatches and rebuild:
+        rebuild_revenue_aggregates(cur)
+        conn.commit()
+        click.echo(f"Rebuilt revenue aggregates ({len(mismatches)} equipment corrected)")
+    else:
+        conn.rollback()
+    
+    cur.close()
+    conn.close()
+    
+    if not mismatches:
+        click.echo("Revenue aggregates match")
+    elif not rebuild:
+        raise SystemExit(1)
 
-# ==================== STATS ==========================
+def format_audit_log(row):
+    log_dict = dict(row)
+    log_dict['readable_time'] = time.strftime(
+        "%Y-%m-%d %H:%M:%S",
+        time.localtime(log_dict['timestamp'])
+    )
+    return log_dict
 
-@app.route('/api/stats/dashboard', methods=['GET'])
+@app.route('/api/audit-logs', methods=['GET'])
 @token_required
-def get_dashboard_stats(current_user, current_role):
-    conn = get_connection()
+@admin_required
+def get_audit_logs(current_user, current_role):
+    conn = get_read_connection()
     cur = conn.cursor()
     
-    stats = {}
+    cur.execute("""
+        SELECT id, username, action, timestamp
+        FROM audit_logs
+        ORDER BY timestamp DESC, id DESC
+        LIMIT 100
+    """)
     
-    if current_role == 'admin':
-        cur.execute("SELECT COUNT(*) as count FROM equipment WHERE is_active = TRUE")
-        stats['total_equipment'] = cur.fetchone()['count']
-        
-        cur.execute("SELECT COUNT(*) as count FROM rentals WHERE status = 'rented'")
-        stats['active_rentals'] = cur.fetchone()['count']
-        
-        cur.execute("SELECT SUM(total) as revenue FROM rentals WHERE status = 'returned'")
-        revenue = cur.fetchone()['revenue']
-        stats['total_revenue'] = revenue if revenue else 0
-        
-        cur.execute("SELECT COUNT(*) as count FROM users WHERE role = 'customer'")
-        stats['total_customers'] = cur.fetchone()['count']
-    else:
-        cur.execute("SELECT COUNT(*) as count FROM rentals WHERE username = %s AND status = 'rented'", (current_user,))
-        stats['active_rentals'] = cur.fetchone()['count']
-        
-        cur.execute("SELECT COUNT(*) as count FROM rentals WHERE username = %s", (current_user,))
-        stats['total_rentals'] = cur.fetchone()['count']
-        
-        cur.execute("SELECT SUM(total) as spent FROM rentals WHERE username = %s", (current_user,))
-        spent = cur.fetchone()['spent']
-        stats['total_spent'] = spent if spent else 0
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
     
+    return jsonify([format_audit_log(row) for row in rows]), 200
+
+@app.route('/api/audit-logs/search', methods=['GET'])
+@token_required
+@admin_required
+def search_audit_logs(current_user, current_role):
+    # Newest first, keyset paginated on (timestamp, id):
+    # ?username=&action=<prefix>&from=&to=&limit=&after=<timestamp>:<id>
+    try:
+        limit = int(request.args.get('limit', app.config['AUDIT_SEARCH_PAGE_SIZE']))
+        start = parse_time_arg('from')
+        end = parse_time_arg('to')
+        after = request.args.get('after')
+        if after:
+            after_ts, after_id = after.split(':')
+            after = (float(after_ts), int(after_id))
+    except ValueError:
+        return jsonify({'message': 'Invalid search parameters'}), 400
+    
+    if limit <= 0:
+        return jsonify({'message': 'Limit must be positive'}), 400
+    limit = min(limit, app.config['AUDIT_SEARCH_MAX_PAGE_SIZE'])
+    
+    # Every bound is on the partition key as a plain comparison so the planner can prune partitions
+    conditions = []
+    params = []
+    username = request.args.get('username')
+    if username:
+        conditions.append("username = %s")
+        params.append(username)
+    action = request.args.get('action')
+    if action:
+        conditions.append("action LIKE %s")
+        params.append(action.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+    if start is not None:
+        conditions.append("timestamp >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("timestamp < %s")
+        params.append(end)
+    if after:
+        conditions.append("timestamp <= %s AND (timestamp, id) < (%s, %s)")
+        params.extend([after[0], after[0], after[1]])
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit + 1)
+    
+    conn = get_read_connection()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT id, username, action, timestamp
+        FROM audit_logs
+        {where}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT %s
+    """, params)
+    rows = cur.fetchall()
     cur.close()
     conn.close()
-    return jsonify(stats), 200
+    
+    logs = [format_audit_log(row) for row in rows[:limit]]
+    next_cursor = f"{logs[-1]['timestamp']!r}:{logs[-1]['id']}" if len(rows) > limit else None
+    return jsonify({
+        'logs': logs,
+        'next_cursor': next_cursor
+    }), 200
 
-# ==================== AI ROUTES ==========================
+# ==================== EXPORTS ==========================
 
-@app.route('/api/ai/recommend', methods=['POST'])
+def parse_time_value(value):
+    # Accepts epoch seconds or an ISO date/datetime
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def parse_time_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return parse_time_value(value)
+
+def stream_export(query, params, columns, fmt, filename):
+    def generate():
+        # Check out inside the generator: a body that is never iterated (HEAD, early disconnect)
+        # never takes a connection, and the finally covers everything from execute() on
+        conn = get_read_connection()
+        cur = None
+        try:
+            # Named cursor = server-side cursor, so rows are pulled from Postgres chunk by chunk
+            cur = conn.cursor(name=f"export_{uuid.uuid4().hex}")
+            cur.itersize = app.config['EXPORT_CHUNK_SIZE']
+            cur.execute(query, params)
+            
+            if fmt == 'csv':
+                buf = io.StringIO()
+                csv.writer(buf).writerow(columns)
+                yield buf.getvalue()
+            
+            while True:
+                rows = cur.fetchmany(app.config['EXPORT_CHUNK_SIZE'])
+                if not rows:
+                    break
+                buf = io.StringIO()
+                if fmt == 'csv':
+                    writer = csv.writer(buf)
+                    for row in rows:
+                        writer.writerow([row[col] for col in columns])
+                else:
+                    for row in rows:
+                        buf.write(json.dumps(dict(row), default=str))
+                        buf.write("\n")
+                yield buf.getvalue()
+        finally:
+            if cur is not None and not cur.closed:
+                try:
+                    cur.close()
+                except psycopg2.Error:
+                    pass
+            conn.close()
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{extension}'}
+    )
+
+def export_filters(time_column, username_column='username'):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError('Format must be csv or ndjson')
+    
+    conditions = []
+    params = []
+    username = request.args.get('username')
+    if username:
+        conditions.append(f"{username_column} = %s")
+        params.append(username)
+    
+    start = parse_time_arg('from')
+    if start is not None:
+        conditions.append(f"{time_column} >= %s")
+        params.append(start)
+    end = parse_time_arg('to')
+    if end is not None:
+        conditions.append(f"{time_column} < %s")
+        params.append(end)
+    
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return fmt, where, params
+
+@app.route('/api/export/rentals', methods=['GET'])
 @token_required
-def ai_recommend(current_user, current_role):
+@admin_required
+def export_rentals(current_user, current_role):
     try:
-        data = request.get_json()
+        fmt, where, params = export_filters('r.created_at', 'r.username')
+    except ValueError as e:
+        return jsonify({'message': f'Invalid export parameters: {str(e)}'}), 400
+    
+    columns = ['id', 'username', 'equipment_id', 'equipment_name', 'days', 'total', 'status', 'created_at']
+    query = f"""
+        SELECT r.id, r.username, r.equipment_id, e.name as equipment_name,
+               r.days, r.total, r.status, r.created_at
+        FROM rentals r
+        JOIN equipment e ON r.equipment_id = e.id
+        {where}
+        ORDER BY r.id
+    """
+    
+    log_action(current_user, 'EXPORT_RENTALS')
+    return stream_export(query, params, columns, fmt, 'rentals')
+
+@app.route('/api/export/audit-logs', methods=['GET'])
+@token_required
+@admin_required
+def export_audit_logs(current_user, current_role):
+    try:
+        fmt, where, params = export_filters('timestamp')
+    except ValueError as e:
+        return jsonify({'message': f'Invalid export parameters: {str(e)}'}), 400
+    
+    columns = ['id', 'username', 'action', 'timestamp']
+    query = f"""
+        SELECT id, username, action, timestamp
+        FROM audit_logs
+        {where}
+        ORDER BY timestamp, id
+    """
+    
+    log_action(current_user, 'EXPORT_AUDIT_LOGS')
+    return stream_export(query, params, columns, fmt, 'audit_logs')
+
+# ==================== AUDIT ARCHIVE ==========================
+
+# Archived chunks are gzip NDJSON files ordered by (timestamp, id). manifest.json lists them with
+# their key range and sha256; a chunk is in the manifest before any of its rows are deleted.
+AUDIT_ARCHIVE_LOCK_ID = 7410003
+
+class ArchiveUnavailable(RuntimeError):
+    pass
+
+def require_archive_dir(archive_dir):
+    # Refuse anything that would not outlive this instance: unset, inside the app, or not mounted
+    if not archive_dir:
+        raise ArchiveUnavailable("AUDIT_ARCHIVE_DIR is not set; point it at durable storage before archiving")
+    archive_dir = os.path.abspath(archive_dir)
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    if os.path.commonpath([archive_dir, app_dir]) == app_dir:
+        raise ArchiveUnavailable(f"AUDIT_ARCHIVE_DIR {archive_dir} is inside the application directory, which a redeploy replaces")
+    if not os.path.isdir(archive_dir):
+        raise ArchiveUnavailable(f"AUDIT_ARCHIVE_DIR {archive_dir} does not exist; is the volume mounted?")
+    return archive_dir
+
+def _manifest_path(archive_dir):
+    return os.path.join(archive_dir, 'manifest.json')
+
+def load_archive_manifest(archive_dir):
+    try:
+        with open(_manifest_path(archive_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'version': 1, 'chunks': []}
+
+def _write_atomically(path, write):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def save_archive_manifest(archive_dir, manifest):
+    _write_atomically(_manifest_path(archive_dir), lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _delete_archived(conn, cur, cutoff, low, high, delete_batch, pause):
+    # Deletes rows with low <= (timestamp, id) <= high, at most delete_batch per transaction
+    deleted = 0
+    while True:
+        cur.execute("""
+            DELETE FROM audit_logs
+            WHERE (timestamp, id) IN (
+                SELECT timestamp, id FROM audit_logs
+                WHERE timestamp < %s AND timestamp >= %s AND timestamp <= %s
+                  AND (timestamp, id) >= (%s, %s) AND (timestamp, id) <= (%s, %s)
+                ORDER BY timestamp, id
+                LIMIT %s
+            )
+        """, (cutoff, low[0], high[0], low[0], low[1], high[0], high[1], delete_batch))
+        count = cur.rowcount
+        conn.commit()
+        deleted += count
+        if count < delete_batch:
+            return deleted
+        time.sleep(pause)
+
+def _drop_empty_partitions(conn, cur, cutoff):
+    # Month partitions that end before the cutoff and were emptied by the archive go away entirely
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit_logs'::regclass AND c.relname ~ '^audit_logs_[0-9]{4}_[0-9]{2}$'
+    """)
+    dropped = []
+    for row in cur.fetchall():
+        year, month = (int(part) for part in row['relname'].split('_')[2:])
+        month_end = calendar.timegm(datetime(year + month // 12, month % 12 + 1, 1).timetuple())
+        if month_end > cutoff:
+            continue
+        cur.execute(f"SELECT 1 FROM {row['relname']} LIMIT 1")
+        if cur.fetchone() is None:
+            cur.execute(f"DROP TABLE {row['relname']}")
+            dropped.append(row['relname'])
+    conn.commit()
+    return dropped
+
+def archive_audit_logs(cutoff, archive_dir, chunk_rows, delete_batch, pause=0.0, dry_run=False, echo=print):
+    archive_dir = require_archive_dir(archive_dir)
+    conn = connect_db()
+    cur = conn.cursor()
+    cur.execute("SELECT pg_try_advisory_lock(%s) AS locked", (AUDIT_ARCHIVE_LOCK_ID,))
+    if not cur.fetchone()['locked']:
+        conn.close()
+        raise ArchiveUnavailable("Another audit archive run is in progress")
+    conn.commit()
+    
+    summary = {'chunks': 0, 'archived': 0, 'deleted': 0, 'dropped_partitions': []}
+    try:
+        manifest = load_archive_manifest(archive_dir)
+        last_key = (0.0, 0)
+        if manifest['chunks']:
+            last = manifest['chunks'][-1]
+            last_key = (last['max_timestamp'], last['max_id'])
+            # Chunks are deleted one at a time right after being recorded, so only the
+            # last one can still have rows left behind by an interrupted run
+            if not dry_run:
+                summary['deleted'] += _delete_archived(
+                    conn, cur, cutoff, (last['min_timestamp'], last['min_id']), last_key, delete_batch, pause
+                )
         
-        farm_size = data.get('farmSize')
-        crop_type = data.get('cropType')
-        season = data.get('season')
-        budget = data.get('budget')
-        soil_type = data.get('soilType')
+        while True:
+            cur.execute("""
+                SELECT id, username, action, timestamp
+                FROM audit_logs
+                WHERE timestamp < %s AND timestamp >= %s AND (timestamp, id) > (%s, %s)
+                ORDER BY timestamp, id
+                LIMIT %s
+            """, (cutoff, last_key[0], last_key[0], last_key[1], chunk_rows))
+            rows = cur.fetchall()
+            conn.commit()
+            if not rows:
+                break
+            
+            first, last = rows[0], rows[-1]
+            if dry_run:
+                echo(f"Would archive {len(rows)} rows up to {datetime.utcfromtimestamp(last['timestamp']).isoformat()}Z")
+            else:
+                name = f"audit_{first['timestamp']:.6f}_{first['id']}_{last['timestamp']:.6f}_{last['id']}.ndjson.gz"
+                path = os.path.join(archive_dir, name)
+                
+                def write_chunk(f):
+                    with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+                        for row in rows:
+                            gz.write(json.dumps(dict(row)).encode())
+                            gz.write(b"\n")
+                _write_atomically(path, write_chunk)
+                
+                manifest['chunks'].append({
+                    'file': name,
+                    'rows': len(rows),
+                    'sha256': file_sha256(path),
+                    'min_timestamp': first['timestamp'],
+                    'min_id': first['id'],
+                    'max_timestamp': last['timestamp'],
+                    'max_id': last['id'],
+                    'archived_at': time.time()
+                })
+                save_archive_manifest(archive_dir, manifest)
+                summary['deleted'] += _delete_archived(
+                    conn, cur, cutoff, (first['timestamp'], first['id']), (last['timestamp'], last['id']), delete_batch, pause
+                )
+                echo(f"Archived {len(rows)} rows to {name}")
+            
+            summary['chunks'] += 1
+            summary['archived'] += len(rows)
+            last_key = (last['timestamp'], last['id'])
         
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT id, name, price FROM equipment WHERE is_active = TRUE")
-        equipment = cur.fetchall()
+        if not dry_run:
+            summary['dropped_partitions'] = _drop_empty_partitions(conn, cur, cutoff)
+        return summary
+    finally:
+        conn.rollback()
+        cur.execute("SELECT pg_advisory_unlock(%s)", (AUDIT_ARCHIVE_LOCK_ID,))
         cur.close()
         conn.close()
+
+def iter_archived_audit_logs(archive_dir, start=None, end=None, username=None, action=None):
+    # Scans only the chunks whose range overlaps [start, end); each is checked against its checksum first
+    archive_dir = require_archive_dir(archive_dir)
+    for chunk in load_archive_manifest(archive_dir)['chunks']:
+        if start is not None and chunk['max_timestamp'] < start:
+            continue
+        if end is not None and chunk['min_timestamp'] >= end:
+            continue
         
-        equipment_list = [dict(eq) for eq in equipment]
-        equipment_text = "\n".join([f"- {eq['name']}: ₹{eq['price']}/day" for eq in equipment_list])
+        path = os.path.join(archive_dir, chunk['file'])
+        if file_sha256(path) != chunk['sha256']:
+            raise ValueError(f"Checksum mismatch for archive chunk {chunk['file']}")
         
-        prompt = f"""You are an agricultural equipment expert. Recommend farming equipment for:
+        with gzip.open(path, 'rt') as f:
+            for line in f:
+                record = json.loads(line)
+                if start is not None and record['timestamp'] < start:
+                    continue
+                if end is not None and record['timestamp'] >= end:
+                    break
+                if username and record['username'] != username:
+                    continue
+                if action and not (record['action'] or '').startswith(action):
+                    continue
+                yield record
+
+@app.cli.command('audit-archive')
+@click.option('--older-than-days', type=float, default=None, help='Retention period (default AUDIT_RETENTION_DAYS)')
+@click.option('--dry-run', is_flag=True, help='Report what would be archived without writing or deleting')
+def audit_archive_command(older_than_days, dry_run):
+    """Move old audit_logs rows into compressed archive files."""
+    days = app.config['AUDIT_RETENTION_DAYS'] if older_than_days is None else older_than_days
+    cutoff = time.time() - days * 86400
+    try:
+        summary = archive_audit_logs(
+            cutoff,
+            app.config['AUDIT_ARCHIVE_DIR'],
+            app.config['AUDIT_ARCHIVE_CHUNK_ROWS'],
+            app.config['AUDIT_ARCHIVE_DELETE_BATCH'],
+            app.config['AUDIT_ARCHIVE_BATCH_PAUSE'],
+            dry_run,
+            click.echo
+        )
+    except ArchiveUnavailable as e:
+        raise click.ClickException(str(e))
+    if dry_run:
+        click.echo(f"Dry run: {summary['archived']} rows in {summary['chunks']} chunks would be archived")
+        return
+    click.echo(
+        f"{summary['archived']} rows in {summary['chunks']} chunks archived, {summary['deleted']} deleted, "
+        f"{len(summary['dropped_partitions'])} empty partitions dropped"
+    )
+
+def _time_option(ctx, param, value):
+    try:
+        return parse_time_value(value)
+    except ValueError:
+        raise click.BadParameter(f"{value!r} is neither epoch seconds nor an ISO date")
+
+@app.cli.command('audit-archive-search')
+@click.option('--from', 'start', required=True, callback=_time_option, help='Start time, epoch seconds or ISO date')
+@click.option('--to', 'end', required=True, callback=_time_option, help='End time (exclusive), epoch seconds or ISO date')
+@click.option('--username', default=None)
+@click.option('--action', default=None, help='Action prefix, e.g. RENT_EQUIPMENT')
+def audit_archive_search_command(start, end, username, action):
+    """Print archived audit events in a time range as NDJSON."""
+    try:
+        archive_dir = require_archive_dir(app.config['AUDIT_ARCHIVE_DIR'])
+        for record in iter_archived_audit_logs(archive_dir, start, end, username, action):
+            click.echo(json.dumps(record))
+    except ArchiveUnavailable as e:
+        raise click.ClickException(str(e))
+    except (ValueError, OSError) as e:
+        # Missing or corrupt chunk: stop with an error rather than a traceback
+        raise click.ClickException(str(e))
+
+@app.route('/api/audit-logs/archive', methods=['GET'])
+@token_required
+@admin_required
+def search_archived_audit_logs(current_user, current_role):
+    # Streams archived events as NDJSON; from and to are required so a request never scans every chunk by accident
+    try:
+        start = parse_time_arg('from')
+        end = parse_time_arg('to')
+    except ValueError:
+        return jsonify({'message': 'Invalid time range'}), 400
+    if start is None or end is None:
+        return jsonify({'message': 'from and to are required'}), 400
+    try:
+        archive_dir = require_archive_dir(app.config['AUDIT_ARCHIVE_DIR'])
+    except ArchiveUnavailable as e:
+        print(f"Audit archive search unavailable: {str(e)}")
+        return jsonify({'message': 'Audit archive is not configured'}), 503
+    
+    records = iter_archived_audit_logs(
+        archive_dir, start, end, request.args.get('username'), request.args.get('action')
+    )
+    
+    def generate():
+        try:
+            for record in records:
+                yield json.dumps(record) + "\n"
+        except (ValueError, OSError) as e:
+            # Missing or corrupt chunk: end the stream with an error record rather than silently truncating
+            yield json.dumps({'error': str(e)}) + "\n"
+    
+    log_action(current_user, 'AUDIT_ARCHIVE_SEARCHED')
+    return Response(generate(), mimetype='application/x-ndjson')
+
+# ==================== STATS ==========================
+
+@app.route('/api/stats/dashboard', methods=['GET'])
+@token_required
+def get_dashboard_stats(current_user, current_role):
+    key = ('admin',) if current_role == 'admin' else ('customer', current_user)
+    stats = dashboard_cache.get(key)
+    if stats is not None:
+        return jsonify(stats), 200
+    
+    conn = get_read_connection()
+    cur = conn.cursor()
+    
+    if current_role == 'admin':
+        cur.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM equipment WHERE is_active = TRUE) as total_equipment,
+                (SELECT COUNT(*) FROM rentals WHERE status = 'rented') as active_rentals,
+                (SELECT COALESCE(SUM(revenue), 0) FROM equipment_revenue) as total_revenue,
+                (SELECT COUNT(*) FROM users WHERE role = 'customer') as total_customers
+        """)
+    else:
+        cur.execute("""
+            SELECT
+                COUNT(*) FILTER (WHERE status = 'rented') as active_rentals,
+                COUNT(*) as total_rentals,
+                COALESCE(SUM(total), 0) as total_spent
+            FROM rentals
+            WHERE username = %s
+        """, (current_user,))
+    
+    stats = dict(cur.fetchone())
+    cur.close()
+    conn.close()
+    
+    dashboard_cache.set(key, stats)
+    return jsonify(stats), 200
+
+@app.route('/api/stats/runtime', methods=['GET'])
+@token_required
+@admin_required
+def get_runtime_stats(current_user, current_role):
+    return jsonify({
+        'pid': os.getpid(),
+        'startup': startup.stats(),
+        'db_pool': get_pool().stats(),
+        'login_throttle': login_throttle.stats(),
+        'replicas': replicas.stats() if replicas is not None else None,
+        'audit_log': audit_writer.stats(),
+        'token_cache': token_cache.stats(),
+        'catalog': catalog.stats(),
+        'dashboard_cache': dashboard_cache.stats(),
+        'recommendation_cache': recommendation_cache.stats(),
+        'huggingface': hf_client.stats(),
+        'ai_singleflight': ai_singleflight.stats(),
+        'ai_jobs': ai_jobs.stats(),
+        'contract_cache': contract_cache.stats()
+    }), 200
+
+# ==================== AI ROUTES ==========================
+
+def recommend_equipment(current_user, data):
+    # Returns (body, status, cache state); shared by the route and the job runner
+    farm_size = data.get('farmSize')
+    crop_type = data.get('cropType')
+    season = data.get('season')
+    budget = data.get('budget')
+    soil_type = data.get('soilType')
+    
+    version, equipment_list = catalog.active()
+    cache_key = recommendation_cache_key(data, version)
+    cached = recommendation_cache.get(cache_key)
+    if cached is not None:
+        log_action(current_user, 'AI_RECOMMENDATION_REQUESTED')
+        return cached, 200, 'HIT'
+    
+    equipment_text = "\n".join([f"- {eq['name']}: ₹{eq['price']}/day" for eq in equipment_list])
+    
+    prompt = f"""You are an agricultural equipment expert. Recommend farming equipment for:
 
 Farm: {farm_size} acres
 Crop: {crop_type}
@@ -761,41 +3809,43 @@ Available Equipment:
 
 Recommend the top 3 most suitable equipment with brief reasons."""
 
-        ai_response = call_huggingface_api(prompt, max_length=500)
+    ai_response = call_huggingface_api(prompt, max_length=500)
+    
+    if ai_response:
+        result = parse_ai_recommendations(ai_response, equipment_list, version)
         
-        if ai_response:
-            result = parse_ai_recommendations(ai_response, equipment_list)
-            
-            if result:
-                log_action(current_user, 'AI_RECOMMENDATION_REQUESTED')
-                return jsonify(result), 200
-            else:
-                return jsonify({'error': 'Failed to parse AI response'}), 500
+        if result:
+            recommendation_cache.set(cache_key, result)
+            log_action(current_user, 'AI_RECOMMENDATION_REQUESTED')
+            return result, 200, 'MISS'
         else:
-            return jsonify({'error': 'AI service temporarily unavailable'}), 503
+            return {'error': 'Failed to parse AI response'}, 500, None
+    else:
+        return {'error': 'AI service temporarily unavailable'}, 503, None
+
+@app.route('/api/ai/recommend', methods=['POST'])
+@token_required
+def ai_recommend(current_user, current_role):
+    try:
+        data = request.get_json()
+        body, status, cache_state = recommend_equipment(current_user, data)
+        
+        response = jsonify(body)
+        if cache_state:
+            response.headers['X-Cache'] = cache_state
+        return response, status
             
     except Exception as e:
         print(f"AI Recommendation Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/ai/chat', methods=['POST'])
-@token_required
-def ai_chat(current_user, current_role):
-    try:
-        data = request.get_json()
-        question = data.get('question')
-        
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT name, price FROM equipment WHERE is_active = TRUE")
-        equipment = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        equipment_list = ", ".join([eq['name'] for eq in equipment])
-        
-        prompt = f"""You are AgriBot, a farming equipment rental assistant.
+def build_chat_prompt(question):
+    version, equipment = catalog.active()
+    
+    equipment_list = ", ".join([eq['name'] for eq in equipment])
+    
+    return f"""You are AgriBot, a farming equipment rental assistant.
 
 Available Equipment: {equipment_list}
 Season: {get_current_season()}
@@ -804,22 +3854,35 @@ Question: {question}
 
 Provide a helpful, concise answer (under 150 words) about farming equipment."""
 
-        ai_response = call_huggingface_api(prompt, max_length=300)
+def answer_chat(current_user, data):
+    question = data.get('question')
+    
+    prompt = build_chat_prompt(question)
+
+    ai_response = call_huggingface_api(prompt, max_length=300)
+    
+    if ai_response:
+        if prompt in ai_response:
+            ai_response = ai_response.replace(prompt, "").strip()
         
-        if ai_response:
-            if prompt in ai_response:
-                ai_response = ai_response.replace(prompt, "").strip()
-            
-            log_action(current_user, 'AI_CHAT_QUERY')
-            return jsonify({
-                'response': ai_response if ai_response else "I'm here to help with farming equipment questions!",
-                'timestamp': time.time()
-            }), 200
-        else:
-            return jsonify({
-                'response': "I'm temporarily unavailable. Please try again in a moment.",
-                'timestamp': time.time()
-            }), 200
+        log_action(current_user, 'AI_CHAT_QUERY')
+        return {
+            'response': ai_response if ai_response else "I'm here to help with farming equipment questions!",
+            'timestamp': time.time()
+        }, 200
+    else:
+        return {
+            'response': "I'm temporarily unavailable. Please try again in a moment.",
+            'timestamp': time.time()
+        }, 200
+
+@app.route('/api/ai/chat', methods=['POST'])
+@token_required
+def ai_chat(current_user, current_role):
+    try:
+        data = request.get_json()
+        body, status = answer_chat(current_user, data)
+        return jsonify(body), status
             
     except Exception as e:
         print(f"AI Chat Error: {str(e)}")
@@ -829,31 +3892,267 @@ Provide a helpful, concise answer (under 150 words) about farming equipment."""
         }), 200
 
 
-@app.route('/api/ai/contract', methods=['POST'])
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/api/ai/chat/stream', methods=['POST'])
 @token_required
-def ai_generate_contract(current_user, current_role):
+def ai_chat_stream(current_user, current_role):
+    data = request.get_json(silent=True) or {}
+    question = data.get('question') if isinstance(data, dict) else None
+    if not isinstance(question, str) or not question.strip():
+        return jsonify({'message': 'question is required'}), 400
+    
+    prompt = build_chat_prompt(question)
+    start = time.monotonic()
+    
+    def generate():
+        ttft = None
+        delivered = 0
+        try:
+            try:
+                for text in hf_client.stream(prompt, max_length=300):
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+                        hf_client.record_ttft(ttft)
+                    delivered += 1
+                    yield sse_event('token', {'text': text})
+            except CircuitOpen:
+                pass
+            except Exception as e:
+                print(f"AI Chat Stream Error: {str(e)}")
+            
+            if delivered == 0:
+                yield sse_event('error', {'response': "I'm temporarily unavailable. Please try again in a moment."})
+            yield sse_event('done', {
+                'timestamp': time.time(),
+                'ttft_ms': round(ttft * 1000, 1) if ttft is not None else None
+            })
+        finally:
+            # Runs when the stream completes or the client goes away
+            if delivered:
+                log_action(current_user, 'AI_CHAT_QUERY')
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# ==================== AI JOBS ==========================
+
+class JobQueueFull(Exception):
+    pass
+
+AI_JOB_RUNNERS = {
+    'recommend': lambda username, data: recommend_equipment(username, data)[:2],
+    'chat': answer_chat
+}
+
+class AIJobQueue:
+    """Runs AI requests on a bounded per-worker thread pool; job state lives in ai_jobs
+    so any gunicorn worker can answer a status poll."""
+
+    def __init__(self, workers, queue_depth, ttl):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.ttl = ttl
+
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._events = {}  # job id -> Event, for jobs running in this worker
+        self._pending = 0
+        self._running = 0
+
+        self._counts = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-job")
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, username, kind, data):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_depth:
+                self._counts['rejected'] += 1
+                raise JobQueueFull()
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        try:
+            conn = get_connection()
+            cur = conn.cursor()
+            cur.execute("DELETE FROM ai_jobs WHERE expires_at <= %s", (now,))
+            cur.execute(
+                "INSERT INTO ai_jobs(id, username, kind, status, created_at, expires_at) VALUES (%s, %s, %s, 'queued', %s, %s)",
+                (job_id, username, kind, now, now + self.ttl)
+            )
+            conn.commit()
+            cur.close()
+            conn.close()
+
+            with self._lock:
+                self._events[job_id] = threading.Event()
+                self._counts['submitted'] += 1
+            self._get_executor().submit(self._run, job_id, username, kind, data, time.monotonic())
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+                self._events.pop(job_id, None)
+            raise
+        return job_id
+
+    def _update(self, job_id, status, **fields):
+        fields['status'] = status
+        assignments = ", ".join(f"{column} = %s" for column in fields)
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(f"UPDATE ai_jobs SET {assignments} WHERE id = %s", (*fields.values(), job_id))
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    def _run(self, job_id, username, kind, data, enqueued_at):
+        waited = time.monotonic() - enqueued_at
+        with self._lock:
+            self._running += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        outcome = 'failed'
+        try:
+            self._update(job_id, 'running', started_at=time.time())
+            try:
+                body, result_status = AI_JOB_RUNNERS[kind](username, data)
+                outcome = 'done'
+            except Exception as e:
+                print(f"AI Job Error ({kind}): {str(e)}")
+                body, result_status = {'error': str(e)}, 500
+            now = time.time()
+            self._update(
+                job_id, outcome,
+                result=json.dumps(body), result_status=result_status,
+                finished_at=now, expires_at=now + self.ttl
+            )
+        except Exception as e:
+            outcome = 'failed'
+            print(f"AI Job bookkeeping failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._counts['completed' if outcome == 'done' else 'failed'] += 1
+                event = self._events.pop(job_id, None)
+            if event:
+                event.set()
+
+    def get(self, job_id):
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM ai_jobs WHERE id = %s AND expires_at > %s", (job_id, time.time()))
+        row = cur.fetchone()
+        cur.close()
+        conn.close()
+        return dict(row) if row else None
+
+    def wait(self, job_id, timeout):
+        # Long-poll: block on the local event if the job runs here, otherwise poll the table
+        deadline = time.monotonic() + timeout
+        event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+            return self.get(job_id)
+
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in ('done', 'failed') or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(0.5, max(deadline - time.monotonic(), 0)))
+
+    def stats(self):
+        with self._lock:
+            started = self._counts['completed'] + self._counts['failed'] + self._running
+            return dict(
+                self._counts,
+                workers=self.workers,
+                queue_depth=self.queue_depth,
+                queued=self._pending - self._running,
+                running=self._running,
+                avg_wait_ms=round(self._wait_total / started * 1000, 1) if started else 0,
+                max_wait_ms=round(self._wait_max * 1000, 1)
+            )
+
+ai_jobs = AIJobQueue(app.config['AI_JOB_WORKERS'], app.config['AI_JOB_QUEUE_DEPTH'], app.config['AI_JOB_TTL'])
+
+@app.route('/api/ai/jobs', methods=['POST'])
+@token_required
+def create_ai_job(current_user, current_role):
+    data = request.get_json() or {}
+    kind = data.get('kind')
+    
+    if kind not in AI_JOB_RUNNERS:
+        return jsonify({'message': f"Job kind must be one of: {', '.join(AI_JOB_RUNNERS)}"}), 400
+    
     try:
-        data = request.get_json()
-        
-        customer_name = data.get('customerName')
-        equipment_name = data.get('equipmentName')
-        days = data.get('days')
-        start_date = data.get('startDate')
-        daily_rate = data.get('dailyRate')
-        total_cost = data.get('totalCost')
-        deposit = data.get('deposit', total_cost * 0.2 if total_cost else 0)
-        
-        contract_html = f"""
+        job_id = ai_jobs.submit(current_user, kind, data.get('input') or {})
+    except JobQueueFull:
+        response = jsonify({'message': 'AI queue is full, please retry shortly'})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/ai/jobs/{job_id}'
+    }), 202
+
+@app.route('/api/ai/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_ai_job(current_user, current_role, job_id):
+    try:
+        wait = min(float(request.args.get('wait', 0)), app.config['AI_JOB_MAX_WAIT'])
+    except ValueError:
+        return jsonify({'message': 'Invalid wait parameter'}), 400
+    
+    job = ai_jobs.wait(job_id, wait) if wait > 0 else ai_jobs.get(job_id)
+    
+    if not job or (job['username'] != current_user and current_role != 'admin'):
+        return jsonify({'message': 'Job not found or expired'}), 404
+    
+    response = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+        'expires_at': job['expires_at']
+    }
+    if job['status'] in ('done', 'failed'):
+        response['result'] = job['result']
+        response['result_status'] = job['result_status']
+    
+    return jsonify(response), 200
+
+# ==================== CONTRACTS ==========================
+
+# Compiled once; every field is HTML-escaped before substitution
+CONTRACT_TEMPLATE = Template("""
 <!DOCTYPE html>
 <html>
 <head>
     <style>
-        body {{ font-family: Arial, sans-serif; margin: 40px; }}
-        h1 {{ color: #2c3e50; text-align: center; }}
-        h2 {{ color: #34495e; border-bottom: 2px solid #3498db; padding-bottom: 5px; }}
-        .section {{ margin: 20px 0; }}
-        .detail {{ margin: 10px 0; }}
-        .signature {{ margin-top: 50px; display: flex; justify-content: space-between; }}
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        h1 { color: #2c3e50; text-align: center; }
+        h2 { color: #34495e; border-bottom: 2px solid #3498db; padding-bottom: 5px; }
+        .section { margin: 20px 0; }
+        .detail { margin: 10px 0; }
+        .signature { margin-top: 50px; display: flex; justify-content: space-between; }
     </style>
 </head>
 <body>
@@ -861,13 +4160,13 @@ def ai_generate_contract(current_user, current_role):
     
     <div class="section">
         <h2>RENTAL DETAILS</h2>
-        <div class="detail"><strong>Customer Name:</strong> {customer_name}</div>
-        <div class="detail"><strong>Equipment:</strong> {equipment_name}</div>
-        <div class="detail"><strong>Rental Period:</strong> {days} days</div>
-        <div class="detail"><strong>Start Date:</strong> {start_date}</div>
-        <div class="detail"><strong>Daily Rate:</strong> ₹{daily_rate}</div>
-        <div class="detail"><strong>Total Cost:</strong> ₹{total_cost}</div>
-        <div class="detail"><strong>Security Deposit:</strong> ₹{deposit}</div>
+        <div class="detail"><strong>Customer Name:</strong> $customer_name</div>
+        <div class="detail"><strong>Equipment:</strong> $equipment_name</div>
+        <div class="detail"><strong>Rental Period:</strong> $days days</div>
+        <div class="detail"><strong>Start Date:</strong> $start_date</div>
+        <div class="detail"><strong>Daily Rate:</strong> ₹$daily_rate</div>
+        <div class="detail"><strong>Total Cost:</strong> ₹$total_cost</div>
+        <div class="detail"><strong>Security Deposit:</strong> ₹$deposit</div>
     </div>
     
     <div class="section">
@@ -894,7 +4193,37 @@ def ai_generate_contract(current_user, current_role):
     </div>
 </body>
 </html>
-"""
+""")
+
+contract_cache = TTLCache(app.config['CONTRACT_CACHE_SIZE'], app.config['CONTRACT_CACHE_TTL'])
+
+def render_contract(fields):
+    # Cached by a hash of the inputs, so re-issuing an unchanged contract is a dict lookup
+    key = hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+    contract_html = contract_cache.get(key)
+    if contract_html is None:
+        contract_html = CONTRACT_TEMPLATE.substitute(
+            {name: html.escape(str(value)) for name, value in fields.items()}
+        )
+        contract_cache.set(key, contract_html)
+    return contract_html
+
+@app.route('/api/ai/contract', methods=['POST'])
+@token_required
+def ai_generate_contract(current_user, current_role):
+    try:
+        data = request.get_json()
+        
+        total_cost = data.get('totalCost')
+        contract_html = render_contract({
+            'customer_name': data.get('customerName'),
+            'equipment_name': data.get('equipmentName'),
+            'days': data.get('days'),
+            'start_date': data.get('startDate'),
+            'daily_rate': data.get('dailyRate'),
+            'total_cost': total_cost,
+            'deposit': data.get('deposit', total_cost * 0.2 if total_cost else 0)
+        })
         
         log_action(current_user, 'AI_CONTRACT_GENERATED')
         return jsonify({
@@ -906,6 +4235,109 @@ def ai_generate_contract(current_user, current_role):
         print(f"Contract Generation Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+class _ChunkWriter(io.RawIOBase):
+    # Write-only sink that lets zipfile stream into a generator response
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+@app.route('/api/ai/contract/batch', methods=['POST'])
+@token_required
+@admin_required
+def ai_generate_contract_batch(current_user, current_role):
+    data = request.get_json() or {}
+    fmt = data.get('format', 'ndjson')
+    
+    try:
+        rental_ids = sorted({int(rental_id) for rental_id in data.get('rental_ids') or []})
+    except (TypeError, ValueError):
+        return jsonify({'message': 'rental_ids must be a list of integers'}), 400
+    
+    if not rental_ids:
+        return jsonify({'message': 'rental_ids is required'}), 400
+    if len(rental_ids) > app.config['CONTRACT_BATCH_MAX']:
+        return jsonify({'message': f"At most {app.config['CONTRACT_BATCH_MAX']} rentals per batch"}), 400
+    if fmt not in ('ndjson', 'zip'):
+        return jsonify({'message': 'Format must be ndjson or zip'}), 400
+    
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT
+            r.id,
+            r.days,
+            r.total,
+            r.created_at,
+            e.name as equipment_name,
+            COALESCE(u.name, r.username) as customer_name
+        FROM rentals r
+        JOIN equipment e ON r.equipment_id = e.id
+        LEFT JOIN users u ON u.username = r.username
+        WHERE r.id = ANY(%s)
+        ORDER BY r.id
+    """, (rental_ids,))
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    
+    default_start = data.get('startDate') or datetime.now().strftime("%Y-%m-%d")
+    missing = sorted(set(rental_ids) - {row['id'] for row in rows})
+    
+    def contracts():
+        for row in rows:
+            start_date = datetime.fromtimestamp(row['created_at']).strftime("%Y-%m-%d") if row['created_at'] else default_start
+            yield row['id'], render_contract({
+                'customer_name': row['customer_name'],
+                'equipment_name': row['equipment_name'],
+                'days': row['days'],
+                'start_date': start_date,
+                'daily_rate': round(row['total'] / row['days'], 2) if row['days'] else row['total'],
+                'total_cost': row['total'],
+                'deposit': round(row['total'] * 0.2, 2)
+            })
+    
+    def generate_ndjson():
+        for rental_id, contract_html in contracts():
+            yield json.dumps({'rental_id': rental_id, 'contractHtml': contract_html}) + "\n"
+        for rental_id in missing:
+            yield json.dumps({'rental_id': rental_id, 'error': 'Rental not found'}) + "\n"
+    
+    def generate_zip():
+        sink = _ChunkWriter()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for rental_id, contract_html in contracts():
+                archive.writestr(f"contract_{rental_id}.html", contract_html)
+                yield sink.take()
+            if missing:
+                archive.writestr("missing.txt", "\n".join(str(rental_id) for rental_id in missing))
+        yield sink.take()
+    
+    log_action(current_user, f'AI_CONTRACT_BATCH_GENERATED: {len(rows)} contracts')
+    
+    if fmt == 'zip':
+        return Response(
+            generate_zip(),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=contracts.zip'}
+        )
+    return Response(generate_ndjson(), mimetype='application/x-ndjson')
+
 # ==================== MAIN ==========================
 
-setup_db()
\ No newline at end of file
+startup.mark('module')
+
+# Schema setup runs once per deploy (`flask --app app setup-db`, which
+# gunicorn.conf.py invokes before forking workers), not on every import
+if __name__ == '__main__':
+    setup_db()
\ No newline at end of file
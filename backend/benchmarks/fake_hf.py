@@ -0,0 +1,93 @@
+"""Stand-in for the Hugging Face router's /v1/chat/completions endpoint.
+
+Answers with a canned completion that mentions some of the catalog after a
+configurable delay, and supports `stream: true` as Server-Sent Events.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = (
+    "For this farm I would start with the Tractor for primary tillage, "
+    "then a Rotavator to prepare the seed bed and a Seed Drill for sowing. "
+    "A Harvester is worth renting at the end of the season."
+)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The client hanging up on a pooled or streamed connection is normal.
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+class FakeRouter:
+    def __init__(self, latency=1.0, jitter=0.2, token_delay=0.02, error_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _delay(self):
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def start(self, host="127.0.0.1", port=0):
+        router = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _chunk(self, data):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with router._lock:
+                    router.calls += 1
+
+                time.sleep(router._delay())
+                if random.random() < router.error_rate:
+                    return self._send(503, b'{"error": "overloaded"}')
+
+                if not payload.get("stream"):
+                    body = json.dumps({"choices": [{"message": {"content": ANSWER}}]}).encode()
+                    return self._send(200, body)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for word in ANSWER.split(" "):
+                    event = {"choices": [{"delta": {"content": word + " "}}]}
+                    self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                    time.sleep(router.token_delay)
+                self._chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+        self._server = _Server((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="fake-hf", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/v1/chat/completions"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
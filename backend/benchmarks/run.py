@@ -0,0 +1,437 @@
+"""End-to-end API benchmark.
+
+Boots the Flask app in-process against a local Postgres, points the AI
+helpers at a fake Hugging Face router with configurable latency, and drives
+a weighted mix of user journeys from concurrent virtual users. Reports
+throughput and p50/p95/p99 latency per endpoint, writes the results as JSON
+and optionally compares them against a stored baseline.
+
+Usage (from backend/):
+
+    python -m benchmarks.run --database-url postgresql://localhost/agrirent_bench
+    python -m benchmarks.run --embedded-pg /tmp/bench-pg --mix ai_heavy -c 32
+    python -m benchmarks.run ... --baseline benchmarks/baseline.json
+    python -m benchmarks.run ... --baseline benchmarks/baseline.json --update-baseline
+
+The target database is written to (users, equipment, rentals); never point
+it at a real deployment. Exits with status 1 when a baseline comparison
+finds a regression.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+
+from benchmarks.fake_hf import FakeRouter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PASSWORD = "Bench@Pass1"
+EQUIPMENT = [
+    ("Tractor", 1500), ("Rotavator", 800), ("Seed Drill", 600),
+    ("Harvester", 3000), ("Sprayer", 300), ("Cultivator", 500),
+    ("Thresher", 1200), ("Baler", 1800), ("Plough", 400), ("Trailer", 700),
+]
+CROPS = ["wheat", "rice", "maize", "cotton", "sugarcane", "soybean"]
+SOILS = ["loamy", "clay", "sandy", "black"]
+
+# Scenario weights per mix; every scenario is a short user journey and
+# records each request it makes under its endpoint label.
+MIXES = {
+    'default': {'browse': 40, 'rent_return': 20, 'my_rentals': 15, 'dashboard': 10, 'login': 5, 'ai_recommend': 5, 'ai_chat': 5},
+    'read_heavy': {'browse': 60, 'my_rentals': 20, 'dashboard': 15, 'login': 5},
+    'write_heavy': {'rent_return': 45, 'rent_cart': 15, 'browse': 20, 'admin_rentals': 10, 'login': 10},
+    'ai_heavy': {'ai_recommend': 35, 'ai_chat': 35, 'ai_chat_stream': 10, 'browse': 20},
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    db = parser.add_mutually_exclusive_group()
+    db.add_argument('--database-url', default=os.getenv("BENCH_DATABASE_URL"),
+                    help="Postgres DSN to run against (default: $BENCH_DATABASE_URL)")
+    db.add_argument('--embedded-pg', metavar='DIR',
+                    help="start a throwaway Postgres in DIR with pgserver instead")
+    parser.add_argument('--sslmode', default="prefer")
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('-d', '--duration', type=float, default=30, help="seconds of measured load")
+    parser.add_argument('--warmup', type=float, default=3, help="seconds of unmeasured load first")
+    parser.add_argument('--mix', choices=sorted(MIXES), default='default')
+    parser.add_argument('--users', type=int, default=50, help="number of seeded customer accounts")
+    parser.add_argument('--hf-latency', type=float, default=1.0, help="fake router response delay in seconds")
+    parser.add_argument('--hf-jitter', type=float, default=0.2)
+    parser.add_argument('--hf-error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', default=None, help="results file (default: benchmarks/results/<mix>-<ts>.json)")
+    parser.add_argument('--baseline', help="baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="write the results to --baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative p95 increase / throughput decrease before failing")
+    parser.add_argument('--min-slack-ms', type=float, default=5.0,
+                        help="absolute p95 increase always tolerated, to ignore noise on fast endpoints")
+    return parser.parse_args(argv)
+
+
+def start_embedded_postgres(path):
+    try:
+        import pgserver
+    except ImportError:
+        sys.exit("--embedded-pg needs the pgserver package (pip install pgserver)")
+    server = pgserver.get_server(path, cleanup_mode=None)
+    return server, server.get_uri()
+
+
+def load_app(args, hf_url):
+    # The app reads its configuration at import time.
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['DB_SSLMODE'] = args.sslmode
+    os.environ.setdefault('SECRET_KEY', "benchmark-secret-benchmark-secret-0000")
+    os.environ['HUGGINGFACE_API_URL'] = hf_url
+    os.environ.setdefault('HUGGINGFACE_API_KEY', "bench")
+    os.environ.setdefault('DB_POOL_MAX', str(max(10, args.concurrency)))
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    import app as app_module
+    app_module.setup_db()
+    return app_module
+
+
+def seed(app_module, args):
+    conn = app_module.connect_db()
+    cur = conn.cursor()
+
+    usernames = [f"bench_user_{i}" for i in range(args.users)]
+    hashed = app_module.hash_password(PASSWORD)
+    for username in usernames + ["bench_admin"]:
+        role = 'admin' if username == "bench_admin" else 'customer'
+        cur.execute(
+            """
+            INSERT INTO users (name, username, password, role) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (username) DO UPDATE SET password = EXCLUDED.password, failed_attempts = 0, lock_time = NULL
+            """,
+            (username.replace('_', ' ').title(), username, hashed, role)
+        )
+
+    cur.execute("SELECT name FROM equipment WHERE is_active")
+    existing = {row['name'] for row in cur.fetchall()}
+    missing = [(name, price) for name, price in EQUIPMENT if name not in existing]
+    for name, price in missing:
+        cur.execute("INSERT INTO equipment (name, price) VALUES (%s, %s)", (name, price))
+    if missing:
+        app_module.bump_catalog_version(cur)
+
+    conn.commit()
+    cur.close()
+    conn.close()
+    return usernames
+
+
+def serve(app_module):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def record(self, label, elapsed, ok):
+        if not self.recording:
+            return
+        with self._lock:
+            self.samples[label].append(elapsed)
+            if not ok:
+                self.errors[label] += 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, username, recorder, rng, equipment_ids):
+        self.base_url = base_url
+        self.username = username
+        self.recorder = recorder
+        self.rng = rng
+        self.equipment_ids = equipment_ids
+        self.session = requests.Session()
+        self.token = None
+
+    def call(self, label, method, path, expect=(200,), stream=False, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers, stream=stream, timeout=120, **kwargs)
+            if stream:
+                for _ in response.iter_content(chunk_size=None):
+                    pass
+            ok = response.status_code in expect
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.record(label, time.perf_counter() - started, ok)
+        return response if ok else None
+
+    def login(self):
+        response = self.call('POST /api/login', 'POST', '/api/login',
+                             json={'username': self.username, 'password': PASSWORD})
+        if response is not None:
+            self.token = response.json()['token']
+        return response is not None
+
+    def browse(self):
+        self.call('GET /api/equipment', 'GET', '/api/equipment')
+
+    def rent_return(self):
+        response = self.call('POST /api/rentals', 'POST', '/api/rentals', expect=(201,), json={
+            'equipment_id': self.rng.choice(self.equipment_ids),
+            'days': self.rng.randint(1, 7),
+        })
+        if response is not None:
+            rental_id = response.json()['rental_id']
+            self.call('PUT /api/rentals/<id>/return', 'PUT', f'/api/rentals/{rental_id}/return')
+
+    def rent_cart(self):
+        items = [
+            {'equipment_id': equipment_id, 'days': self.rng.randint(1, 7)}
+            for equipment_id in self.rng.sample(self.equipment_ids, min(4, len(self.equipment_ids)))
+        ]
+        response = self.call('POST /api/rentals/cart', 'POST', '/api/rentals/cart', expect=(201,), json={'items': items})
+        if response is not None:
+            for rental in response.json()['rentals']:
+                self.call('PUT /api/rentals/<id>/return', 'PUT', f"/api/rentals/{rental['rental_id']}/return")
+
+    def my_rentals(self):
+        self.call('GET /api/rentals/my', 'GET', '/api/rentals/my', params={'limit': 20})
+
+    def admin_rentals(self):
+        self.call('GET /api/rentals', 'GET', '/api/rentals', params={'limit': 50})
+
+    def dashboard(self):
+        self.call('GET /api/stats/dashboard', 'GET', '/api/stats/dashboard')
+
+    def ai_recommend(self):
+        self.call('POST /api/ai/recommend', 'POST', '/api/ai/recommend', json={
+            'farmSize': self.rng.choice([2, 5, 10, 25, 60]),
+            'cropType': self.rng.choice(CROPS),
+            'soilType': self.rng.choice(SOILS),
+            'budget': self.rng.choice([5000, 20000, 50000]),
+        })
+
+    def ai_chat(self):
+        self.call('POST /api/ai/chat', 'POST', '/api/ai/chat', json={
+            'question': f"Which equipment do I need for {self.rng.choice(CROPS)}?",
+        })
+
+    def ai_chat_stream(self):
+        self.call('POST /api/ai/chat/stream', 'POST', '/api/ai/chat/stream', stream=True, json={
+            'question': f"How should I prepare {self.rng.choice(SOILS)} soil?",
+        })
+
+
+def run_load(base_url, usernames, admin, equipment_ids, args, recorder):
+    weights = MIXES[args.mix]
+    scenarios, cumulative = list(weights), []
+    total = 0
+    for name in scenarios:
+        total += weights[name]
+        cumulative.append(total)
+
+    stop = threading.Event()
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        username = admin if 'admin_rentals' in weights and index == 0 else usernames[index % len(usernames)]
+        user = VirtualUser(base_url, username, recorder, rng, equipment_ids)
+        while not stop.is_set() and not user.login():
+            time.sleep(0.5)
+        while not stop.is_set():
+            scenario = rng.choices(scenarios, cum_weights=cumulative)[0]
+            if scenario == 'admin_rentals' and username != admin:
+                scenario = 'browse'
+            getattr(user, scenario)()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.recording = False
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=150)
+    return elapsed
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    total_requests = total_errors = 0
+    for label, samples in sorted(recorder.samples.items()):
+        samples.sort()
+        errors = recorder.errors.get(label, 0)
+        total_requests += len(samples)
+        total_errors += errors
+        endpoints[label] = {
+            'requests': len(samples),
+            'errors': errors,
+            'throughput_rps': round(len(samples) / elapsed, 2),
+            'mean_ms': round(1000 * sum(samples) / len(samples), 2),
+            'p50_ms': round(1000 * percentile(samples, 50), 2),
+            'p95_ms': round(1000 * percentile(samples, 95), 2),
+            'p99_ms': round(1000 * percentile(samples, 99), 2),
+            'max_ms': round(1000 * samples[-1], 2),
+        }
+    return {
+        'requests': total_requests,
+        'errors': total_errors,
+        'throughput_rps': round(total_requests / elapsed, 2) if elapsed else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def compare(results, baseline, tolerance, min_slack_ms):
+    regressions = []
+    if results['config']['mix'] != baseline.get('config', {}).get('mix'):
+        regressions.append(f"baseline was recorded with mix {baseline.get('config', {}).get('mix')!r}")
+        return regressions
+
+    floor = baseline['summary']['throughput_rps'] * (1 - tolerance)
+    if results['summary']['throughput_rps'] < floor:
+        regressions.append(
+            f"throughput {results['summary']['throughput_rps']} rps < {floor:.2f} rps "
+            f"(baseline {baseline['summary']['throughput_rps']})"
+        )
+
+    for label, base in baseline['summary']['endpoints'].items():
+        current = results['summary']['endpoints'].get(label)
+        if current is None:
+            regressions.append(f"{label}: no samples in this run")
+            continue
+        limit = max(base['p95_ms'] * (1 + tolerance), base['p95_ms'] + min_slack_ms)
+        if current['p95_ms'] > limit:
+            regressions.append(f"{label}: p95 {current['p95_ms']} ms > {limit:.2f} ms (baseline {base['p95_ms']})")
+        base_rate = base['errors'] / base['requests'] if base['requests'] else 0.0
+        rate = current['errors'] / current['requests'] if current['requests'] else 0.0
+        if rate > base_rate + 0.01:
+            regressions.append(f"{label}: error rate {rate:.2%} (baseline {base_rate:.2%})")
+    return regressions
+
+
+def print_table(summary):
+    header = f"{'endpoint':<32}{'reqs':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for label, row in summary['endpoints'].items():
+        print(f"{label:<32}{row['requests']:>8}{row['errors']:>6}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+    print("-" * len(header))
+    print(f"{'total':<32}{summary['requests']:>8}{summary['errors']:>6}{summary['throughput_rps']:>9}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    pg_server = None
+    if args.embedded_pg:
+        pg_server, args.database_url = start_embedded_postgres(args.embedded_pg)
+        args.sslmode = "disable"
+    if not args.database_url:
+        sys.exit("Pass --database-url, set BENCH_DATABASE_URL, or use --embedded-pg DIR")
+
+    router = FakeRouter(args.hf_latency, args.hf_jitter, error_rate=args.hf_error_rate)
+    hf_url = router.start()
+
+    try:
+        app_module = load_app(args, hf_url)
+        usernames = seed(app_module, args)
+        _, equipment = app_module.catalog.active()
+        equipment_ids = [item['id'] for item in equipment]
+        http_server, base_url = serve(app_module)
+
+        print(f"Benchmarking {base_url} mix={args.mix} concurrency={args.concurrency} duration={args.duration}s")
+        recorder = Recorder()
+        elapsed = run_load(base_url, usernames, "bench_admin", equipment_ids, args, recorder)
+        http_server.shutdown()
+        app_module.audit_writer.flush()
+    finally:
+        router.stop()
+        if pg_server is not None:
+            pg_server.cleanup()
+
+    results = {
+        'recorded_at': datetime.utcnow().isoformat() + 'Z',
+        'host': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'config': {
+            'mix': args.mix,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'users': args.users,
+            'hf_latency': args.hf_latency,
+            'hf_jitter': args.hf_jitter,
+            'hf_error_rate': args.hf_error_rate,
+        },
+        'hf_calls': router.calls,
+        'summary': summarize(recorder, elapsed),
+    }
+    print_table(results['summary'])
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, 'benchmarks', 'results', f"{args.mix}-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_slack_ms)
+    if regressions:
+        print("REGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# Picked up automatically by `gunicorn app:app` (see Procfile).
+import os
+import shutil
+import subprocess
+import sys
+
+# Workers write Prometheus samples here so /metrics can aggregate all of them.
+# Set before any worker imports prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/agrirent-prometheus")
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be summed into this one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+    # Tables and migrations are set up once here rather than in every worker.
+    # A child process keeps the app out of the master, so a HUP still reloads
+    # fresh code; it is a version check and nothing more once the schema is current.
+    if os.getenv("SKIP_SCHEMA_SETUP", "").lower() not in ("1", "true", "yes"):
+        # Without the multiprocess dir the one-off process keeps its samples in memory
+        # instead of leaving files behind in the directory just cleared
+        env = {k: v for k, v in os.environ.items() if k != "PROMETHEUS_MULTIPROC_DIR"}
+        subprocess.run([sys.executable, "-m", "flask", "--app", "app", "setup-db"], check=True, env=env)
+
+
+def post_worker_init(worker):
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        print(app_module.startup.report(), flush=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,199 @@
+"""Shared fixtures.
+
+Most tests run without a database. The ones that need Postgres use the `db`
+fixture, which skips unless TEST_DATABASE_URL points at a disposable database
+(set DB_SSLMODE=disable for a local server). Never point it at real data:
+the tests create and delete rows.
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# Set before app is imported: its config is read at import time
+os.environ.setdefault("SECRET_KEY", "test-secret-key-test-secret-key-00")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.pop("DATABASE_REPLICA_URLS", None)
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+import app as app_module  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = []
+        self.closed = False
+
+    def execute(self, query, params=None):
+        self.conn.queries.append((query, params))
+        self.conn.status = "in_transaction"
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for ConnectionPool."""
+
+    def __init__(self):
+        self.closed = 0
+        self.status = "idle"
+        self.rollbacks = 0
+        self.queries = []
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.status == "idle":
+            return app_module.psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        return app_module.psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = "idle"
+
+    def commit(self):
+        self.status = "idle"
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    """Replaces connect_db; returns the list of connections it has opened."""
+    opened = []
+
+    def connect(dsn=None):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(app_module, "connect_db", connect)
+    monkeypatch.setattr(app_module, "_pool", None)
+    monkeypatch.setattr(app_module, "_pool_pid", None)
+    return opened
+
+
+@pytest.fixture
+def flask_app():
+    return app_module.app
+
+
+@pytest.fixture(scope="session")
+def db():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    app_module.setup_db()
+    return app_module
+
+
+@pytest.fixture
+def client(db):
+    return db.app.test_client()
+
+
+@pytest.fixture
+def make_user(db):
+    """Creates a user and returns (username, Authorization header); removes its rows afterwards."""
+    created = []
+
+    def make(role="customer"):
+        username = f"test_{uuid.uuid4().hex[:12]}"
+        conn = db.connect_db()
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO users(name, username, password, role, failed_attempts) VALUES (%s, %s, %s, %s, 0)",
+            ("Test User", username, db.hash_password("Test@Pass1"), role)
+        )
+        conn.commit()
+        conn.close()
+        created.append(username)
+
+        response = db.app.test_client().post("/api/login", json={"username": username, "password": "Test@Pass1"})
+        assert response.status_code == 200, response.get_json()
+        return username, {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+    yield make
+
+    conn = db.connect_db()
+    cur = conn.cursor()
+    for username in created:
+        cur.execute("DELETE FROM rentals WHERE username = %s", (username,))
+        cur.execute("DELETE FROM audit_logs WHERE username = %s", (username,))
+        cur.execute("DELETE FROM users WHERE username = %s", (username,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def make_equipment(db):
+    """Creates equipment and returns its id; removes it and its rentals afterwards."""
+    created = []
+
+    def make(price=100, is_active=True):
+        conn = db.connect_db()
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO equipment(name, price, is_active) VALUES (%s, %s, %s) RETURNING id",
+            (f"Test Equipment {uuid.uuid4().hex[:8]}", price, is_active)
+        )
+        created.append(cur.fetchone()['id'])
+        conn.commit()
+        conn.close()
+        return created[-1]
+
+    yield make
+
+    conn = db.connect_db()
+    cur = conn.cursor()
+    for equipment_id in created:
+        cur.execute("DELETE FROM rentals WHERE equipment_id = %s", (equipment_id,))
+        cur.execute("DELETE FROM equipment_revenue WHERE equipment_id = %s", (equipment_id,))
+        cur.execute("DELETE FROM equipment WHERE id = %s", (equipment_id,))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def equipment_id(make_equipment):
+    return make_equipment()
+
+
+@pytest.fixture
+def collect_pages(client):
+    """Follows next_cursor to the end; returns (items, number of pages)."""
+    def collect(url, headers, params, key):
+        items, cursor, pages = [], None, 0
+        while True:
+            query = dict(params, after=cursor) if cursor is not None else params
+            response = client.get(url, headers=headers, query_string=query)
+            assert response.status_code == 200, response.get_json()
+            body = response.get_json()
+            items.extend(body[key])
+            pages += 1
+            cursor = body['next_cursor']
+            if cursor is None:
+                return items, pages
+
+    return collect
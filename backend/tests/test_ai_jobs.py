@@ -0,0 +1,69 @@
+import threading
+
+import app as app_module
+from app import AIJobQueue
+
+
+def test_a_job_runs_in_the_background_and_its_result_can_be_polled(client, make_user, monkeypatch):
+    _, headers = make_user()
+    monkeypatch.setitem(app_module.AI_JOB_RUNNERS, 'chat', lambda username, data: ({'response': f"hi {data['question']}"}, 200))
+
+    created = client.post('/api/ai/jobs', headers=headers, json={'kind': 'chat', 'input': {'question': 'soil?'}})
+    assert created.status_code == 202
+    assert created.json['status'] == 'queued'
+
+    job = client.get(created.json['status_url'], headers=headers, query_string={'wait': 5}).json
+    assert job['status'] == 'done'
+    assert job['result'] == {'response': 'hi soil?'}
+    assert job['result_status'] == 200
+
+
+def test_a_failing_runner_marks_the_job_failed(client, make_user, monkeypatch):
+    _, headers = make_user()
+
+    def explode(username, data):
+        raise RuntimeError("model went away")
+
+    monkeypatch.setitem(app_module.AI_JOB_RUNNERS, 'chat', explode)
+    job_id = client.post('/api/ai/jobs', headers=headers, json={'kind': 'chat'}).json['job_id']
+
+    job = client.get(f'/api/ai/jobs/{job_id}', headers=headers, query_string={'wait': 5}).json
+    assert job['status'] == 'failed'
+    assert job['result_status'] == 500
+
+
+def test_jobs_are_private_to_their_owner_and_admins(client, make_user, monkeypatch):
+    _, owner = make_user()
+    _, other = make_user()
+    _, admin = make_user('admin')
+    monkeypatch.setitem(app_module.AI_JOB_RUNNERS, 'chat', lambda username, data: ({}, 200))
+    job_id = client.post('/api/ai/jobs', headers=owner, json={'kind': 'chat'}).json['job_id']
+
+    assert client.get(f'/api/ai/jobs/{job_id}', headers=owner, query_string={'wait': 5}).json['status'] == 'done'
+    assert client.get(f'/api/ai/jobs/{job_id}', headers=other).status_code == 404
+    assert client.get(f'/api/ai/jobs/{job_id}', headers=admin).status_code == 200
+
+
+def test_a_full_queue_answers_429_with_retry_after(client, make_user, monkeypatch):
+    _, headers = make_user()
+    release = threading.Event()
+    monkeypatch.setitem(app_module.AI_JOB_RUNNERS, 'chat', lambda username, data: (release.wait(5), ({}, 200))[1])
+    monkeypatch.setattr(app_module, 'ai_jobs', AIJobQueue(workers=1, queue_depth=1, ttl=60))
+
+    accepted = [client.post('/api/ai/jobs', headers=headers, json={'kind': 'chat'}) for _ in range(2)]
+    full = client.post('/api/ai/jobs', headers=headers, json={'kind': 'chat'})
+    release.set()
+
+    assert [response.status_code for response in accepted] == [202, 202]
+    assert full.status_code == 429
+    assert full.headers['Retry-After'] == '5'
+    assert app_module.ai_jobs.stats()['rejected'] == 1
+    for response in accepted:
+        assert client.get(response.json['status_url'], headers=headers, query_string={'wait': 5}).json['status'] == 'done'
+
+
+def test_unknown_kinds_and_bad_waits_are_rejected(client, make_user):
+    _, headers = make_user()
+    assert client.post('/api/ai/jobs', headers=headers, json={'kind': 'translate'}).status_code == 400
+    assert client.get('/api/ai/jobs/abc', headers=headers, query_string={'wait': 'soon'}).status_code == 400
+    assert client.get('/api/ai/jobs/abc', headers=headers).status_code == 404
@@ -0,0 +1,159 @@
+import calendar
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+import app as app_module
+from app import ArchiveUnavailable, iter_archived_audit_logs, require_archive_dir
+
+
+def epoch(*args):
+    return calendar.timegm(datetime(*args).timetuple())
+
+
+def write_chunk(archive_dir, records):
+    name = f"audit_{uuid.uuid4().hex}.ndjson.gz"
+    path = os.path.join(archive_dir, name)
+    with gzip.open(path, 'wt') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    manifest = app_module.load_archive_manifest(archive_dir)
+    manifest['chunks'].append({
+        'file': name,
+        'rows': len(records),
+        'sha256': app_module.file_sha256(path),
+        'min_timestamp': records[0]['timestamp'],
+        'min_id': records[0]['id'],
+        'max_timestamp': records[-1]['timestamp'],
+        'max_id': records[-1]['id'],
+        'archived_at': 0
+    })
+    app_module.save_archive_manifest(str(archive_dir), manifest)
+    return path
+
+
+def record(id, timestamp, username='alice', action='LOGIN_SUCCESS'):
+    return {'id': id, 'username': username, 'action': action, 'timestamp': timestamp}
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'AUDIT_ARCHIVE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_archive_dir_must_be_set_outside_the_app_and_mounted(tmp_path):
+    with pytest.raises(ArchiveUnavailable, match="not set"):
+        require_archive_dir(None)
+    with pytest.raises(ArchiveUnavailable, match="inside the application directory"):
+        require_archive_dir(os.path.dirname(app_module.__file__))
+    with pytest.raises(ArchiveUnavailable, match="does not exist"):
+        require_archive_dir(str(tmp_path / "unmounted"))
+    assert require_archive_dir(str(tmp_path)) == str(tmp_path)
+
+
+def test_search_reads_only_the_matching_range(archive_dir):
+    write_chunk(archive_dir, [record(1, 100.0), record(2, 200.0, action='LOGOUT')])
+    write_chunk(archive_dir, [record(3, 300.0, username='bob'), record(4, 400.0)])
+
+    found = lambda **kwargs: [r['id'] for r in iter_archived_audit_logs(str(archive_dir), **kwargs)]
+    assert found(start=150, end=400) == [2, 3]
+    assert found(username='alice') == [1, 2, 4]
+    assert found(action='LOG') == [1, 2, 3, 4]
+    assert found(action='LOGIN', start=150) == [3, 4]
+
+
+def test_a_chunk_that_no_longer_matches_its_checksum_is_refused(archive_dir):
+    path = write_chunk(archive_dir, [record(1, 100.0)])
+    with gzip.open(path, 'wt') as f:
+        f.write(json.dumps(record(1, 100.0, username='mallory')) + "\n")
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        list(iter_archived_audit_logs(str(archive_dir)))
+
+
+def test_cli_search_prints_ndjson(flask_app, archive_dir):
+    write_chunk(archive_dir, [record(1, 100.0), record(2, 200.0)])
+
+    result = flask_app.test_cli_runner().invoke(args=['audit-archive-search', '--from', '0', '--to', '150'])
+
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line)['id'] for line in result.output.splitlines()] == [1]
+
+
+@pytest.mark.parametrize("args", [
+    ['--from', 'last tuesday', '--to', '2024-01-01'],
+    ['--from', '2024-01-01', '--to', '2024-13-45'],
+])
+def test_cli_rejects_malformed_times(flask_app, archive_dir, args):
+    result = flask_app.test_cli_runner().invoke(args=['audit-archive-search'] + args)
+
+    assert result.exit_code == 2
+    assert "Invalid value" in result.output
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+
+
+def test_cli_reports_a_corrupt_chunk_without_a_traceback(flask_app, archive_dir):
+    path = write_chunk(archive_dir, [record(1, 100.0)])
+    os.remove(path)
+
+    result = flask_app.test_cli_runner().invoke(args=['audit-archive-search', '--from', '0', '--to', '150'])
+
+    assert result.exit_code == 1
+    assert "Error:" in result.output
+
+
+def test_cli_refuses_without_an_archive_dir(flask_app, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'AUDIT_ARCHIVE_DIR', None)
+
+    result = flask_app.test_cli_runner().invoke(args=['audit-archive-search', '--from', '0', '--to', '1'])
+
+    assert result.exit_code == 1
+    assert "AUDIT_ARCHIVE_DIR is not set" in result.output
+
+
+def test_archive_moves_old_rows_out_and_they_stay_searchable(db, client, make_user, archive_dir):
+    username = f"test_{uuid.uuid4().hex[:12]}"
+    timestamps = [epoch(2001, 3, day) for day in range(1, 6)]
+    conn = db.connect_db()
+    cur = conn.cursor()
+    for timestamp in timestamps:
+        cur.execute(
+            "INSERT INTO audit_logs(username, action, timestamp) VALUES (%s, 'OLD_EVENT', %s)",
+            (username, timestamp)
+        )
+    conn.commit()
+
+    try:
+        summary = app_module.archive_audit_logs(epoch(2002, 1, 1), str(archive_dir), 2, 1, echo=lambda line: None)
+        again = app_module.archive_audit_logs(epoch(2002, 1, 1), str(archive_dir), 2, 1, echo=lambda line: None)
+
+        cur.execute("SELECT COUNT(*) AS n FROM audit_logs WHERE username = %s", (username,))
+        assert cur.fetchone()['n'] == 0
+    finally:
+        cur.execute("DELETE FROM audit_logs WHERE username = %s", (username,))
+        conn.commit()
+        conn.close()
+
+    assert (summary['chunks'], summary['archived'], summary['deleted']) == (3, 5, 5)
+    assert again['archived'] == 0
+    chunks = app_module.load_archive_manifest(str(archive_dir))['chunks']
+    assert [chunk['rows'] for chunk in chunks] == [2, 2, 1]
+
+    _, headers = make_user(role='admin')
+    response = client.get('/api/audit-logs/archive', headers=headers,
+                          query_string={'from': '2001-01-01', 'to': '2002-01-01', 'username': username})
+    assert response.status_code == 200
+    assert [json.loads(line)['timestamp'] for line in response.get_data(as_text=True).splitlines()] == timestamps
+
+
+def test_archive_api_needs_a_range_and_a_configured_dir(client, make_user, monkeypatch):
+    _, headers = make_user(role='admin')
+    assert client.get('/api/audit-logs/archive?from=0', headers=headers).status_code == 400
+
+    monkeypatch.setitem(app_module.app.config, 'AUDIT_ARCHIVE_DIR', None)
+    assert client.get('/api/audit-logs/archive?from=0&to=1', headers=headers).status_code == 503
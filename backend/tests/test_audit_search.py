@@ -0,0 +1,93 @@
+import calendar
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def audit_events(db):
+    """Inserts audit rows for a throwaway username; returns (username, insert function)."""
+    username = f"test_{uuid.uuid4().hex[:12]}"
+    conn = db.connect_db()
+    cur = conn.cursor()
+
+    def insert(action, timestamp):
+        cur.execute(
+            "INSERT INTO audit_logs(username, action, timestamp) VALUES (%s, %s, %s)",
+            (username, action, timestamp)
+        )
+        conn.commit()
+
+    yield username, insert
+
+    cur.execute("DELETE FROM audit_logs WHERE username = %s", (username,))
+    conn.commit()
+    conn.close()
+
+
+def test_audit_search_pages_through_timestamp_ties(make_user, audit_events, collect_pages):
+    _, headers = make_user(role='admin')
+    username, insert = audit_events
+    base = time.time() - 60
+    # Three events share each timestamp, so the cursor has to break ties on id
+    timestamps = [base + offset for offset in (0.0, 0.0, 0.0, 1.5, 1.5, 1.5, 2.123456)]
+    for timestamp in timestamps:
+        insert('TEST_EVENT', timestamp)
+
+    logs, _ = collect_pages('/api/audit-logs/search', headers, {'username': username, 'limit': 2}, 'logs')
+
+    keys = [(log['timestamp'], log['id']) for log in logs]
+    assert len(keys) == len(timestamps)
+    assert keys == sorted(set(keys), reverse=True)
+
+
+def test_action_is_a_literal_prefix(client, make_user, audit_events):
+    _, headers = make_user(role='admin')
+    username, insert = audit_events
+    now = time.time()
+    insert('LOGIN_SUCCESS', now)
+    insert('LOGIN_FAIL', now)
+    insert('LOGINXSUCCESS', now)
+
+    def actions(prefix):
+        response = client.get('/api/audit-logs/search', headers=headers,
+                              query_string={'username': username, 'action': prefix})
+        return sorted(log['action'] for log in response.get_json()['logs'])
+
+    assert actions('LOGIN_') == ['LOGIN_FAIL', 'LOGIN_SUCCESS']
+    assert actions('LOGIN_S') == ['LOGIN_SUCCESS']
+    assert actions('%') == []
+
+
+def test_audit_search_rejects_bad_parameters_and_customers(client, make_user):
+    _, customer = make_user()
+    _, admin = make_user(role='admin')
+
+    assert client.get('/api/audit-logs/search', headers=customer).status_code == 403
+    assert client.get('/api/audit-logs/search?after=12', headers=admin).status_code == 400
+    assert client.get('/api/audit-logs/search?limit=-1', headers=admin).status_code == 400
+
+
+def test_time_bounded_search_only_scans_its_month(db):
+    month_start = calendar.timegm(datetime(2099, 1, 1).timetuple())
+    conn = db.connect_db()
+    cur = conn.cursor()
+    try:
+        next_month = db.ensure_audit_log_partitions(cur, ts=month_start + 3600, months_ahead=0)
+        conn.commit()
+        assert next_month == calendar.timegm(datetime(2099, 2, 1).timetuple())
+
+        cur.execute(
+            "EXPLAIN SELECT id FROM audit_logs WHERE timestamp >= %s AND timestamp < %s",
+            (month_start, next_month)
+        )
+        plan = "\n".join(row['QUERY PLAN'] for row in cur.fetchall())
+        assert "audit_logs_2099_01" in plan
+        assert "audit_logs_default" not in plan
+    finally:
+        conn.rollback()
+        cur.execute("DROP TABLE IF EXISTS audit_logs_2099_01")
+        conn.commit()
+        conn.close()
@@ -0,0 +1,111 @@
+import uuid
+
+import psycopg2
+import pytest
+
+import app as app_module
+from app import AuditLogWriter
+
+
+def make_writer(retries=2, backoff=0.01, flush_interval=0.05):
+    return AuditLogWriter(100, 10, flush_interval, 'block', 1, retries, backoff)
+
+
+@pytest.fixture
+def flaky_insert(monkeypatch, fake_connect):
+    """execute_values that fails the first `failures[0]` calls; returns (failures, inserted rows)."""
+    failures, inserted = [0], []
+
+    def execute_values(cur, query, rows, page_size=None):
+        if failures[0] > 0:
+            failures[0] -= 1
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        inserted.extend(rows)
+
+    monkeypatch.setattr(app_module, "execute_values", execute_values)
+    return failures, inserted
+
+
+def test_a_batch_that_fails_is_retried_and_written(flaky_insert, caplog):
+    failures, inserted = flaky_insert
+    failures[0] = 2
+    writer = make_writer(retries=2)
+
+    writer.submit("alice", "LOGIN_SUCCESS")
+    writer.flush()
+    writer.close()
+
+    assert [row[:2] for row in inserted] == [("alice", "LOGIN_SUCCESS")]
+    stats = writer.stats()
+    assert (stats['written'], stats['failed'], stats['retries']) == (1, 0, 2)
+    assert "retrying" in caplog.text
+    assert app_module.get_pool().stats()['in_use'] == 0
+
+
+def test_rows_are_counted_as_failed_only_after_the_last_retry(flaky_insert, caplog):
+    failures, inserted = flaky_insert
+    failures[0] = 10
+    writer = make_writer(retries=2)
+
+    writer.submit("alice", "LOGIN_SUCCESS")
+    writer.submit("bob", "LOGIN_FAIL")
+    writer.flush()
+    writer.close()
+
+    assert inserted == []
+    stats = writer.stats()
+    assert (stats['written'], stats['failed'], stats['retries']) == (0, 2, 2)
+    assert "dropping 2 events" in caplog.text
+
+
+def test_flush_waits_for_queued_events(flaky_insert):
+    _, inserted = flaky_insert
+    writer = make_writer(flush_interval=0.2)
+
+    for n in range(25):
+        writer.submit("alice", f"EVENT_{n}")
+    writer.flush()
+
+    assert [row[1] for row in inserted] == [f"EVENT_{n}" for n in range(25)]
+    writer.close()
+
+
+def test_close_drains_the_queue_before_the_thread_exits(flaky_insert):
+    _, inserted = flaky_insert
+    writer = make_writer(flush_interval=0.2)
+
+    for n in range(15):
+        writer.submit("alice", f"EVENT_{n}")
+    writer.close()
+
+    assert not writer._thread.is_alive()
+    assert len(inserted) == 15
+
+
+def test_drop_policy_counts_events_that_do_not_fit(flaky_insert):
+    writer = AuditLogWriter(1, 10, 0.05, 'drop', 1, 0, 0)
+    writer._ensure_started()
+    writer._stop.set()
+    writer._thread.join(1)
+
+    assert writer.submit("alice", "ONE")
+    assert not writer.submit("alice", "TWO")
+    assert writer.stats()['dropped'] == 1
+
+
+def test_events_reach_the_database(db):
+    username = f"test_{uuid.uuid4().hex[:12]}"
+    writer = make_writer()
+    for action in ("LOGIN_SUCCESS", "LOGOUT"):
+        writer.submit(username, action)
+    writer.close()
+
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("SELECT action FROM audit_logs WHERE username = %s ORDER BY id", (username,))
+    actions = [row['action'] for row in cur.fetchall()]
+    cur.execute("DELETE FROM audit_logs WHERE username = %s", (username,))
+    conn.commit()
+    conn.close()
+
+    assert actions == ["LOGIN_SUCCESS", "LOGOUT"]
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from app import CircuitOpen, HuggingFaceClient
+
+
+class FakeResponse:
+    def __init__(self, status_code, content="ok", headers=None):
+        self.status_code = status_code
+        self.text = content
+        self.headers = headers or {}
+        self._content = content
+
+    def json(self):
+        return {"choices": [{"message": {"content": self._content}}]}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Plays back a script of responses or exceptions, one per post()."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+        self.timeouts = []
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        self.timeouts.append(kwargs['timeout'])
+        step = self.script.pop(0) if len(self.script) > 1 else self.script[0]
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+def make_client(session, threshold=2, cooldown=0.05, retries=0, backoff=0, total_timeout=10):
+    client = HuggingFaceClient(
+        "http://router.test/v1/chat/completions", 0.01, 1, retries, backoff, 1, threshold, cooldown, total_timeout
+    )
+    client._session, client._pid = session, os.getpid()
+    return client
+
+
+def test_success_keeps_the_circuit_closed():
+    client = make_client(FakeSession(FakeResponse(200, "hello")))
+    assert client.complete("prompt") == "hello"
+    assert client.stats()['circuit'] == 'closed'
+
+
+def test_opens_after_consecutive_failures_and_short_circuits():
+    session = FakeSession(FakeResponse(503))
+    client = make_client(session, threshold=2)
+
+    assert client.post({}) is None
+    assert client.stats()['circuit'] == 'closed'
+    assert client.post({}) is None
+    assert client.stats()['circuit'] == 'open'
+
+    with pytest.raises(CircuitOpen):
+        client.post({})
+    assert session.calls == 2
+
+
+def test_half_open_probe_success_closes_the_circuit():
+    client = make_client(FakeSession(FakeResponse(503), FakeResponse(503), FakeResponse(200)), threshold=2)
+    client.post({})
+    client.post({})
+    time.sleep(0.06)
+
+    assert client.post({}) is not None
+    assert client.stats()['circuit'] == 'closed'
+    assert client.stats()['consecutive_failures'] == 0
+
+
+def test_half_open_probe_failure_reopens_the_circuit():
+    client = make_client(FakeSession(FakeResponse(503)), threshold=2)
+    client.post({})
+    client.post({})
+    time.sleep(0.06)
+
+    assert client.post({}) is None
+    assert client.stats()['circuit'] == 'open'
+    with pytest.raises(CircuitOpen):
+        client.post({})
+
+
+def test_only_one_probe_while_half_open():
+    release = threading.Event()
+
+    class SlowSession(FakeSession):
+        def post(self, url, **kwargs):
+            release.wait(1)
+            return FakeResponse(200)
+
+    client = make_client(FakeSession(FakeResponse(503)), threshold=1)
+    client.post({})
+    time.sleep(0.06)
+
+    client._session = SlowSession()
+    probe = threading.Thread(target=client.post, args=({},))
+    probe.start()
+    time.sleep(0.02)
+    with pytest.raises(CircuitOpen):
+        client.post({})
+    release.set()
+    probe.join(1)
+    assert client.stats()['circuit'] == 'closed'
+
+
+@pytest.mark.parametrize("error", [
+    requests.exceptions.TooManyRedirects("redirect loop"),
+    requests.exceptions.ChunkedEncodingError("truncated"),
+])
+def test_unexpected_request_errors_do_not_wedge_the_breaker(error):
+    client = make_client(FakeSession(FakeResponse(503), error, FakeResponse(200)), threshold=1)
+    client.post({})
+    time.sleep(0.06)
+
+    # The probe fails with an exception the retry loop does not special-case
+    assert client.post({}) is None
+    assert not client._probe_in_flight
+    assert client.stats()['outcomes']['request_error'] == 1
+
+    time.sleep(0.06)
+    assert client.post({}) is not None
+    assert client.stats()['circuit'] == 'closed'
+
+
+def test_retries_transient_statuses():
+    session = FakeSession(FakeResponse(503), FakeResponse(200, "second try"))
+    client = make_client(session, retries=2)
+
+    assert client.complete("prompt") == "second try"
+    assert session.calls == 2
+    assert client.stats()['retries'] == 1
+
+
+def test_retry_after_beyond_the_budget_gives_up_instead_of_sleeping():
+    session = FakeSession(FakeResponse(429, headers={'Retry-After': '30'}), FakeResponse(200))
+    client = make_client(session, retries=2, total_timeout=1)
+
+    start = time.monotonic()
+    assert client.post({}) is None
+    assert time.monotonic() - start < 0.5
+    assert session.calls == 1
+    assert client.stats()['outcomes'] == {'http_429': 1}
+
+
+def test_backoff_stops_retrying_at_the_deadline():
+    session = FakeSession(requests.exceptions.ConnectionError("refused"))
+    client = make_client(session, retries=50, backoff=0.05, total_timeout=0.3)
+
+    start = time.monotonic()
+    assert client.post({}) is None
+    assert time.monotonic() - start < 0.4
+    assert session.calls < 51
+
+
+def test_each_attempt_only_gets_the_time_that_is_left():
+    session = FakeSession(FakeResponse(503), FakeResponse(200))
+    client = make_client(session, retries=1, total_timeout=0.5)
+
+    client.post({})
+
+    connect, read = session.timeouts[-1]
+    assert connect == 0.01
+    assert read <= 0.5
+
+
+def test_failures_are_logged_not_printed(caplog, capsys):
+    client = make_client(FakeSession(FakeResponse(503, "overloaded")))
+
+    with caplog.at_level("WARNING"):
+        client.post({})
+
+    assert "Hugging Face call failed: http_503" in caplog.text
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,82 @@
+import uuid
+
+import pytest
+
+from app import EquipmentCatalog
+
+
+@pytest.fixture
+def added_equipment(db):
+    """Collects ids of equipment added through the API and deletes them afterwards."""
+    ids = []
+    yield ids
+    conn = db.connect_db()
+    cur = conn.cursor()
+    for equipment_id in ids:
+        cur.execute("DELETE FROM equipment WHERE id = %s", (equipment_id,))
+    conn.commit()
+    conn.close()
+
+
+def add(client, headers, added_equipment):
+    name = f"Test Equipment {uuid.uuid4().hex[:8]}"
+    response = client.post('/api/equipment', headers=headers, json={'name': name, 'price': 120})
+    assert response.status_code == 201
+    added_equipment.append(response.get_json()['id'])
+    return name, response.get_json()['id']
+
+
+def test_unchanged_catalog_answers_304(client, make_user):
+    _, headers = make_user()
+    first = client.get('/api/equipment', headers=headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    again = client.get('/api/equipment', headers=dict(headers, **{'If-None-Match': etag}))
+
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == etag
+    assert again.headers['Cache-Control'] == 'private, no-cache'
+
+
+def test_a_change_moves_the_etag_and_shows_up(client, make_user, added_equipment):
+    _, headers = make_user()
+    _, admin = make_user(role='admin')
+    etag = client.get('/api/equipment', headers=headers).headers['ETag']
+
+    name, equipment_id = add(client, admin, added_equipment)
+    response = client.get('/api/equipment', headers=dict(headers, **{'If-None-Match': etag}))
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert name in [eq['name'] for eq in response.get_json()]
+
+    assert client.put(f'/api/equipment/{equipment_id}/deactivate', headers=admin).status_code == 200
+    names = [eq['name'] for eq in client.get('/api/equipment', headers=headers).get_json()]
+    assert name not in names
+
+
+def test_another_worker_picks_up_the_new_version(client, make_user, added_equipment):
+    _, admin = make_user(role='admin')
+    other_worker = EquipmentCatalog(check_interval=0)
+    version, _ = other_worker.active()
+
+    name, _ = add(client, admin, added_equipment)
+    new_version, active = other_worker.active()
+
+    assert new_version > version
+    assert name in [eq['name'] for eq in active]
+    assert other_worker.stats()['reloads'] == 2
+
+
+def test_version_checks_are_rate_limited(db):
+    catalog = EquipmentCatalog(check_interval=60)
+    catalog.active()
+    catalog.active()
+    catalog.all()
+
+    assert catalog.stats()['version_checks'] == 1
+    catalog.invalidate()
+    catalog.active()
+    assert catalog.stats()['version_checks'] == 2
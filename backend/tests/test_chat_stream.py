@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import app as app_module
+from app import CircuitOpen
+
+
+def events(response):
+    parsed = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        event, data = block.split("\n")
+        parsed.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def test_tokens_are_streamed_as_server_sent_events(client, make_user, monkeypatch):
+    _, headers = make_user()
+    monkeypatch.setattr(app_module.hf_client, 'stream', lambda prompt, max_length: iter(["Use ", "a seed drill."]))
+
+    response = client.post('/api/ai/chat/stream', headers=headers, json={'question': 'What do I need for sowing?'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    parsed = events(response)
+    assert parsed[:2] == [('token', {'text': 'Use '}), ('token', {'text': 'a seed drill.'})]
+    assert parsed[2][0] == 'done'
+    assert parsed[2][1]['ttft_ms'] is not None
+
+
+@pytest.mark.parametrize("failure", [CircuitOpen(), RuntimeError("router went away")])
+def test_an_unavailable_model_ends_with_an_error_event(client, make_user, monkeypatch, failure):
+    _, headers = make_user()
+
+    def stream(prompt, max_length):
+        raise failure
+        yield
+
+    monkeypatch.setattr(app_module.hf_client, 'stream', stream)
+
+    parsed = events(client.post('/api/ai/chat/stream', headers=headers, json={'question': 'Hello?'}))
+
+    assert [event for event, _ in parsed] == ['error', 'done']
+    assert parsed[1][1]['ttft_ms'] is None
+
+
+@pytest.mark.parametrize("body", [{}, {'question': '   '}, {'question': 42}, ['question']])
+def test_a_missing_question_is_a_400(client, make_user, body):
+    _, headers = make_user()
+    assert client.post('/api/ai/chat/stream', headers=headers, json=body).status_code == 400
@@ -0,0 +1,101 @@
+import io
+import json
+import zipfile
+
+import app as app_module
+from app import TTLCache, render_contract
+
+
+FIELDS = {
+    'customer_name': 'Ravi <script>alert(1)</script>',
+    'equipment_name': 'Tractor & Trailer',
+    'days': 3,
+    'start_date': '2024-06-01',
+    'daily_rate': 1000,
+    'total_cost': 3000,
+    'deposit': 600
+}
+
+
+def test_contract_fields_are_escaped(monkeypatch):
+    monkeypatch.setattr(app_module, 'contract_cache', TTLCache(10, 60))
+    contract_html = render_contract(FIELDS)
+
+    assert 'Ravi &lt;script&gt;alert(1)&lt;/script&gt;' in contract_html
+    assert '<script>' not in contract_html
+    assert 'Tractor &amp; Trailer' in contract_html
+    assert '₹3000' in contract_html
+
+
+def test_identical_contracts_come_from_the_cache(monkeypatch):
+    cache = TTLCache(10, 60)
+    monkeypatch.setattr(app_module, 'contract_cache', cache)
+
+    first = render_contract(FIELDS)
+    second = render_contract(dict(FIELDS))
+    third = render_contract(dict(FIELDS, days=4))
+
+    assert first == second != third
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['size'] == 2
+
+
+def test_single_contract_route(client, make_user):
+    _, headers = make_user()
+    response = client.post('/api/ai/contract', headers=headers, json={
+        'customerName': 'Asha', 'equipmentName': 'Harvester', 'days': 2,
+        'startDate': '2024-06-01', 'dailyRate': 500, 'totalCost': 1000
+    })
+
+    assert response.status_code == 200
+    contract_html = response.get_json()['contractHtml']
+    assert 'Asha' in contract_html
+    assert '₹200.0' in contract_html
+
+
+def rent(client, headers, equipment_id, days):
+    response = client.post('/api/rentals', headers=headers, json={'equipment_id': equipment_id, 'days': days})
+    return response.get_json()['rental_id']
+
+
+def test_batch_streams_one_contract_per_rental_and_reports_missing_ones(client, make_user, equipment_id):
+    _, customer = make_user()
+    _, admin = make_user(role='admin')
+    ids = [rent(client, customer, equipment_id, days) for days in (1, 2)]
+    missing = max(ids) + 1000000
+
+    response = client.post('/api/ai/contract/batch', headers=admin, json={'rental_ids': ids + [missing, ids[0]]})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['rental_id'] for line in lines] == ids + [missing]
+    assert 'Test User' in lines[0]['contractHtml']
+    assert '₹200' in lines[1]['contractHtml']
+    assert lines[2] == {'rental_id': missing, 'error': 'Rental not found'}
+
+
+def test_batch_as_zip(client, make_user, equipment_id):
+    _, customer = make_user()
+    _, admin = make_user(role='admin')
+    rental_id = rent(client, customer, equipment_id, 1)
+
+    response = client.post('/api/ai/contract/batch', headers=admin,
+                           json={'rental_ids': [rental_id, 0], 'format': 'zip'})
+
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    assert sorted(archive.namelist()) == [f'contract_{rental_id}.html', 'missing.txt']
+    assert archive.read('missing.txt') == b'0'
+
+
+def test_batch_validation(client, make_user, monkeypatch):
+    _, customer = make_user()
+    _, admin = make_user(role='admin')
+    monkeypatch.setitem(app_module.app.config, 'CONTRACT_BATCH_MAX', 2)
+    batch = lambda body, headers=admin: client.post('/api/ai/contract/batch', headers=headers, json=body).status_code
+
+    assert batch({'rental_ids': [1]}, customer) == 403
+    assert batch({'rental_ids': []}) == 400
+    assert batch({'rental_ids': ['one']}) == 400
+    assert batch({'rental_ids': [1, 2, 3]}) == 400
+    assert batch({'rental_ids': [1], 'format': 'pdf'}) == 400
@@ -0,0 +1,107 @@
+import io
+import json
+import uuid
+
+import pytest
+
+import app as app_module
+from app import read_import_records, validate_import_record
+
+
+@pytest.mark.parametrize("record, expected", [
+    ({'name': ' Tractor ', 'price': '1200'}, (('Tractor', 1200.0, True), None)),
+    ({'name': 'Plough', 'price': 300, 'is_active': 'no'}, (('Plough', 300.0, False), None)),
+    ({'name': 'Plough', 'price': 300, 'is_active': True}, (('Plough', 300.0, True), None)),
+    ({'name': '', 'price': 1}, (None, 'Name is required')),
+    ({'name': 'Plough', 'price': 'cheap'}, (None, 'Invalid price format')),
+    ({'name': 'Plough', 'price': 'nan'}, (None, 'Price must be positive')),
+    ({'name': 'Plough', 'price': -1}, (None, 'Price must be positive')),
+    ({'name': 'Plough', 'price': 1, 'is_active': 'maybe'}, (None, 'is_active must be true or false')),
+])
+def test_validate_import_record(record, expected):
+    assert validate_import_record(record) == expected
+
+
+def test_csv_header_must_name_the_required_columns():
+    with pytest.raises(ValueError, match="name and price"):
+        list(read_import_records('csv', io.BytesIO(b"title,cost\nTractor,1\n")))
+
+
+def test_ndjson_lines_that_are_not_objects_are_reported():
+    body = b'{"name": "Tractor", "price": 1}\n\nnot json\n[1, 2]\n'
+    results = [(line, error) for line, _, error in read_import_records('ndjson', io.BytesIO(body))]
+    assert results == [(1, None), (3, 'Invalid JSON'), (4, 'Each line must be a JSON object')]
+
+
+@pytest.fixture
+def prefix(db):
+    """Unique name prefix for imported equipment; everything with it is deleted afterwards."""
+    prefix = f"Import {uuid.uuid4().hex[:8]}"
+    yield prefix
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM equipment WHERE name LIKE %s", (prefix + '%',))
+    conn.commit()
+    conn.close()
+
+
+def equipment_named(db, prefix):
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("SELECT name, price, is_active FROM equipment WHERE name LIKE %s ORDER BY name", (prefix + '%',))
+    rows = [tuple(row.values()) for row in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+def upload(client, headers, body, content_type='text/csv', query=None):
+    return client.post('/api/equipment/import', headers=dict(headers, **{'Content-Type': content_type}),
+                       data=body, query_string=query)
+
+
+def test_csv_import_inserts_updates_and_reports_bad_lines(client, make_user, db, prefix):
+    _, admin = make_user(role='admin')
+    upload(client, admin, f"name,price\n{prefix} Tractor,1000\n")
+
+    response = upload(client, admin, (
+        "Name,Price,Is_Active\n"
+        f"{prefix} Tractor,1100,yes\n"
+        f"{prefix} Seeder,200,no\n"
+        f"{prefix} Sprayer,free,yes\n"
+        f"{prefix} Seeder,250,yes\n"
+    ))
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['inserted'], body['updated'], body['rejected']) == (1, 1, 2)
+    assert body['errors'] == [
+        {'line': 4, 'error': 'Invalid price format'},
+        {'line': 5, 'error': 'Duplicate name (first seen on line 3)'},
+    ]
+    assert equipment_named(db, prefix) == [(f"{prefix} Seeder", 200, False), (f"{prefix} Tractor", 1100, True)]
+
+
+def test_reimporting_the_same_rows_changes_nothing(client, make_user, db, prefix):
+    _, admin = make_user(role='admin')
+    body = "".join(json.dumps({'name': f"{prefix} {n}", 'price': n}) + "\n" for n in range(3))
+
+    first = upload(client, admin, body, 'application/x-ndjson').get_json()
+    version = app_module.catalog.version()
+    again = upload(client, admin, body, 'application/x-ndjson').get_json()
+
+    assert (first['inserted'], again['inserted'], again['updated']) == (3, 0, 0)
+    assert app_module.catalog.version() == version
+    assert len(equipment_named(db, prefix)) == 3
+
+
+def test_import_limits_and_errors(client, make_user, prefix, monkeypatch):
+    _, customer = make_user()
+    _, admin = make_user(role='admin')
+    monkeypatch.setitem(app_module.app.config, 'EQUIPMENT_IMPORT_MAX_ROWS', 2)
+    rows = "name,price\n" + "".join(f"{prefix} {n},1\n" for n in range(3))
+
+    assert upload(client, customer, rows).status_code == 403
+    assert upload(client, admin, rows).status_code == 413
+    assert upload(client, admin, rows, query={'format': 'xlsx'}).status_code == 400
+    assert upload(client, admin, "title,cost\nTractor,1\n").status_code == 400
+    assert upload(client, admin, "name,price\n,1\n").get_json()['message'] == 'No valid rows to import'
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+
+import pytest
+
+import app as app_module
+
+
+@pytest.mark.parametrize("iterate", [False, True])
+def test_export_stream_releases_its_connection(fake_connect, flask_app, iterate):
+    # A HEAD request or an early disconnect closes the body without iterating it
+    with flask_app.test_request_context('/api/export/rentals'):
+        response = app_module.stream_export("SELECT 1", [], ['id'], 'csv', 'rentals')
+        if iterate:
+            next(iter(response.response))
+        response.close()
+    assert app_module.get_pool().stats()['in_use'] == 0
+
+
+def rent(db, username, equipment_id, count):
+    conn = db.connect_db()
+    cur = conn.cursor()
+    for _ in range(count):
+        cur.execute(
+            "INSERT INTO rentals(username, equipment_id, days, total, status) VALUES (%s, %s, 2, 200, 'rented')",
+            (username, equipment_id)
+        )
+    conn.commit()
+    conn.close()
+
+
+def test_csv_export_streams_the_filtered_rentals(client, make_user, equipment_id, db, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'EXPORT_CHUNK_SIZE', 2)
+    username, _ = make_user()
+    other, _ = make_user()
+    _, headers = make_user(role='admin')
+    rent(db, username, equipment_id, 5)
+    rent(db, other, equipment_id, 1)
+
+    response = client.get('/api/export/rentals', headers=headers, query_string={'username': username})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'rentals.csv' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 5
+    assert {row['username'] for row in rows} == {username}
+    assert app_module.get_pool().stats()['in_use'] == 0
+
+
+def test_ndjson_export_respects_the_time_window(client, make_user, equipment_id, db):
+    username, _ = make_user()
+    _, headers = make_user(role='admin')
+    rent(db, username, equipment_id, 2)
+
+    inside = client.get('/api/export/rentals', headers=headers,
+                        query_string={'format': 'ndjson', 'username': username, 'from': '2000-01-01'})
+    after = client.get('/api/export/rentals', headers=headers,
+                       query_string={'format': 'ndjson', 'username': username, 'from': '2999-01-01'})
+
+    lines = inside.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['username'] for line in lines] == [username, username]
+    assert after.get_data(as_text=True) == ''
+
+
+def test_export_rejects_bad_parameters_and_customers(client, make_user):
+    _, customer = make_user()
+    _, admin = make_user(role='admin')
+
+    assert client.get('/api/export/rentals', headers=customer).status_code == 403
+    assert client.get('/api/export/rentals?format=xml', headers=admin).status_code == 400
+    assert client.get('/api/export/audit-logs?from=yesterday', headers=admin).status_code == 400
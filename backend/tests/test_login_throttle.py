@@ -0,0 +1,104 @@
+import pytest
+
+import app as app_module
+from app import LoginThrottle
+
+
+def test_ip_window_trips_with_a_retry_after():
+    throttle = LoginThrottle(window=60, max_per_user=100, max_per_ip=3, max_keys=100)
+    for n in range(3):
+        assert throttle.check(f"user{n}", "10.0.0.1") is None
+        throttle.failed(f"user{n}", "10.0.0.1")
+
+    status, _, retry_after = throttle.check("someone", "10.0.0.1")
+    assert status == 429
+    assert 59 <= retry_after <= 61
+    assert throttle.check("someone", "10.0.0.2") is None
+
+
+def test_user_window_only_holds_back_the_failing_address():
+    throttle = LoginThrottle(window=60, max_per_user=2, max_per_ip=100, max_keys=100)
+    throttle.failed("alice", "10.0.0.1")
+    throttle.failed("alice", "10.0.0.1")
+
+    assert throttle.check("alice", "10.0.0.1")[0] == 429
+    assert throttle.check("alice", "10.0.0.2") is None
+
+
+def test_unknown_address_skips_both_windows_but_not_the_lock_mirror():
+    throttle = LoginThrottle(window=60, max_per_user=1, max_per_ip=1, max_keys=100)
+    throttle.failed("alice", None)
+    throttle.failed("alice", None)
+    assert throttle.check("alice", None) is None
+    assert throttle.stats()['unknown_ip'] == 1
+
+    throttle.locked("alice", app_module.time.time() + 30)
+    assert throttle.check("alice", None)[0] == 423
+
+
+@pytest.mark.parametrize("proxy_count, headers, expected", [
+    (0, {}, "203.0.113.9"),
+    (0, {"X-Forwarded-For": "198.51.100.7"}, None),
+    (1, {"X-Forwarded-For": "198.51.100.7"}, "203.0.113.9"),
+])
+def test_client_ip_is_unknown_for_untrusted_forwarding(flask_app, monkeypatch, proxy_count, headers, expected):
+    # ProxyFix is installed at import time, so with a count the address here is still the socket's
+    monkeypatch.setitem(flask_app.config, 'TRUSTED_PROXY_COUNT', proxy_count)
+    with flask_app.test_request_context('/api/login', headers=headers, environ_base={'REMOTE_ADDR': '203.0.113.9'}):
+        assert app_module.client_ip() == expected
+
+
+@pytest.fixture
+def throttle(monkeypatch):
+    fresh = LoginThrottle(window=60, max_per_user=2, max_per_ip=4, max_keys=100)
+    monkeypatch.setattr(app_module, 'login_throttle', fresh)
+    return fresh
+
+
+def login(client, username, password, ip, headers=None):
+    return client.post('/api/login', json={'username': username, 'password': password},
+                       headers=headers, environ_base={'REMOTE_ADDR': ip})
+
+
+# Two failures fill the per-user window but stay under the three that lock the account in the database
+
+def test_throttled_address_gets_429_and_retry_after(client, make_user, throttle):
+    username, _ = make_user()
+    for _ in range(2):
+        assert login(client, username, "wrong", "10.1.0.1").status_code == 401
+
+    response = login(client, username, "wrong", "10.1.0.1")
+
+    assert response.status_code == 429
+    assert 0 < int(response.headers['Retry-After']) <= 61
+
+
+def test_owner_logs_in_while_an_attacker_is_throttled(client, make_user, throttle):
+    username, _ = make_user()
+    for _ in range(2):
+        login(client, username, "wrong", "10.1.0.1")
+    assert login(client, username, "Test@Pass1", "10.1.0.1").status_code == 429
+
+    assert login(client, username, "Test@Pass1", "10.2.0.2").status_code == 200
+
+
+def test_db_lockout_answers_423_with_retry_after(client, make_user):
+    username, _ = make_user()
+    statuses = [login(client, username, "wrong", f"10.3.0.{n}").status_code for n in range(3)]
+    assert statuses == [401, 401, 423]
+
+    response = login(client, username, "Test@Pass1", "10.3.0.9")
+    assert response.status_code == 423
+    assert int(response.headers['Retry-After']) > 0
+
+
+def test_clients_behind_an_unconfigured_proxy_do_not_share_a_bucket(client, make_user, throttle):
+    # Every request arrives from the proxy's address; without TRUSTED_PROXY_COUNT it is not a client
+    proxy = {"X-Forwarded-For": "198.51.100.7"}
+    victim, _ = make_user()
+    for n in range(6):
+        username, _ = make_user()
+        assert login(client, username, "wrong", "10.0.0.1", proxy).status_code == 401
+
+    assert login(client, victim, "Test@Pass1", "10.0.0.1", proxy).status_code == 200
+    assert throttle.stats()['tracked_keys'] == 0
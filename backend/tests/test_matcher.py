@@ -0,0 +1,42 @@
+from app import EquipmentNameMatcher, parse_ai_recommendations
+
+
+def test_reports_the_first_position_of_each_name():
+    matcher = EquipmentNameMatcher(["tractor", "harvester"])
+    text = "a harvester, then a tractor, then another tractor"
+
+    assert matcher.first_positions(text) == {1: text.index("harvester"), 0: text.index("tractor")}
+
+
+def test_overlapping_and_nested_names():
+    matcher = EquipmentNameMatcher(["seed drill", "drill", "rotavator", "rota"])
+    text = "use the seed drill after the rotavator"
+
+    positions = matcher.first_positions(text)
+    assert positions[0] == text.index("seed drill")
+    assert positions[1] == text.index("drill")
+    assert positions[2] == text.index("rotavator")
+    assert positions[3] == text.index("rota")
+
+
+def test_follows_failure_links_after_a_partial_match():
+    matcher = EquipmentNameMatcher(["abcd", "bce"])
+    assert matcher.first_positions("abce") == {1: 1}
+
+
+def test_no_names_and_no_matches():
+    assert EquipmentNameMatcher([]).first_positions("anything") == {}
+    assert EquipmentNameMatcher(["plough"]).first_positions("a tractor") == {}
+
+
+def test_recommendations_are_ranked_by_first_mention():
+    equipment = [
+        {'name': 'Tractor', 'price': 1000},
+        {'name': 'Seed Drill', 'price': 500},
+        {'name': 'Harvester', 'price': 3000},
+        {'name': 'Sprayer', 'price': 200},
+    ]
+    result = parse_ai_recommendations("Get a SEED DRILL, a sprayer and a tractor.", equipment)
+
+    assert [rec['equipment'] for rec in result['recommendations']] == ['Seed Drill', 'Sprayer', 'Tractor']
+    assert result['totalEstimatedCost'] == 500 * 3 + 200 * 2 + 1000 * 2
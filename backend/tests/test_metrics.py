@@ -0,0 +1,25 @@
+def test_metrics_are_off_without_a_token(flask_app, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'METRICS_TOKEN', None)
+    response = flask_app.test_client().get('/metrics')
+    assert response.status_code == 404
+    assert response.json['message'] == 'Metrics are not enabled'
+
+
+def test_metrics_need_the_bearer_token(flask_app, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'METRICS_TOKEN', 's3cret')
+    client = flask_app.test_client()
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+
+def test_metrics_are_exposed_with_the_token(flask_app, monkeypatch):
+    monkeypatch.setitem(flask_app.config, 'METRICS_TOKEN', 's3cret')
+    client = flask_app.test_client()
+    client.get('/metrics')
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'http_requests_total{' in response.get_data(as_text=True)
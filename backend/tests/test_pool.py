@@ -0,0 +1,109 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import app as app_module
+from app import ConnectionPool, PoolTimeout
+
+
+def make_pool(maxconn=2, timeout=0.05, minconn=0, healthcheck_after=30, max_lifetime=1800):
+    return ConnectionPool("dsn", minconn, maxconn, timeout, healthcheck_after, max_lifetime)
+
+
+def test_checkout_and_release_reuse_the_connection(fake_connect):
+    pool = make_pool()
+    conn = pool.getconn()
+    assert pool.stats()['in_use'] == 1
+
+    conn.close()
+    assert pool.stats()['in_use'] == 0
+    assert pool.stats()['idle'] == 1
+
+    again = pool.getconn()
+    assert again._conn is fake_connect[0]
+    assert len(fake_connect) == 1
+    again.close()
+
+
+def test_close_is_idempotent_and_the_proxy_is_dead_afterwards(fake_connect):
+    pool = make_pool()
+    conn = pool.getconn()
+    conn.close()
+    conn.close()
+
+    assert pool.stats()['idle'] == 1
+    assert conn.closed
+    with pytest.raises(psycopg2.InterfaceError):
+        conn.cursor()
+
+
+def test_release_rolls_back_an_open_transaction(fake_connect):
+    pool = make_pool()
+    conn = pool.getconn()
+    conn.cursor().execute("UPDATE something")
+    conn.close()
+
+    assert fake_connect[0].rollbacks == 1
+    assert fake_connect[0].status == "idle"
+
+
+def test_exhausted_pool_times_out(fake_connect):
+    pool = make_pool(maxconn=1)
+    held = pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()['timeouts'] == 1
+
+    held.close()
+    pool.getconn().close()
+
+
+def test_waiter_gets_the_released_connection(fake_connect):
+    pool = make_pool(maxconn=1, timeout=2)
+    held = pool.getconn()
+    got = []
+
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert pool.stats()['waiting'] == 1
+
+    held.close()
+    waiter.join(1)
+    assert got and got[0]._conn is fake_connect[0]
+    got[0].close()
+
+
+def test_broken_idle_connection_is_replaced(fake_connect):
+    pool = make_pool()
+    pool.getconn().close()
+    fake_connect[0].closed = 1
+
+    conn = pool.getconn()
+    assert conn._conn is fake_connect[1]
+    assert pool.stats()['health_failures'] == 1
+    assert pool.stats()['size'] == 1
+    conn.close()
+
+
+def test_failed_connect_gives_the_slot_back(monkeypatch):
+    def refuse(dsn=None):
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(app_module, "connect_db", refuse)
+    pool = make_pool(maxconn=1)
+
+    with pytest.raises(psycopg2.OperationalError):
+        pool.getconn()
+    assert pool.stats()['size'] == 0
+
+
+def test_request_connections_are_returned_at_teardown(fake_connect, flask_app):
+    with flask_app.app_context():
+        app_module.get_connection()
+        app_module.get_read_connection()
+        assert app_module.get_pool().stats()['in_use'] == 2
+    assert app_module.get_pool().stats()['in_use'] == 0
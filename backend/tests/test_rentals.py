@@ -0,0 +1,96 @@
+import threading
+import time
+
+
+def rentals_of(db, username):
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("SELECT equipment_id, days, total FROM rentals WHERE username = %s ORDER BY id", (username,))
+    rows = [tuple(row.values()) for row in cur.fetchall()]
+    conn.close()
+    return rows
+
+
+def test_rental_is_priced_from_the_catalog(client, make_user, make_equipment, db):
+    username, headers = make_user()
+    equipment_id = make_equipment(price=250)
+
+    response = client.post('/api/rentals', headers=headers, json={'equipment_id': equipment_id, 'days': 3})
+
+    assert response.status_code == 201
+    assert response.get_json()['total'] == 750
+    assert rentals_of(db, username) == [(equipment_id, 3, 750)]
+
+
+def test_inactive_and_unknown_equipment_are_refused(client, make_user, make_equipment):
+    _, headers = make_user()
+    inactive = make_equipment(is_active=False)
+
+    assert client.post('/api/rentals', headers=headers, json={'equipment_id': inactive, 'days': 1}).status_code == 400
+    assert client.post('/api/rentals', headers=headers, json={'equipment_id': 2147483647, 'days': 1}).status_code == 404
+
+
+def test_a_rental_waits_for_a_concurrent_deactivation_and_sees_it(client, make_user, equipment_id, db):
+    username, headers = make_user()
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("UPDATE equipment SET is_active = FALSE WHERE id = %s", (equipment_id,))
+
+    statuses = []
+    rental = threading.Thread(target=lambda: statuses.append(
+        client.post('/api/rentals', headers=headers, json={'equipment_id': equipment_id, 'days': 1}).status_code
+    ))
+    rental.start()
+    time.sleep(0.2)
+    # FOR SHARE blocks on the deactivation's row lock instead of reading the old, active row
+    assert statuses == []
+    conn.commit()
+    conn.close()
+    rental.join(5)
+
+    assert statuses == [400]
+    assert rentals_of(db, username) == []
+
+
+def test_cart_rents_every_item_in_one_statement(client, make_user, make_equipment, db):
+    username, headers = make_user()
+    plough, seeder = make_equipment(price=100), make_equipment(price=40)
+
+    response = client.post('/api/rentals/cart', headers=headers, json={'items': [
+        {'equipment_id': seeder, 'days': 2},
+        {'equipment_id': plough, 'days': 1},
+        {'equipment_id': seeder, 'days': 5},
+    ]})
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [(r['equipment_id'], r['total']) for r in body['rentals']] == [(seeder, 80), (plough, 100), (seeder, 200)]
+    assert body['grand_total'] == 380
+    assert rentals_of(db, username) == [(seeder, 2, 80), (plough, 1, 100), (seeder, 5, 200)]
+
+
+def test_cart_is_all_or_nothing(client, make_user, make_equipment, db):
+    username, headers = make_user()
+    available, inactive = make_equipment(), make_equipment(is_active=False)
+
+    response = client.post('/api/rentals/cart', headers=headers, json={'items': [
+        {'equipment_id': available, 'days': 1},
+        {'equipment_id': inactive, 'days': 1},
+        {'equipment_id': 2147483647, 'days': 1},
+    ]})
+
+    assert response.status_code == 400
+    assert response.get_json()['unavailable'] == [inactive, 2147483647]
+    assert rentals_of(db, username) == []
+
+
+def test_cart_validation(client, make_user, equipment_id, monkeypatch):
+    _, headers = make_user()
+    monkeypatch.setitem(client.application.config, 'RENTAL_CART_MAX_ITEMS', 2)
+    cart = lambda items: client.post('/api/rentals/cart', headers=headers, json={'items': items}).status_code
+
+    assert cart([]) == 400
+    assert cart([{'equipment_id': equipment_id, 'days': 1}] * 3) == 400
+    assert cart([{'equipment_id': equipment_id, 'days': 0}]) == 400
+    assert cart([{'equipment_id': 'plough', 'days': 1}]) == 400
+    assert cart(['not an item']) == 400
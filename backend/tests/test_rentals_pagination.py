@@ -0,0 +1,50 @@
+def insert_rentals(db, username, equipment_id, statuses):
+    conn = db.connect_db()
+    cur = conn.cursor()
+    ids = []
+    for status in statuses:
+        cur.execute(
+            "INSERT INTO rentals(username, equipment_id, days, total, status) VALUES (%s, %s, 1, 100, %s) RETURNING id",
+            (username, equipment_id, status)
+        )
+        ids.append(cur.fetchone()['id'])
+    conn.commit()
+    conn.close()
+    return ids
+
+
+def test_rentals_pages_cover_every_row_once(make_user, equipment_id, db, collect_pages):
+    username, headers = make_user()
+    ids = insert_rentals(db, username, equipment_id, ['rented', 'returned'] * 4 + ['rented'])
+
+    rentals, pages = collect_pages('/api/rentals/my', headers, {'limit': 2}, 'rentals')
+
+    assert [rental['id'] for rental in rentals] == sorted(ids, reverse=True)
+    assert pages == 5
+
+
+def test_rentals_cursor_respects_filters(make_user, equipment_id, db, collect_pages):
+    username, headers = make_user()
+    ids = insert_rentals(db, username, equipment_id, ['rented', 'returned'] * 3)
+    returned = [rental_id for rental_id, status in zip(ids, ['rented', 'returned'] * 3) if status == 'returned']
+
+    rentals, _ = collect_pages('/api/rentals/my', headers, {'limit': 1, 'status': 'returned'}, 'rentals')
+
+    assert [rental['id'] for rental in rentals] == sorted(returned, reverse=True)
+
+
+def test_admin_listing_filters_by_equipment(make_user, equipment_id, db, collect_pages):
+    username, _ = make_user()
+    _, admin_headers = make_user(role='admin')
+    ids = insert_rentals(db, username, equipment_id, ['rented'] * 3)
+
+    rentals, _ = collect_pages('/api/rentals', admin_headers, {'limit': 2, 'equipment_id': equipment_id}, 'rentals')
+
+    assert [rental['id'] for rental in rentals] == sorted(ids, reverse=True)
+
+
+def test_rentals_rejects_bad_parameters(client, make_user):
+    _, headers = make_user()
+    assert client.get('/api/rentals/my?after=abc', headers=headers).status_code == 400
+    assert client.get('/api/rentals/my?limit=0', headers=headers).status_code == 400
+    assert client.get('/api/rentals/my?status=lost', headers=headers).status_code == 400
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+import app as app_module
+from app import ReplicaSet
+
+
+def make_replicas(dsns=("replica",), window=10):
+    return ReplicaSet(list(dsns), 60, 10, window)
+
+
+def test_a_marker_from_another_worker_routes_the_writer_to_the_primary(flask_app):
+    with flask_app.app_context():
+        marker = make_replicas().write_marker("alice")
+        other_worker = make_replicas()
+
+        assert other_worker.wrote_recently("alice", marker)
+        assert not other_worker.wrote_recently("bob", marker)
+        assert not other_worker.wrote_recently("alice")
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda marker: marker[:-1] + ("0" if marker[-1] != "0" else "1"),
+    lambda marker: f"{time.time() + 5:.3f}." + marker.rpartition('.')[2],
+    lambda marker: "garbage",
+    lambda marker: "",
+])
+def test_forged_or_malformed_markers_are_ignored(flask_app, tamper):
+    with flask_app.app_context():
+        marker = make_replicas().write_marker("alice")
+        assert not make_replicas().wrote_recently("alice", tamper(marker))
+
+
+def test_markers_expire_with_the_window(flask_app):
+    with flask_app.app_context():
+        replicas = make_replicas(window=0.05)
+        marker = replicas.write_marker("alice")
+        time.sleep(0.06)
+        assert not make_replicas(window=0.05).wrote_recently("alice", marker)
+
+
+def test_a_local_write_is_remembered_without_a_marker():
+    replicas = make_replicas(window=0.05)
+    replicas.note_write("alice")
+    assert replicas.wrote_recently("alice")
+    time.sleep(0.06)
+    assert not replicas.wrote_recently("alice")
+
+
+@pytest.fixture
+def primary_as_replica(db, monkeypatch):
+    """Two ReplicaSets over the test database, as two workers would have; the first is installed."""
+    def make():
+        replicas = make_replicas([db.app.config['DATABASE_URL']])
+        replicas._ensure_started()
+        replicas.check()
+        return replicas
+
+    workers = make(), make()
+    monkeypatch.setattr(app_module, 'replicas', workers[0])
+    return workers
+
+
+def test_reads_after_a_write_go_to_the_primary_on_any_worker(client, make_user, equipment_id, primary_as_replica, monkeypatch):
+    _, headers = make_user()
+    writer, other_worker = primary_as_replica
+    assert writer.stats()['in_rotation'] == 1
+
+    response = client.post('/api/rentals', headers=headers, json={'equipment_id': equipment_id, 'days': 1})
+    marker = response.headers['X-Last-Write']
+
+    monkeypatch.setattr(app_module, 'replicas', other_worker)
+    assert client.get('/api/rentals/my', headers=headers).status_code == 200
+    assert client.get('/api/rentals/my', headers=dict(headers, **{'X-Last-Write': marker})).status_code == 200
+
+    stats = other_worker.stats()
+    assert (stats['replica_reads'], stats['read_your_writes_reads']) == (1, 1)
+
+
+def test_failed_writes_and_reads_are_not_stamped(client, make_user, primary_as_replica):
+    _, headers = make_user()
+
+    assert 'X-Last-Write' not in client.get('/api/rentals/my', headers=headers).headers
+    failed = client.post('/api/rentals', headers=headers, json={'equipment_id': 2147483647, 'days': 1})
+    assert failed.status_code == 404
+    assert 'X-Last-Write' not in failed.headers
@@ -0,0 +1,74 @@
+def aggregate(db, equipment_id):
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("SELECT revenue, rental_count FROM equipment_revenue WHERE equipment_id = %s", (equipment_id,))
+    row = cur.fetchone()
+    conn.close()
+    return (row['revenue'], row['rental_count']) if row else (0, 0)
+
+
+def rent(client, headers, equipment_id, days):
+    response = client.post('/api/rentals', headers=headers, json={'equipment_id': equipment_id, 'days': days})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['rental_id']
+
+
+def test_returns_move_the_aggregate_and_rentals_do_not(client, make_user, equipment_id, db):
+    _, headers = make_user()
+    first = rent(client, headers, equipment_id, 2)
+    second = rent(client, headers, equipment_id, 3)
+    assert aggregate(db, equipment_id) == (0, 0)
+
+    assert client.put(f'/api/rentals/{first}/return', headers=headers).status_code == 200
+    assert aggregate(db, equipment_id) == (200, 1)
+    assert client.put(f'/api/rentals/{second}/return', headers=headers).status_code == 200
+    assert aggregate(db, equipment_id) == (500, 2)
+
+
+def test_a_return_that_does_not_happen_leaves_the_aggregate_alone(client, make_user, equipment_id, db):
+    _, owner = make_user()
+    _, stranger = make_user()
+    rental_id = rent(client, owner, equipment_id, 1)
+
+    assert client.put(f'/api/rentals/{rental_id}/return', headers=stranger).status_code == 404
+    assert client.put(f'/api/rentals/{rental_id}/return', headers=owner).status_code == 200
+    assert client.put(f'/api/rentals/{rental_id}/return', headers=owner).status_code == 404
+    assert aggregate(db, equipment_id) == (100, 1)
+
+
+def test_revenue_report_reads_the_aggregates(client, make_user, equipment_id, db):
+    _, headers = make_user()
+    _, admin = make_user(role='admin')
+    rental_id = rent(client, headers, equipment_id, 4)
+    client.put(f'/api/rentals/{rental_id}/return', headers=headers)
+
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("SELECT name FROM equipment WHERE id = %s", (equipment_id,))
+    name = cur.fetchone()['name']
+    conn.close()
+
+    report = client.get('/api/reports/revenue', headers=admin).get_json()
+    entry = next(row for row in report['report'] if row['name'] == name)
+    assert (entry['revenue'], entry['rental_count']) == (400, 1)
+
+
+def test_revenue_verify_finds_and_repairs_drift(flask_app, client, make_user, equipment_id, db):
+    _, headers = make_user()
+    rental_id = rent(client, headers, equipment_id, 1)
+    client.put(f'/api/rentals/{rental_id}/return', headers=headers)
+    runner = flask_app.test_cli_runner()
+    assert runner.invoke(args=['revenue-verify']).exit_code == 0
+
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute("UPDATE equipment_revenue SET revenue = 1 WHERE equipment_id = %s", (equipment_id,))
+    conn.commit()
+    conn.close()
+
+    drifted = runner.invoke(args=['revenue-verify'])
+    assert drifted.exit_code == 1
+    assert f"equipment {equipment_id}: stored 1.0 / 1 rentals, actual 100.0 / 1 rentals" in drifted.output
+
+    assert runner.invoke(args=['revenue-verify', '--rebuild']).exit_code == 0
+    assert aggregate(db, equipment_id) == (100, 1)
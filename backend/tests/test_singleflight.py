@@ -0,0 +1,60 @@
+import threading
+import uuid
+
+from app import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight(wait_timeout=2, shared=False, shared_ttl=30)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+    follower.start()
+    release.set()
+    leader.join(1)
+    follower.join(1)
+
+    assert results == ["answer", "answer"]
+    assert len(calls) == 1
+    assert flight.stats()['coalesced'] == 1
+
+
+def test_a_failure_is_not_reused_by_later_calls():
+    flight = SingleFlight(wait_timeout=2, shared=False, shared_ttl=30)
+    outcomes = iter([None, "recovered"])
+
+    assert flight.do("key", lambda: next(outcomes)) is None
+    assert flight.do("key", lambda: next(outcomes)) == "recovered"
+
+
+def test_shared_results_are_reused_across_workers_but_failures_are_not(db):
+    key = uuid.uuid4().hex
+    worker_a = SingleFlight(wait_timeout=2, shared=True, shared_ttl=30)
+    worker_b = SingleFlight(wait_timeout=2, shared=True, shared_ttl=30)
+    calls = []
+
+    def failing():
+        calls.append('fail')
+        return None
+
+    def working():
+        calls.append('ok')
+        return "answer"
+
+    assert worker_a.do(key, failing) is None
+    assert worker_b.do(key, working) == "answer"
+    assert worker_a.do(key, working) == "answer"
+    assert calls == ['fail', 'ok']
+    assert worker_a.stats()['shared_hit'] == 1
+    assert db.get_pool().stats()['in_use'] == 0
@@ -0,0 +1,112 @@
+import time
+
+import jwt
+import pytest
+
+import app as app_module
+from app import TokenCache, token_issued_at
+
+
+def test_token_cache_drops_expired_tokens():
+    cache = TokenCache(maxsize=10, sync_interval=5, sync_overlap=60)
+    cache.put('fresh', 'alice', 'customer', time.time() + 60, time.time())
+    cache.put('stale', 'alice', 'customer', time.time() - 1, time.time() - 100)
+
+    assert cache.get('fresh')[0] == 'alice'
+    assert cache.get('stale') is None
+
+
+def test_revoking_a_token_evicts_it():
+    cache = TokenCache(maxsize=10, sync_interval=5, sync_overlap=60)
+    cache.put('key', 'alice', 'customer', time.time() + 60, time.time())
+    cache.apply_revocation(key='key', expires_at=time.time() + 60)
+
+    assert cache.get('key') is None
+    assert cache.is_revoked('key', 'alice', time.time())
+
+
+def test_revoking_a_user_only_affects_tokens_issued_before():
+    cache = TokenCache(maxsize=10, sync_interval=5, sync_overlap=60)
+    issued = time.time()
+    cache.put('old', 'alice', 'customer', issued + 60, issued)
+    cache.put('other', 'bob', 'customer', issued + 60, issued)
+
+    cache.apply_revocation(username='alice', revoked_at=issued + 0.5)
+
+    assert cache.get('old') is None
+    assert cache.get('other') is not None
+    assert cache.is_revoked('old', 'alice', issued)
+    assert not cache.is_revoked('new', 'alice', issued + 0.6)
+    assert not cache.is_revoked('other', 'bob', issued)
+
+
+def test_token_issued_in_the_same_second_after_a_revocation_is_valid():
+    # JWT iat is whole seconds; a token issued 0.6s after the revocation must still pass
+    second = int(time.time())
+    claims = jwt.decode(
+        jwt.encode({'iat': second, 'iat_ms': second * 1000 + 800}, app_module.app.config['SECRET_KEY'], algorithm='HS256'),
+        app_module.app.config['SECRET_KEY'], algorithms=['HS256']
+    )
+    cache = TokenCache(maxsize=10, sync_interval=5, sync_overlap=60)
+    cache.apply_revocation(username='alice', revoked_at=second + 0.2)
+
+    assert token_issued_at(claims) == pytest.approx(second + 0.8)
+    assert not cache.is_revoked('key', 'alice', token_issued_at(claims))
+    assert cache.is_revoked('key', 'alice', token_issued_at({'iat': second}))
+
+
+class RevocationTable:
+    """Stands in for token_revocations; rows become visible when committed."""
+
+    def __init__(self):
+        self.rows = []
+
+    def connection(self):
+        table = self
+
+        class Cursor:
+            def execute(self, query, params):
+                since, now = params
+                self.rows = [dict(r) for r in table.rows if r['revoked_at'] > since and r['expires_at'] > now]
+
+            def fetchall(self):
+                return self.rows
+
+            def close(self):
+                pass
+
+        class Connection:
+            def cursor(self):
+                return Cursor()
+
+            def close(self):
+                pass
+
+        return Connection()
+
+
+def test_sync_picks_up_a_revocation_that_commits_out_of_id_order(monkeypatch):
+    table = RevocationTable()
+    monkeypatch.setattr(app_module, 'get_connection', table.connection)
+    cache = TokenCache(maxsize=10, sync_interval=0, sync_overlap=60)
+    now = time.time()
+
+    # id 2 commits first; id 1 was assigned earlier but commits later
+    table.rows.append({'id': 2, 'token_hash': 'b', 'username': None, 'revoked_at': now, 'expires_at': now + 60})
+    cache.sync()
+    assert cache.is_revoked('b', 'x', now)
+
+    table.rows.append({'id': 1, 'token_hash': 'a', 'username': None, 'revoked_at': now - 1, 'expires_at': now + 60})
+    cache.sync()
+    assert cache.is_revoked('a', 'x', now)
+
+
+def test_fresh_login_survives_revoke_user_tokens(client, make_user):
+    username, headers = make_user()
+    with client.application.app_context():
+        app_module.revoke_user_tokens(username)
+    assert client.get('/api/rentals/my', headers=headers).status_code == 401
+
+    response = client.post('/api/login', json={'username': username, 'password': 'Test@Pass1'})
+    fresh = {'Authorization': f"Bearer {response.get_json()['token']}"}
+    assert client.get('/api/rentals/my', headers=fresh).status_code == 200
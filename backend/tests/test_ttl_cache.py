@@ -0,0 +1,62 @@
+import time
+
+import app as app_module
+from app import TTLCache
+
+
+def test_ttl_cache_get_set_and_delete():
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get('a') is None
+
+    cache.set('a', 1)
+    assert cache.get('a') == 1
+
+    cache.delete('a')
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_ttl_cache_entries_expire():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('short', 1, ttl=0.01)
+    cache.set('long', 2)
+    time.sleep(0.02)
+
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+    assert cache.stats()['size'] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_dashboard_stats_are_cached_until_a_rental_invalidates_them(client, make_user, equipment_id, db):
+    username, headers = make_user()
+    assert client.get('/api/stats/dashboard', headers=headers).get_json()['total_rentals'] == 0
+
+    conn = db.connect_db()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO rentals(username, equipment_id, days, total, status) VALUES (%s, %s, 1, 100, 'rented')",
+        (username, equipment_id)
+    )
+    conn.commit()
+    conn.close()
+    # Written behind the API's back, so the cached figure is still served
+    assert client.get('/api/stats/dashboard', headers=headers).get_json()['total_rentals'] == 0
+
+    app_module.invalidate_dashboard_stats(username)
+    stats = client.get('/api/stats/dashboard', headers=headers).get_json()
+    assert stats['total_rentals'] == 1
+    assert stats['active_rentals'] == 1
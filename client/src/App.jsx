@@ -4,6 +4,7 @@ import Login from './components/Login.jsx';
 import Register from './components/Register.jsx';
 import AdminDashboard from './components/AdminDashboard.jsx';
 import CustomerDashboard from './components/CustomerDashboard.jsx';
+import { logout as logoutSession } from './services/api';
 import './App.css';
 
 // Auth Context
@@ -49,6 +50,8 @@ function App() {
   };
 
   const logout = () => {
+    // Revoke the token server-side; local logout proceeds even if this fails
+    logoutSession().catch(() => {});
     localStorage.removeItem('token');
     localStorage.removeItem('username');
     localStorage.removeItem('role');
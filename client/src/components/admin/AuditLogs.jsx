@@ -1,27 +1,56 @@
 import React, { useState, useEffect } from 'react';
-import { getAuditLogs } from '../../services/api';
-import { FaHistory, FaClock } from 'react-icons/fa';
+import { searchAuditLogs } from '../../services/api';
+import { FaHistory, FaClock, FaSearch } from 'react-icons/fa';
 import './AuditLogs.css';
 
 function AuditLogs() {
   const [logs, setLogs] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [form, setForm] = useState({ username: '', action: '', from: '', to: '' });
+  const [filters, setFilters] = useState({});
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchLogs();
-  }, []);
+  }, [filters]);
 
-  const fetchLogs = async () => {
+  const fetchLogs = async (after = null) => {
     try {
-      const response = await getAuditLogs();
-      setLogs(response.data);
+      const params = { ...filters };
+      if (after) params.after = after;
+
+      const response = await searchAuditLogs(params);
+      setLogs(prev => after ? [...prev, ...response.data.logs] : response.data.logs);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching audit logs:', error);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const handleSearch = (e) => {
+    e.preventDefault();
+    const applied = {};
+    Object.entries(form).forEach(([key, value]) => {
+      if (value.trim()) applied[key] = value.trim();
+    });
+    if (applied.to) {
+      // The API bound is exclusive; include the whole selected day
+      const end = new Date(applied.to);
+      end.setUTCDate(end.getUTCDate() + 1);
+      applied.to = end.toISOString().slice(0, 10);
+    }
+    setFilters(applied);
+  };
+
+  const handleLoadMore = () => {
+    setLoadingMore(true);
+    fetchLogs(nextCursor);
+  };
+
   const getActionColor = (action) => {
     if (action.includes('SUCCESS') || action.includes('ADDED') || action.includes('ACTIVATED')) {
       return 'success';
@@ -52,6 +81,37 @@ function AuditLogs() {
         </div>
       </div>
 
+      <form className="audit-filters" onSubmit={handleSearch}>
+        <input
+          type="text"
+          placeholder="Username"
+          value={form.username}
+          onChange={(e) => setForm({ ...form, username: e.target.value })}
+        />
+        <input
+          type="text"
+          placeholder="Action prefix, e.g. RENT_EQUIPMENT"
+          value={form.action}
+          onChange={(e) => setForm({ ...form, action: e.target.value })}
+        />
+        <input
+          type="date"
+          title="From"
+          value={form.from}
+          onChange={(e) => setForm({ ...form, from: e.target.value })}
+        />
+        <input
+          type="date"
+          title="To"
+          value={form.to}
+          onChange={(e) => setForm({ ...form, to: e.target.value })}
+        />
+        <button type="submit" className="btn-search">
+          <FaSearch />
+          <span>Search</span>
+        </button>
+      </form>
+
       <div className="logs-container">
         {logs.map((log) => (
           <div key={log.id} className="log-item">
@@ -72,6 +132,14 @@ function AuditLogs() {
         ))}
       </div>
 
+      {nextCursor && (
+        <div className="load-more">
+          <button className="btn-search" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load More'}
+          </button>
+        </div>
+      )}
+
       {logs.length === 0 && (
         <div className="empty-state">
           <FaHistory />
@@ -1,11 +1,12 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   getAllEquipment, 
   addEquipment, 
+  importEquipment,
   activateEquipment, 
   deactivateEquipment 
 } from '../../services/api';
-import { FaPlus, FaTractor, FaToggleOn, FaToggleOff, FaEdit } from 'react-icons/fa';
+import { FaPlus, FaTractor, FaToggleOn, FaToggleOff, FaEdit, FaFileImport } from 'react-icons/fa';
 import './Equipment.css';
 
 function Equipment() {
@@ -18,6 +19,9 @@ function Equipment() {
   });
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
+  const [importing, setImporting] = useState(false);
+  const [importErrors, setImportErrors] = useState([]);
+  const fileInputRef = useRef(null);
 
   useEffect(() => {
     fetchEquipment();
@@ -53,6 +57,30 @@ function Equipment() {
     }
   };
 
+  const handleImport = async (e) => {
+    const file = e.target.files[0];
+    e.target.value = '';
+    if (!file) return;
+
+    setError('');
+    setSuccess('');
+    setImportErrors([]);
+    setImporting(true);
+
+    try {
+      const response = await importEquipment(file);
+      const { inserted, updated, rejected, errors } = response.data;
+      setSuccess(`Import complete: ${inserted} added, ${updated} updated, ${rejected} rejected`);
+      setImportErrors(errors);
+      fetchEquipment();
+    } catch (err) {
+      setError(err.response?.data?.message || 'Failed to import equipment');
+      setImportErrors(err.response?.data?.errors || []);
+    } finally {
+      setImporting(false);
+    }
+  };
+
   const handleToggleStatus = async (id, isActive) => {
     try {
       if (isActive) {
@@ -86,10 +114,27 @@ function Equipment() {
           <h1>Equipment Management</h1>
           <p>Manage your farming equipment inventory</p>
         </div>
-        <button className="btn-primary" onClick={() => setShowModal(true)}>
-          <FaPlus />
-          <span>Add Equipment</span>
-        </button>
+        <div className="header-actions">
+          <input
+            type="file"
+            accept=".csv,.ndjson,.jsonl"
+            ref={fileInputRef}
+            onChange={handleImport}
+            hidden
+          />
+          <button
+            className="btn-secondary"
+            onClick={() => fileInputRef.current.click()}
+            disabled={importing}
+          >
+            <FaFileImport />
+            <span>{importing ? 'Importing...' : 'Import CSV'}</span>
+          </button>
+          <button className="btn-primary" onClick={() => setShowModal(true)}>
+            <FaPlus />
+            <span>Add Equipment</span>
+          </button>
+        </div>
       </div>
 
       {error && (
@@ -104,6 +149,20 @@ function Equipment() {
         </div>
       )}
 
+      {importErrors.length > 0 && (
+        <div className="import-errors">
+          <div className="import-errors-header">
+            <strong>Rows not imported</strong>
+            <button className="btn-close" onClick={() => setImportErrors([])}>×</button>
+          </div>
+          <ul>
+            {importErrors.map((item) => (
+              <li key={item.line}>Line {item.line}: {item.error}</li>
+            ))}
+          </ul>
+        </div>
+      )}
+
       <div className="equipment-grid">
         {equipment.map((item) => (
           <div key={item.id} className={`equipment-card ${!item.is_active ? 'inactive' : ''}`}>
@@ -7,26 +7,34 @@ function Rentals() {
   const [rentals, setRentals] = useState([]);
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState('all');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchRentals();
-  }, []);
+  }, [filter]);
 
-  const fetchRentals = async () => {
+  const fetchRentals = async (after = null) => {
     try {
-      const response = await getAllRentals();
-      setRentals(response.data);
+      const params = {};
+      if (filter !== 'all') params.status = filter;
+      if (after) params.after = after;
+
+      const response = await getAllRentals(params);
+      setRentals(prev => after ? [...prev, ...response.data.rentals] : response.data.rentals);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching rentals:', error);
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
-  const filteredRentals = rentals.filter(rental => {
-    if (filter === 'all') return true;
-    return rental.status === filter;
-  });
+  const handleLoadMore = () => {
+    setLoadingMore(true);
+    fetchRentals(nextCursor);
+  };
 
   if (loading) {
     return (
@@ -82,7 +90,7 @@ function Rentals() {
             </tr>
           </thead>
           <tbody>
-            {filteredRentals.map((rental) => (
+            {rentals.map((rental) => (
               <tr key={rental.id}>
                 <td>#{rental.id}</td>
                 <td>
@@ -115,7 +123,15 @@ function Rentals() {
         </table>
       </div>
 
-      {filteredRentals.length === 0 && (
+      {nextCursor && (
+        <div className="load-more">
+          <button className="filter-tab" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load More'}
+          </button>
+        </div>
+      )}
+
+      {rentals.length === 0 && (
         <div className="empty-state">
           <FaClipboardList />
           <p>No {filter !== 'all' ? filter : ''} rentals found</p>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from "react";
-import { askAIAssistant } from "../../services/aiService";
+import { streamAIAssistant } from "../../services/aiService";
 import { getEquipment } from "../../services/api";
 import { FaRobot, FaPaperPlane, FaTimes, FaUser } from "react-icons/fa";
 import "./AIChatbot.css";
@@ -60,15 +60,28 @@ function AIChatbot({ userType = "customer" }) {
       season: getCurrentSeason(),
     };
 
-    const response = await askAIAssistant(inputMessage, context);
-
-    const botMessage = {
-      type: "bot",
-      text: response.response,
-      timestamp: response.timestamp,
+    // The bot reply is appended on the first token and grown in place after that
+    let started = false;
+    const showText = (text) => {
+      const botMessage = {
+        type: "bot",
+        text,
+        timestamp: new Date().toISOString(),
+      };
+      setLoading(false);
+      if (!started) {
+        started = true;
+        setMessages((prev) => [...prev, botMessage]);
+      } else {
+        setMessages((prev) => [...prev.slice(0, -1), botMessage]);
+      }
     };
 
-    setMessages((prev) => [...prev, botMessage]);
+    const response = await streamAIAssistant(inputMessage, context, showText);
+
+    if (!started || response.response) {
+      showText(response.response);
+    }
     setLoading(false);
   };
 
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
-import { getEquipment, createRental } from '../../services/api';
-import { FaTractor, FaCalendarAlt, FaDollarSign } from 'react-icons/fa';
+import { getEquipment, createRental, createRentalCart } from '../../services/api';
+import { FaTractor, FaCalendarAlt, FaDollarSign, FaShoppingCart, FaTrash } from 'react-icons/fa';
 import './BrowseEquipment.css';
 
 function BrowseEquipment() {
@@ -11,6 +11,9 @@ function BrowseEquipment() {
   const [days, setDays] = useState(1);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
+  const [cart, setCart] = useState([]);
+  const [cartError, setCartError] = useState('');
+  const [submittingCart, setSubmittingCart] = useState(false);
 
   useEffect(() => {
     fetchEquipment();
@@ -54,6 +57,50 @@ function BrowseEquipment() {
     }
   };
 
+  const addToCart = (item) => {
+    setCartError('');
+    setCart((current) => [...current, { key: `${item.id}-${Date.now()}`, equipment: item, days: 1 }]);
+  };
+
+  const updateCartDays = (key, value) => {
+    setCart((current) => current.map((entry) => (entry.key === key ? { ...entry, days: value } : entry)));
+  };
+
+  const removeFromCart = (key) => {
+    setCart((current) => current.filter((entry) => entry.key !== key));
+  };
+
+  const cartTotal = () =>
+    cart.reduce((sum, entry) => sum + entry.equipment.price * (parseInt(entry.days) || 0), 0).toFixed(2);
+
+  const handleCartSubmit = async () => {
+    setCartError('');
+    setSuccess('');
+    setSubmittingCart(true);
+
+    try {
+      const response = await createRentalCart(
+        cart.map((entry) => ({ equipment_id: entry.equipment.id, days: parseInt(entry.days) }))
+      );
+      setCart([]);
+      setSuccess(`${response.data.rentals.length} items rented successfully! Total ₹${response.data.grand_total}`);
+
+      setTimeout(() => setSuccess(''), 3000);
+    } catch (err) {
+      const unavailable = err.response?.data?.unavailable;
+      if (unavailable) {
+        const names = cart
+          .filter((entry) => unavailable.includes(entry.equipment.id))
+          .map((entry) => entry.equipment.name);
+        setCartError(`No longer available: ${[...new Set(names)].join(', ')}`);
+      } else {
+        setCartError(err.response?.data?.message || 'Failed to rent equipment');
+      }
+    } finally {
+      setSubmittingCart(false);
+    }
+  };
+
   const calculateTotal = () => {
     if (!selectedEquipment) return 0;
     return (selectedEquipment.price * days).toFixed(2);
@@ -83,6 +130,52 @@ function BrowseEquipment() {
         </div>
       )}
 
+      {cart.length > 0 && (
+        <div className="cart-panel">
+          <div className="cart-header">
+            <FaShoppingCart />
+            <h2>Cart ({cart.length})</h2>
+          </div>
+          {cartError && (
+            <div className="alert alert-error">
+              {cartError}
+            </div>
+          )}
+          {cart.map((entry) => (
+            <div key={entry.key} className="cart-item">
+              <span className="cart-item-name">{entry.equipment.name}</span>
+              <label>
+                <FaCalendarAlt />
+                <input
+                  type="number"
+                  min="1"
+                  value={entry.days}
+                  onChange={(e) => updateCartDays(entry.key, e.target.value)}
+                />
+                <span>days</span>
+              </label>
+              <strong>₹{(entry.equipment.price * (parseInt(entry.days) || 0)).toFixed(2)}</strong>
+              <button className="btn-remove" onClick={() => removeFromCart(entry.key)} title="Remove">
+                <FaTrash />
+              </button>
+            </div>
+          ))}
+          <div className="cart-footer">
+            <div className="total-calculation">
+              <span>Total Amount:</span>
+              <strong>₹{cartTotal()}</strong>
+            </div>
+            <button
+              className="btn-primary"
+              onClick={handleCartSubmit}
+              disabled={submittingCart || cart.some((entry) => !(parseInt(entry.days) > 0))}
+            >
+              {submittingCart ? 'Renting...' : 'Rent All'}
+            </button>
+          </div>
+        </div>
+      )}
+
       <div className="equipment-grid">
         {equipment.map((item) => (
           <div key={item.id} className="equipment-card">
@@ -95,12 +188,21 @@ function BrowseEquipment() {
                 <FaDollarSign />
                 <span>₹{item.price}/day</span>
               </div>
-              <button 
-                className="btn-rent"
-                onClick={() => handleRent(item)}
-              >
-                Rent Now
-              </button>
+              <div className="equipment-actions">
+                <button 
+                  className="btn-rent"
+                  onClick={() => handleRent(item)}
+                >
+                  Rent Now
+                </button>
+                <button
+                  className="btn-add-cart"
+                  onClick={() => addToCart(item)}
+                  title="Add to cart"
+                >
+                  <FaShoppingCart />
+                </button>
+              </div>
             </div>
           </div>
         ))}
@@ -8,15 +8,17 @@ function MyRentals() {
   const [loading, setLoading] = useState(true);
   const [success, setSuccess] = useState('');
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     fetchRentals();
   }, []);
 
-  const fetchRentals = async () => {
+  const fetchRentals = async (after = null) => {
     try {
-      const response = await getMyRentals();
-      setRentals(response.data);
+      const response = await getMyRentals(after ? { after } : {});
+      setRentals(prev => after ? [...prev, ...response.data.rentals] : response.data.rentals);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching rentals:', error);
       setError('Failed to load rentals');
@@ -102,6 +104,14 @@ function MyRentals() {
         ))}
       </div>
 
+      {nextCursor && (
+        <div className="load-more">
+          <button className="btn-browse" onClick={() => fetchRentals(nextCursor)}>
+            Load More
+          </button>
+        </div>
+      )}
+
       {rentals.length === 0 && (
         <div className="empty-state">
           <FaClipboardList />
@@ -57,6 +57,65 @@ export const askAIAssistant = async (question, context) => {
   }
 };
 
+/**
+ * Streaming variant of the chatbot
+ * Calls /api/ai/chat/stream and hands each token to onToken as it arrives.
+ * Falls back to the regular endpoint if streaming is unavailable.
+ */
+export const streamAIAssistant = async (question, context, onToken) => {
+  try {
+    const response = await fetch(`${api.defaults.baseURL}/ai/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Authorization: `Bearer ${localStorage.getItem('token')}`
+      },
+      body: JSON.stringify({ question, context })
+    });
+
+    if (!response.ok || !response.body) {
+      return askAIAssistant(question, context);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let result = { timestamp: Date.now() / 1000 };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // SSE events are separated by a blank line
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+
+      for (const rawEvent of events) {
+        const lines = rawEvent.split('\n');
+        const event = lines.find(l => l.startsWith('event:'))?.slice(6).trim();
+        const data = JSON.parse(lines.find(l => l.startsWith('data:'))?.slice(5) || '{}');
+
+        if (event === 'token') {
+          text += data.text;
+          onToken(text);
+        } else if (event === 'error') {
+          text = data.response;
+          onToken(text);
+        } else if (event === 'done') {
+          result = data;
+        }
+      }
+    }
+
+    return { response: text, timestamp: result.timestamp };
+  } catch (error) {
+    console.error('AI Assistant Stream Error:', error);
+    return askAIAssistant(question, context);
+  }
+};
+
 /**
  * AI-Powered Rental Contract Generator
  * Now calls /api/ai/contract on your Flask backend
@@ -88,5 +147,6 @@ export const generateRentalContract = async (rentalDetails) => {
 export default {
   getAIRecommendation,
   askAIAssistant,
+  streamAIAssistant,
   generateRentalContract
 };
\ No newline at end of file
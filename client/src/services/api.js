@@ -17,6 +17,10 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    const lastWrite = localStorage.getItem('lastWrite');
+    if (lastWrite) {
+      config.headers['X-Last-Write'] = lastWrite;
+    }
     return config;
   },
   (error) => {
@@ -24,9 +28,19 @@ api.interceptors.request.use(
   }
 );
 
+// Echo the last write marker back so reads right after a write see it, whichever server answers
+api.interceptors.response.use((response) => {
+  const lastWrite = response.headers['x-last-write'];
+  if (lastWrite) {
+    localStorage.setItem('lastWrite', lastWrite);
+  }
+  return response;
+});
+
 // Auth APIs
 export const register = (data) => api.post('/register', data);
 export const login = (data) => api.post('/login', data);
+export const logout = () => api.post('/logout');
 
 // Equipment APIs
 export const getEquipment = () => api.get('/equipment');
@@ -34,16 +48,21 @@ export const getAllEquipment = () => api.get('/equipment/all');
 export const addEquipment = (data) => api.post('/equipment', data);
 export const deactivateEquipment = (id) => api.put(`/equipment/${id}/deactivate`);
 export const activateEquipment = (id) => api.put(`/equipment/${id}/activate`);
+export const importEquipment = (file) =>
+  api.post('/equipment/import', file, {
+    headers: { 'Content-Type': /\.(ndjson|jsonl)$/i.test(file.name) ? 'application/x-ndjson' : 'text/csv' }
+  });
 
 // Rental APIs
 export const createRental = (data) => api.post('/rentals', data);
-export const getMyRentals = () => api.get('/rentals/my');
-export const getAllRentals = () => api.get('/rentals');
+export const createRentalCart = (items) => api.post('/rentals/cart', { items });
+export const getMyRentals = (params) => api.get('/rentals/my', { params });
+export const getAllRentals = (params) => api.get('/rentals', { params });
 export const returnRental = (id) => api.put(`/rentals/${id}/return`);
 
 // Reports & Stats
 export const getRevenueReport = () => api.get('/reports/revenue');
-export const getAuditLogs = () => api.get('/audit-logs');
+export const searchAuditLogs = (params) => api.get('/audit-logs/search', { params });
 export const getDashboardStats = () => api.get('/stats/dashboard');
 
 export default api;
\ No newline at end of file